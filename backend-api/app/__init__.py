@@ -6,6 +6,16 @@ from flask_jwt_extended import JWTManager
 from .config import Config
 from .utils.db import db
 from .metrics import init_metrics
+from .utils.logger import init_logging
+from .utils.schema import init_schema
+from .utils.passwords import init_password_hasher
+from .utils.user_directory import init_user_directory
+from .utils.revocation import init_revocation
+from .utils.rate_limit import init_rate_limiting
+from .utils.user_import import import_users_command
+from .utils.celebration_feed import init_celebration_feed
+from .utils.activity_inbox import init_inbox_fanout
+from .utils.purger import init_purger
 
 def create_app(test_config=None):
     app = Flask(__name__, static_folder='static', template_folder='templates')
@@ -15,10 +25,16 @@ def create_app(test_config=None):
     else:
         app.config.from_object(Config)
     
+    init_logging(app)
     CORS(app)
-    JWTManager(app)
+    jwt = JWTManager(app)
     db.init_app(app)
     init_metrics(app, db)
+    init_password_hasher(app)
+    init_user_directory(app)
+    init_revocation(app, jwt)
+    init_rate_limiting(app)
+    app.cli.add_command(import_users_command)
     
     with app.app_context():
         # Import and register blueprints
@@ -48,8 +64,17 @@ def create_app(test_config=None):
         except OSError:
             pass
 
-        # Create database tables
-        # db.create_all() # Disabled to prevent crash on import. Use migrations or manual init.
+        # Create database tables once per process, never on request paths
+        init_schema(app)
+        
+        # Per-worker recent-celebrations buffer with batched persistence
+        init_celebration_feed(app)
+        
+        # Social activities are copied into personal inboxes in the background
+        init_inbox_fanout(app)
+        
+        # Expired challenges/activities/celebrations are deleted in the background
+        init_purger(app)
         
     return app
 
@@ -11,6 +11,90 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL') or 'sqlite:///instance/games.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Usernames allowed to call admin endpoints such as POST /users/import
+    ADMIN_USERS = [u for u in os.getenv('ADMIN_USERS', '').split(',') if u]
+    
+    # Password KDF (werkzeug method string) and the per-worker pool that runs it.
+    # Changing the method rehashes each user's password on their next login.
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 32))
+    PASSWORD_HASH_WAIT_SECONDS = 5.0
+    # Separate hashing threads for POST /users/import, so bulk imports never starve logins
+    PASSWORD_HASH_IMPORT_WORKERS = int(os.getenv('PASSWORD_HASH_IMPORT_WORKERS', 2))
+    
+    # JWT revocation: per-worker bloom filter over revoked_tokens, synced incrementally
+    REVOCATION_BLOOM_CAPACITY = 100000
+    REVOCATION_BLOOM_ERROR_RATE = 0.001
+    REVOCATION_EXACT_SIZE = 1024
+    REVOCATION_REFRESH_SECONDS = 5.0
+    REVOCATION_REBUILD_SECONDS = 3600.0
+    # Each refresh re-reads this much recent history: sequence ids can commit out of order
+    REVOCATION_LOOKBACK_SECONDS = 60.0
+    
+    # Rate limiting: (tokens/sec, burst) per client (JWT identity or IP) and endpoint.
+    # "memory" keeps buckets per worker; "sqlite:////tmp/ratelimit.db" shares them across a pod's workers.
+    RATE_LIMIT_STORAGE = os.getenv('RATE_LIMIT_STORAGE', 'memory')
+    RATE_LIMIT_DEFAULT = (10.0, 20)
+    RATE_LIMITS = {
+        'leaderboards_bp.leaderboard_global': (0.5, 5),
+        'leaderboards_bp.leaderboard_team': (0.5, 5),
+        'leaderboards_bp.leaderboard_monthly': (0.5, 5),
+        'leaderboards_bp.leaderboard_hall_of_fame': (0.5, 5),
+        'api_bp.api_players_grouped': (0.5, 5),
+        'login_bp.login_user': (1.0, 10),
+        'login_bp.register_user': (1.0, 10),
+    }
+    # Reverse proxies in front of the app (the ingress is 1). Only their X-Forwarded-For entries are trusted.
+    TRUSTED_PROXY_HOPS = int(os.getenv('TRUSTED_PROXY_HOPS', 0))
+    # Requests a worker serves at once before shedding with 503. Keep it below gunicorn's
+    # --threads (16 in the Dockerfile) so the remaining threads are there to refuse quickly.
+    MAX_IN_FLIGHT = int(os.getenv('MAX_IN_FLIGHT', 12))
+    
+    # Application log: DEBUG/INFO/WARNING/ERROR, "text" or "json" (one object per line)
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+    # "-" writes to stdout (no rotation). Otherwise the file is rotated by size/age,
+    # rotated segments are gzipped and only the newest LOG_BACKUP_COUNT are kept.
+    LOG_FILE = os.getenv('LOG_FILE', 'logs.txt')
+    LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 50 * 1024 * 1024))
+    LOG_MAX_AGE_SECONDS = int(os.getenv('LOG_MAX_AGE_SECONDS', 24 * 3600))
+    LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', 5))
+    LOG_COMPRESS = os.getenv('LOG_COMPRESS', 'true').lower() != 'false'
+    
+    # Create missing tables once at startup (serialized across replicas)
+    SCHEMA_AUTO_INIT = os.getenv('SCHEMA_AUTO_INIT', 'true').lower() != 'false'
+    
+    # Per-worker username directory (LRU + TTL, shorter TTL for unknown names)
+    USER_DIRECTORY_SIZE = 10000
+    USER_DIRECTORY_TTL = 30.0
+    USER_DIRECTORY_NEGATIVE_TTL = 5.0
+    
+    # Celebrations feed: in-memory ring per worker, batched persistence
+    CELEBRATION_FEED_SIZE = 50
+    CELEBRATION_FLUSH_SECONDS = 2.0
+    
+    # Personal activity inboxes: batched fan-out on write, fan-out on read above the team size limit
+    INBOX_CAP = int(os.getenv('INBOX_CAP', 500))
+    INBOX_FANOUT_MAX_TEAM = int(os.getenv('INBOX_FANOUT_MAX_TEAM', 200))
+    INBOX_FLUSH_SECONDS = 1.0
+    
+    # Background batch writers (celebrations, inbox fan-out): bounded backlog, failed batches dropped after N tries
+    BATCH_WRITER_MAX_PENDING = int(os.getenv('BATCH_WRITER_MAX_PENDING', 10000))
+    BATCH_WRITER_MAX_RETRIES = int(os.getenv('BATCH_WRITER_MAX_RETRIES', 5))
+    
+    # Friends graph: team edges only for teams up to this size; bounded two-hop suggestions
+    FRIENDS_MAX_TEAM = int(os.getenv('FRIENDS_MAX_TEAM', 100))
+    FRIENDS_SUGGEST_SEEDS = 50
+    FRIENDS_SUGGEST_SCAN = 5000
+    
+    # Background retention purger (0 disables retention for a table)
+    PURGE_INTERVAL_SECONDS = int(os.getenv('PURGE_INTERVAL_SECONDS', 300))
+    PURGE_CHUNK_SIZE = 1000
+    CHALLENGE_RETENTION_DAYS = int(os.getenv('CHALLENGE_RETENTION_DAYS', 7))
+    ACTIVITY_RETENTION_HOURS = int(os.getenv('ACTIVITY_RETENTION_HOURS', 24))
+    CELEBRATIONS_RETENTION_DAYS = int(os.getenv('CELEBRATIONS_RETENTION_DAYS', 30))
+    
     # Development settings
     TEMPLATES_AUTO_RELOAD = True
     SEND_FILE_MAX_AGE_DEFAULT = 0
@@ -1,7 +1,20 @@
 from prometheus_flask_exporter import PrometheusMetrics
+from prometheus_client import Counter, Gauge
 from prometheus_client.core import GaugeMetricFamily, REGISTRY
 import sqlalchemy
 
+# Set once per process by the startup schema step (see utils/schema.py)
+SCHEMA_INIT_SECONDS = Gauge('app_schema_init_seconds', 'Time spent creating/verifying the DB schema at startup')
+
+# Username directory cache (see utils/user_directory.py); hit rate = hit / (hit + miss)
+USER_DIRECTORY_LOOKUPS = Counter('app_user_directory_lookups_total', 'Username directory lookups', ['result'])
+
+# JWT revocation checks by where they were answered: memory (bloom miss), exact (known revoked), store (DB)
+TOKEN_REVOCATION_CHECKS = Counter('app_token_revocation_checks_total', 'JWT revocation checks', ['result'])
+
+# Requests refused by utils/rate_limit.py: rate_limit (429) or in_flight (503)
+REQUESTS_SHED = Counter('app_requests_shed_total', 'Requests refused before reaching a handler', ['reason'])
+
 class DatabaseCollector(object):
     def __init__(self, db):
         self.db = db
@@ -27,7 +40,11 @@ class DatabaseCollector(object):
 def init_metrics(app, db):
     metrics = PrometheusMetrics(app)
     
-    # Register custom collector
-    REGISTRY.register(DatabaseCollector(db))
+    # Register custom collector. create_app can run more than once per
+    # process (module import + test fixtures) and the registry is global.
+    try:
+        REGISTRY.register(DatabaseCollector(db))
+    except ValueError:
+        pass
     
     return metrics
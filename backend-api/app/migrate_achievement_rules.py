@@ -0,0 +1,27 @@
+"""
+Add the auto-unlock rule columns to achievements.
+
+    python -m app.migrate_achievement_rules
+"""
+from sqlalchemy import inspect, text
+from app import app
+from app.utils.db import db
+
+COLUMNS = {
+    'criteria_event': "VARCHAR(20)",
+    'criteria_metric': "VARCHAR(40)",
+    'criteria_threshold': "INTEGER",
+}
+
+with app.app_context():
+    try:
+        existing = [c['name'] for c in inspect(db.engine).get_columns('achievements')]
+        with db.engine.begin() as conn:
+            for name, ddl in COLUMNS.items():
+                if name not in existing:
+                    print(f"Adding {name} column...")
+                    conn.execute(text(f"ALTER TABLE achievements ADD COLUMN {name} {ddl}"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_achievements_criteria_event ON achievements (criteria_event)"))
+        print("Achievement rule columns in place.")
+    except Exception as e:
+        print(f"Error: {e}")
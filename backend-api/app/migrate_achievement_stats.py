@@ -0,0 +1,19 @@
+"""
+Backfill achievement_stats from existing user_achievements (the table itself is
+created by the startup schema step). Safe to re-run: counts are recomputed with
+the same distinct-holder definition the routes maintain incrementally.
+
+    python -m app.migrate_achievement_stats
+"""
+from app import app
+from app.utils.db import db
+from app.routes.achievements import rebuild_achievement_stats
+
+with app.app_context():
+    try:
+        count = rebuild_achievement_stats()
+        db.session.commit()
+        print(f"Backfilled stats for {count} achievements.")
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error: {e}")
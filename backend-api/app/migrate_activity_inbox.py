@@ -0,0 +1,37 @@
+"""
+Add social_activities.target_user and seed personal inboxes from the activities
+still inside the retention window (the activity_inbox table itself is created
+by the startup schema step). Safe to re-run: deliveries are deduplicated.
+
+    python -m app.migrate_activity_inbox
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import inspect, text
+from app import app
+from app.utils.db import db
+from app.utils.activity_inbox import InboxFanout
+from app.routes.social import SocialActivity
+
+BATCH = 500
+
+with app.app_context():
+    try:
+        columns = [c['name'] for c in inspect(db.engine).get_columns('social_activities')]
+        if 'target_user' not in columns:
+            print("Adding target_user column...")
+            with db.engine.begin() as conn:
+                conn.execute(text("ALTER TABLE social_activities ADD COLUMN target_user VARCHAR(120)"))
+
+        fanout = InboxFanout(
+            app,
+            cap=app.config.get('INBOX_CAP', 500),
+            max_team=app.config.get('INBOX_FANOUT_MAX_TEAM', 200),
+            async_writes=False
+        )
+        cutoff = datetime.utcnow() - timedelta(hours=app.config.get('ACTIVITY_RETENTION_HOURS', 24))
+        ids = [i for (i,) in db.session.query(SocialActivity.id).filter(SocialActivity.created_at >= cutoff).order_by(SocialActivity.id).all()]
+        for start in range(0, len(ids), BATCH):
+            fanout.publish(ids[start:start + BATCH])  # synchronous: async_writes=False
+        print(f"Fanned out {len(ids)} activities into personal inboxes.")
+    except Exception as e:
+        print(f"Error: {e}")
@@ -0,0 +1,29 @@
+"""
+Rebuild the friendships adjacency table from current team memberships and the
+challenge history still on record (the table itself is created by the startup
+schema step). Safe to re-run: the table is rebuilt from scratch.
+
+    python -m app.migrate_friendships
+"""
+from app import app
+from app.utils.db import db
+from app.routes.social import Challenge, Friendship, UserTeam, _link_teammates, _record_challenge_link
+
+with app.app_context():
+    try:
+        db.session.execute(db.delete(Friendship))
+        rosters = {}
+        for user_id, team_name in db.session.query(UserTeam.user_id, UserTeam.team_name).all():
+            rosters.setdefault(team_name, []).append(user_id)
+        for team_name, members in rosters.items():
+            _link_teammates(team_name, members)
+        pairs = db.session.query(Challenge.challenger, Challenge.challenged, db.func.count()).group_by(
+            Challenge.challenger, Challenge.challenged
+        ).all()
+        for challenger, challenged, count in pairs:
+            _record_challenge_link(challenger, challenged, count)
+        db.session.commit()
+        print(f"Rebuilt friendships: {Friendship.query.count()} edges from {len(rosters)} teams and {len(pairs)} challenge pairs.")
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error: {e}")
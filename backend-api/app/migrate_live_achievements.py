@@ -0,0 +1,24 @@
+"""
+Make achievements.is_deleted NOT NULL (backfilling NULLs as live) and create the
+partial indexes on live rows.
+
+    python -m app.migrate_live_achievements
+"""
+from sqlalchemy import text
+from app import app
+from app.utils.db import db
+from app.utils.schema import ensure_schema
+
+with app.app_context():
+    try:
+        with db.engine.begin() as conn:
+            result = conn.execute(text("UPDATE achievements SET is_deleted = :f WHERE is_deleted IS NULL"), {"f": False})
+            print(f"Backfilled {result.rowcount} NULL is_deleted values.")
+            if conn.dialect.name == 'postgresql':
+                # SQLite can't alter column constraints; the app default keeps new rows non-NULL there
+                conn.execute(text("ALTER TABLE achievements ALTER COLUMN is_deleted SET DEFAULT false"))
+                conn.execute(text("ALTER TABLE achievements ALTER COLUMN is_deleted SET NOT NULL"))
+        ensure_schema()  # creates ix_achievements_live_* on existing tables
+        print("Live-achievement indexes in place.")
+    except Exception as e:
+        print(f"Error: {e}")
@@ -0,0 +1,26 @@
+"""
+Add competitions.participant_count and backfill it from the membership tables.
+
+    python -m app.migrate_participant_counts
+"""
+from sqlalchemy import inspect, text
+from app import app
+from app.utils.db import db
+
+BACKFILL = """
+UPDATE competitions SET participant_count =
+    (SELECT COUNT(*) FROM participations p WHERE p.competition_id = competitions.id) +
+    (SELECT COUNT(*) FROM user_competitions uc WHERE uc.competition_id = competitions.id)
+"""
+
+with app.app_context():
+    try:
+        columns = [c['name'] for c in inspect(db.engine).get_columns('competitions')]
+        with db.engine.begin() as conn:
+            if 'participant_count' not in columns:
+                print("Adding participant_count column...")
+                conn.execute(text("ALTER TABLE competitions ADD COLUMN participant_count INTEGER NOT NULL DEFAULT 0"))
+            result = conn.execute(text(BACKFILL))
+            print(f"Backfilled participant_count for {result.rowcount} competitions.")
+    except Exception as e:
+        print(f"Error: {e}")
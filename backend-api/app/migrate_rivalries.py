@@ -0,0 +1,27 @@
+"""
+Rebuild the rivalries table from the challenge history still on record and
+fill in each player's current point balance (the table itself is created by
+the startup schema step). Safe to re-run: the table is rebuilt from scratch.
+
+Also drops the old ck_rivalries_ordered_pair CHECK on Postgres: it ordered
+pairs by the column collation, which disagrees with the app's ordering for
+mixed-case usernames.
+
+    python -m app.migrate_rivalries
+"""
+from sqlalchemy import text
+from app import app
+from app.utils.db import db
+from app.routes.social import rebuild_rivalries, refresh_rival_scores
+
+with app.app_context():
+    try:
+        if db.engine.dialect.name == 'postgresql':
+            db.session.execute(text("ALTER TABLE rivalries DROP CONSTRAINT IF EXISTS ck_rivalries_ordered_pair"))
+            db.session.commit()
+        players = rebuild_rivalries()
+        refresh_rival_scores(*players)
+        print(f"Rebuilt rivalries for {len(players)} players.")
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error: {e}")
@@ -0,0 +1,34 @@
+"""
+Create the teams table and backfill it (with member counts) from user_teams.
+
+    python -m app.migrate_teams
+"""
+from sqlalchemy import text
+from app import app
+from app.utils.db import db
+from app.routes.social import Team, UserTeam
+
+BACKFILL = """
+INSERT INTO teams (name, member_count, created_at)
+SELECT team_name, COUNT(*), MIN(created_at) FROM user_teams
+WHERE team_name NOT IN (SELECT name FROM teams)
+GROUP BY team_name
+"""
+
+RECOUNT = """
+UPDATE teams SET member_count =
+    (SELECT COUNT(*) FROM user_teams ut WHERE ut.team_name = teams.name)
+"""
+
+with app.app_context():
+    try:
+        with db.engine.begin() as conn:
+            Team.__table__.create(conn, checkfirst=True)
+            for index in UserTeam.__table__.indexes:
+                index.create(conn, checkfirst=True)
+            result = conn.execute(text(BACKFILL))
+            print(f"Backfilled {result.rowcount} teams from user_teams.")
+            conn.execute(text(RECOUNT))
+        print("Team member counts in sync.")
+    except Exception as e:
+        print(f"Error: {e}")
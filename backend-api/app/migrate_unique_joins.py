@@ -0,0 +1,49 @@
+"""
+Deduplicate competition memberships and add the unique (user_id, competition_id)
+indexes that make joins idempotent.
+
+Run once before deploying the upsert-based joins:
+    python -m app.migrate_unique_joins
+"""
+from sqlalchemy import text
+from app import app
+from app.utils.db import db
+
+STATEMENTS = [
+    # Fold progress from duplicate participations into the surviving (oldest) row
+    """
+    UPDATE participations
+    SET progress = (
+        SELECT SUM(COALESCE(p2.progress, 0)) FROM participations p2
+        WHERE p2.user_id = participations.user_id
+          AND p2.competition_id = participations.competition_id
+    )
+    WHERE id IN (
+        SELECT MIN(id) FROM participations
+        GROUP BY user_id, competition_id HAVING COUNT(*) > 1
+    )
+    """,
+    """
+    DELETE FROM participations WHERE id NOT IN (
+        SELECT MIN(id) FROM participations GROUP BY user_id, competition_id
+    )
+    """,
+    """
+    DELETE FROM user_competitions WHERE id NOT IN (
+        SELECT MIN(id) FROM user_competitions GROUP BY user_id, competition_id
+    )
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_participations_user_competition ON participations (user_id, competition_id)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_user_competitions_user_competition ON user_competitions (user_id, competition_id)",
+]
+
+with app.app_context():
+    try:
+        with db.engine.begin() as conn:
+            for stmt in STATEMENTS:
+                result = conn.execute(text(stmt))
+                if result.rowcount and result.rowcount > 0:
+                    print(f"{result.rowcount} rows affected: {' '.join(stmt.split())[:60]}...")
+        print("Memberships deduplicated and unique indexes in place.")
+    except Exception as e:
+        print(f"Error: {e}")
@@ -4,6 +4,8 @@ User Database Model
 
 This module defines the User model for the gamification platform.
 Users can register, login, and participate in various platform activities.
+It also holds RarityPoints, the rarity -> points table used for scoring, and
+RevokedToken, the persisted JWT revocation list.
 
 The User model stores:
 - Unique username (max 20 characters)
@@ -14,6 +16,7 @@ Note: The password field was previously incorrectly set as unique, which has bee
 Multiple users can have the same password (though not recommended for security).
 """
 
+from datetime import datetime
 from ..utils.db import db
 
 
@@ -52,4 +55,52 @@ class User(db.Model):
 
     def __repr__(self):
         """String representation of User object for debugging"""
-        return f'User-{self.id} ({self.username})'
\ No newline at end of file
+        return f'User-{self.id} ({self.username})'
+
+
+class RarityPoints(db.Model):
+    """
+    Points awarded per achievement rarity.
+
+    Scoring queries join against this table directly; in-process callers use
+    the cached mapping from utils.get_achievement_points. Seeded from
+    utils.RARITY_POINTS by the startup schema step.
+
+    Attributes:
+        rarity (str): Primary key, e.g. common, rare, epic, legendary
+        points (int): Points an achievement of this rarity is worth
+    """
+    __tablename__ = 'rarity_points'
+
+    rarity = db.Column(db.String(20), primary_key=True)
+    points = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        return f'RarityPoints-{self.rarity} ({self.points})'
+
+
+class RevokedToken(db.Model):
+    """
+    A revoked JWT, identified by its jti.
+
+    Workers mirror this table into a bloom filter (utils/revocation.py) and
+    pick up new rows incrementally by id (plus a created_at lookback). Rows
+    older than the token lifetime are removed by the retention purger.
+
+    Attributes:
+        id (int): Primary key; increasing, used as the incremental sync cursor
+        jti (str): Unique token id
+        user_id (str): Token subject, for auditing
+        expires_at (datetime): Token expiry (UTC)
+        created_at (datetime): When the token was revoked
+    """
+    __tablename__ = 'revoked_tokens'
+
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(64), nullable=False, unique=True)
+    user_id = db.Column(db.String(120), nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'RevokedToken-{self.jti} ({self.user_id})'
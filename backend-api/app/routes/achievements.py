@@ -1,22 +1,38 @@
-from flask import Blueprint, request, jsonify
+import time
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import create_access_token
-from ..models.models import User
-from ..utils.db import db
+from ..models.models import User, RarityPoints
+from ..utils.db import db, insert_ignore
 from datetime import datetime
-from ..utils.utils import L, get_achievement_points
+from ..utils.utils import L, RARITY_POINTS, get_achievement_points, invalidate_rarity_points
+from ..utils.celebration_feed import celebration_feed, recent_celebrations
+from .social import refresh_rival_scores
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
 achievements_bp = Blueprint('achievements_bp', __name__)
 
+# Partial-index predicate: catalog scans only touch live rows
+_LIVE_ROWS = {'postgresql_where': db.text('is_deleted = false'), 'sqlite_where': db.text('is_deleted = 0')}
+
 class Achievement(db.Model):
     __tablename__ = 'achievements'
+    __table_args__ = (
+        db.Index('ix_achievements_live_name', 'name', **_LIVE_ROWS),
+        db.Index('ix_achievements_live_rarity_name', 'rarity', 'name', **_LIVE_ROWS),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(150), nullable=False, unique=True)
     description = db.Column(db.Text, nullable=True)
     locked = db.Column(db.String(20), default="locked") 
     rarity = db.Column(db.String(20), default="common")  # common, rare, epic, legendary
-    is_deleted = db.Column(db.Boolean, default=False)
+    # NOT NULL so live-row filters are a plain equality the partial indexes can serve
+    is_deleted = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Auto-unlock rule: unlock once RULE_METRICS[criteria_metric] >= criteria_threshold.
+    # criteria_event is derived from the metric and indexed so an event only loads its own rules.
+    criteria_event = db.Column(db.String(20), nullable=True, index=True)
+    criteria_metric = db.Column(db.String(40), nullable=True)
+    criteria_threshold = db.Column(db.Integer, nullable=True)
 
 class UserAchievement(db.Model):
     __tablename__ = 'user_achievements'
@@ -26,13 +42,23 @@ class UserAchievement(db.Model):
     unlocked_at = db.Column(db.DateTime, default=datetime.utcnow)
     achievement = db.relationship('Achievement')
 
+class AchievementStats(db.Model):
+    # Maintained incrementally on unlock/lock/remove so stats never scan user_achievements.
+    # unlock_count is the number of distinct users holding the achievement, as in the backfill.
+    __tablename__ = 'achievement_stats'
+    achievement_id = db.Column(db.Integer, db.ForeignKey('achievements.id'), primary_key=True)
+    unlock_count = db.Column(db.Integer, nullable=False, default=0)
+    first_unlocked_at = db.Column(db.DateTime, nullable=True)
+    last_unlocked_at = db.Column(db.DateTime, nullable=True)
+
 class Celebration(db.Model):
+    # Written in batches by utils.celebration_feed, not in the unlock transaction
     __tablename__ = 'celebrations'
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.String(120), nullable=False)
     achievement_name = db.Column(db.String(150), nullable=False)
     message = db.Column(db.String(500), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
 # -----Helpers-----
 
@@ -42,32 +68,291 @@ def _uid_or_anon() -> str:
 
 
 def _ser(a: Achievement):
-    return {
+    data = {
         'id': a.id,
         'name': a.name,
         'description': a.description,
         'locked': a.locked,
         'rarity': a.rarity
     }
+    if a.criteria_metric:
+        data['criteria'] = {'metric': a.criteria_metric, 'gte': a.criteria_threshold}
+    return data
+
+def _bump_stats(achievement_id: int, delta: int, at=None):
+    """Adjust an achievement's unlock counter (and timestamps on unlock) in the current transaction."""
+    if not delta:
+        return
+    insert_ignore(AchievementStats, [{'achievement_id': achievement_id, 'unlock_count': 0}], ['achievement_id'])
+    new_count = AchievementStats.unlock_count + delta
+    values = {'unlock_count': db.case((new_count < 0, 0), else_=new_count)}
+    if delta > 0:
+        values['first_unlocked_at'] = db.func.coalesce(AchievementStats.first_unlocked_at, at)
+        values['last_unlocked_at'] = at
+    db.session.execute(db.update(AchievementStats).where(AchievementStats.achievement_id == achievement_id).values(**values))
+
+def _insert_unlocks(unlocks):
+    """
+    Bulk-insert UserAchievement rows and bump their stats. Call _celebrate once the transaction commits.
+
+    Args:
+        unlocks (list): (user_id, achievement_id, achievement_name) tuples, already deduped
+    """
+    if not unlocks:
+        return
+    now = datetime.utcnow()
+    db.session.execute(db.insert(UserAchievement), [
+        {'user_id': uid, 'achievement_id': aid, 'unlocked_at': now} for uid, aid, _ in unlocks
+    ])
+    # Count distinct holders: a user listed twice for one achievement counts once
+    per_achievement = {}
+    for _, aid in {(uid, aid) for uid, aid, _ in unlocks}:
+        per_achievement[aid] = per_achievement.get(aid, 0) + 1
+    for aid, count in per_achievement.items():
+        _bump_stats(aid, count, now)
+
+def rebuild_achievement_stats() -> int:
+    """
+    Recompute achievement_stats from user_achievements, counting distinct holders
+    like the incremental path. Does not commit.
+
+    Returns:
+        int: Achievements with at least one holder
+    """
+    db.session.execute(db.delete(AchievementStats))
+    totals = db.select(
+        UserAchievement.achievement_id,
+        db.func.count(db.distinct(UserAchievement.user_id)),
+        db.func.min(UserAchievement.unlocked_at),
+        db.func.max(UserAchievement.unlocked_at)
+    ).group_by(UserAchievement.achievement_id)
+    db.session.execute(db.insert(AchievementStats).from_select(
+        ['achievement_id', 'unlock_count', 'first_unlocked_at', 'last_unlocked_at'], totals
+    ))
+    return db.session.query(AchievementStats).count()
+
+def _delete_unlock(user_achievement):
+    """Delete one UserAchievement row; the holder count only drops if it was the user's last copy."""
+    still_held = db.session.query(UserAchievement.id).filter(
+        UserAchievement.user_id == user_achievement.user_id,
+        UserAchievement.achievement_id == user_achievement.achievement_id,
+        UserAchievement.id != user_achievement.id
+    ).first() is not None
+    if not still_held:
+        _bump_stats(user_achievement.achievement_id, -1)
+    db.session.delete(user_achievement)
+
+# Seconds a worker caches the player count used for unlock percentages
+PLAYER_COUNT_TTL = 60
+
+def _player_count() -> int:
+    """Registered users, cached per app so percentages cost no query per request."""
+    cache = current_app.extensions.setdefault('player_count', {'loaded_at': None, 'count': 0})
+    now = time.monotonic()
+    if cache['loaded_at'] is None or now - cache['loaded_at'] > PLAYER_COUNT_TTL:
+        cache['count'] = User.query.count()
+        cache['loaded_at'] = now
+    return cache['count']
+
+def _unlock_percent(unlock_count) -> float:
+    players = _player_count()
+    if not players or not unlock_count:
+        return 0.0
+    return round(min(100.0, 100.0 * unlock_count / players), 1)
+
+def _celebrate(unlocks):
+    """Publish committed unlocks to the celebrations feed, which persists them in the background."""
+    celebration_feed().publish_many([(uid, name) for uid, _, name in unlocks])
+    # Unlocks change point balances; keep rivalry differentials current
+    refresh_rival_scores(*{uid for uid, _, _ in unlocks})
+
+def _live():
+    """Filter for achievements that haven't been soft-deleted."""
+    return Achievement.is_deleted == False
+
+def _points_expr():
+    """
+    SQL expression for an achievement's points; requires an outer join to RarityPoints.
+
+    Unknown rarities score as common, matching get_achievement_points.
+    """
+    return db.func.coalesce(RarityPoints.points, get_achievement_points('common'))
+
+def _catalog_select(user_id: str, rarity=None):
+    """
+    Live catalog LEFT JOINed with the user's unlocks in one statement.
+
+    Rows are (Achievement, unlocked, points, unlock_count, user_total_points,
+    total_count); the two totals are window aggregates over the whole filtered
+    catalog, so they survive LIMIT/OFFSET.
+    """
+    mine = db.select(UserAchievement.achievement_id).where(UserAchievement.user_id == user_id).distinct().subquery()
+    unlocked = mine.c.achievement_id.isnot(None)
+    points = _points_expr()
+    stmt = db.select(
+        Achievement,
+        unlocked.label('unlocked'),
+        points.label('points'),
+        db.func.coalesce(AchievementStats.unlock_count, 0).label('unlock_count'),
+        db.func.sum(db.case((unlocked, points), else_=0)).over().label('user_total_points'),
+        db.func.count().over().label('total_count')
+    ).outerjoin(mine, mine.c.achievement_id == Achievement.id) \
+     .outerjoin(RarityPoints, RarityPoints.rarity == Achievement.rarity) \
+     .outerjoin(AchievementStats, AchievementStats.achievement_id == Achievement.id) \
+     .where(_live())
+    if rarity:
+        stmt = stmt.where(Achievement.rarity == rarity)
+    return stmt.order_by(Achievement.name.asc())
+
+MAX_PAGE_SIZE = 200
+
+def _page_args():
+    """
+    Optional ?page=&per_page= pagination.
+
+    Returns:
+        tuple: (limit, offset) - (None, 0) when not paginating
+    Raises:
+        ValueError: on non-integer values
+    """
+    if 'page' not in request.args and 'per_page' not in request.args:
+        return None, 0
+    page = max(1, int(request.args.get('page', 1)))
+    per_page = min(MAX_PAGE_SIZE, max(1, int(request.args.get('per_page', 50))))
+    return per_page, (page - 1) * per_page
+
+# -----Auto-unlock rules-----
+
+def _metric_max_progress(user_id):
+    from .games import Participation
+    return db.session.query(db.func.coalesce(db.func.max(Participation.progress), 0)).filter_by(user_id=user_id).scalar()
+
+def _metric_total_progress(user_id):
+    from .games import Participation
+    return db.session.query(db.func.coalesce(db.func.sum(Participation.progress), 0)).filter_by(user_id=user_id).scalar()
+
+def _metric_competitions_joined(user_id):
+    from .games import Participation, UserCompetition
+    joined = db.union(
+        db.select(Participation.competition_id).where(Participation.user_id == user_id),
+        db.select(UserCompetition.competition_id).where(UserCompetition.user_id == user_id)
+    ).subquery()
+    return db.session.execute(db.select(db.func.count()).select_from(joined)).scalar()
+
+def _metric_redemptions(user_id):
+    from .rewards import Redemption
+    return Redemption.query.filter_by(user_id=user_id).count()
+
+def _metric_points_spent(user_id):
+    from .rewards import Redemption
+    return db.session.query(db.func.coalesce(db.func.sum(Redemption.points), 0)).filter_by(user_id=user_id).scalar()
+
+# metric name -> (event that can change it, per-user evaluator)
+RULE_METRICS = {
+    'max_progress': ('progress', _metric_max_progress),
+    'total_progress': ('progress', _metric_total_progress),
+    'competitions_joined': ('join', _metric_competitions_joined),
+    'redemptions': ('redeem', _metric_redemptions),
+    'points_spent': ('redeem', _metric_points_spent),
+}
+
+# Seconds before a worker reloads the rule index (local edits invalidate immediately)
+RULES_CACHE_TTL = 60
+
+def _rule_index():
+    """Per-app {event: [(achievement_id, name, metric, threshold), ...]}, reloaded every RULES_CACHE_TTL."""
+    cache = current_app.extensions.setdefault('achievement_rules', {'loaded_at': None, 'by_event': {}})
+    now = time.monotonic()
+    if cache['loaded_at'] is None or now - cache['loaded_at'] > RULES_CACHE_TTL:
+        rows = db.session.query(
+            Achievement.id, Achievement.name, Achievement.criteria_event,
+            Achievement.criteria_metric, Achievement.criteria_threshold
+        ).filter(
+            Achievement.criteria_event != None,
+            _live()
+        ).all()
+        by_event = {}
+        for aid, name, event, metric, threshold in rows:
+            by_event.setdefault(event, []).append((aid, name, metric, threshold or 0))
+        cache['by_event'] = by_event
+        cache['loaded_at'] = now
+    return cache['by_event']
+
+def invalidate_rule_index():
+    current_app.extensions.pop('achievement_rules', None)
+
+def evaluate_achievement_rules(user_id: str, event: str):
+    """
+    Unlock any rule-based achievements the user now qualifies for.
+
+    Called after a progress/join/redeem commit. Only rules indexed under
+    `event` are considered, each metric is computed at most once, and new
+    unlocks plus their Celebration rows are written in one commit. Errors are
+    logged and rolled back so the triggering request is never affected.
+
+    Returns:
+        list: Names of newly unlocked achievements
+    """
+    try:
+        rules = _rule_index().get(event)
+        if not rules:
+            return []
+
+        rule_ids = [r[0] for r in rules]
+        unlocked_ids = {aid for (aid,) in db.session.query(UserAchievement.achievement_id).filter(
+            UserAchievement.user_id == user_id,
+            UserAchievement.achievement_id.in_(rule_ids)
+        ).all()}
+        pending = [r for r in rules if r[0] not in unlocked_ids]
+        if not pending:
+            return []
+
+        values = {}
+        earned = []
+        for aid, name, metric, threshold in pending:
+            if metric not in values:
+                values[metric] = int(RULE_METRICS[metric][1](user_id) or 0)
+            if values[metric] >= threshold:
+                earned.append((aid, name))
+        if not earned:
+            return []
 
-@achievements_bp.get('/available')  # view available achievements # GET http://127.0.0.1:5001/achievements/available
+        unlocks = [(user_id, aid, name) for aid, name in earned]
+        _insert_unlocks(unlocks)
+        db.session.commit()
+        _celebrate(unlocks)
+
+        names = [name for _, name in earned]
+        L.log(f'Achievements auto-unlocked for {user_id} on {event}: {names}')
+        return names
+    except Exception as e:
+        db.session.rollback()
+        L.error("Error evaluating achievement rules for %s on %s: %s", user_id, event, e)
+        return []
+
+@achievements_bp.get('/available')  # view available achievements # GET http://127.0.0.1:5001/achievements/available?rarity=epic&page=1&per_page=50
 @jwt_required(optional=True)
 def achievements_available():
     user_id = _uid_or_anon()
+    try:
+        limit, offset = _page_args()
+    except ValueError:
+        return jsonify({'error': 'page and per_page must be integers'}), 400
     
-    # Get all achievements (exclude deleted)
-    q = Achievement.query.filter((Achievement.is_deleted == False) | (Achievement.is_deleted == None))
-    items = q.order_by(Achievement.name.asc()).all()
-    
-    # Get user's unlocked achievements
-    unlocked_ids = {ua.achievement_id for ua in UserAchievement.query.filter_by(user_id=user_id).all()}
+    # Live catalog + user's unlock status in one LEFT JOIN
+    stmt = _catalog_select(user_id, request.args.get('rarity'))
+    if limit:
+        stmt = stmt.limit(limit).offset(offset)
     
     # Create response with user-specific status
     result = []
-    for a in items:
-        achievement_data = _ser(a)
-        achievement_data['user_unlocked'] = a.id in unlocked_ids
-        achievement_data['locked'] = 'unlocked' if a.id in unlocked_ids else 'locked'
+    for row in db.session.execute(stmt).all():
+        achievement_data = _ser(row.Achievement)
+        achievement_data['user_unlocked'] = bool(row.unlocked)
+        achievement_data['locked'] = 'unlocked' if row.unlocked else 'locked'
+        achievement_data['points'] = row.points
+        achievement_data['unlock_count'] = row.unlock_count
+        achievement_data['unlocked_by_percent'] = _unlock_percent(row.unlock_count)
         result.append(achievement_data)
     
     return jsonify(result), 200
@@ -92,24 +377,63 @@ def achievements_unlock():
         return jsonify({'error': 'achievement already unlocked by this user'}), 400
 
     # Create user achievement record (don't change global achievement status)
-    ua = UserAchievement(user_id=user_id, achievement_id=a.id)
-    db.session.add(ua)
-    
-    # Create automatic celebration
-    celebration_message = f"{user_id} has unlocked {a.name} achievement! 🎉"
-    celebration = Celebration(
-        user_id=user_id,
-        achievement_name=a.name,
-        message=celebration_message
-    )
-    db.session.add(celebration)
-    
+    unlocks = [(user_id, a.id, a.name)]
+    _insert_unlocks(unlocks)
     db.session.commit()
+    
+    # Automatic celebration, persisted asynchronously by the feed
+    _celebrate(unlocks)
 
     L.log(f'Achievement unlocked by {user_id}: {a.name}')
     return jsonify({'message': 'unlocked', 'achievement': a.name, 'user': user_id}), 200
 
 
+@achievements_bp.post('/grant')  # grant an achievement to many users # POST http://127.0.0.1:5001/achievements/grant - {"achievement_id": 1, "users": ["alice", "bob"]}
+@jwt_required(optional=True)
+def achievements_grant():
+    # Admins only; anonymous callers get the same 403 as non-admins
+    if get_jwt_identity() not in current_app.config.get('ADMIN_USERS', []):
+        return jsonify({'error': 'Admin only'}), 403
+    data = request.get_json(silent=True) or {}
+    achievement_id = data.get('achievement_id')
+    users = data.get('users')
+    if not achievement_id:
+        return jsonify({'error': 'achievement_id is required'}), 400
+    if not isinstance(users, list) or not users:
+        return jsonify({'error': 'users must be a non-empty list'}), 400
+
+    a = Achievement.query.get(achievement_id)
+    if not a or a.is_deleted:
+        return jsonify({'error': 'achievement not found'}), 404
+
+    # Dedupe the request itself, preserving order
+    requested = list(dict.fromkeys(str(u) for u in users if u))
+
+    try:
+        already = {uid for (uid,) in db.session.query(UserAchievement.user_id).filter(
+            UserAchievement.achievement_id == a.id,
+            UserAchievement.user_id.in_(requested)
+        ).all()}
+        granted = [uid for uid in requested if uid not in already]
+
+        unlocks = [(uid, a.id, a.name) for uid in granted]
+        _insert_unlocks(unlocks)
+        db.session.commit()
+        _celebrate(unlocks)
+    except Exception as e:
+        db.session.rollback()
+        L.error("Error granting achievement %s: %s", a.id, e)
+        return jsonify({'error': str(e)}), 500
+
+    L.log(f'Achievement {a.name} granted by {_uid_or_anon()} to {len(granted)} users')
+    return jsonify({
+        'message': 'granted',
+        'achievement': a.name,
+        'granted': granted,
+        'already_unlocked': [uid for uid in requested if uid in already]
+    }), 200
+
+
 @achievements_bp.post('/lock')  # lock achievements
 @jwt_required(optional=True)
 def achievements_lock():
@@ -126,66 +450,141 @@ def achievements_lock():
         return jsonify({'error': 'achievement not unlocked by this user'}), 400
     
     # Remove the user achievement (lock it)
-    db.session.delete(user_achievement)
+    _delete_unlock(user_achievement)
     db.session.commit()
+    refresh_rival_scores(user_achievement.user_id)
     
     L.log(f'Achievement locked by {user_id}: {achievement_id}')
     return jsonify({'message': 'locked', 'achievement_id': achievement_id, 'user': user_id}), 200
 
 
-@achievements_bp.get('/my-progress')  # view achievements progress # GET http://127.0.0.1:5001/achievements/my-progress
+@achievements_bp.get('/my-progress')  # view achievements progress # GET http://127.0.0.1:5001/achievements/my-progress?rarity=rare&page=1&per_page=50
 @jwt_required(optional=True)
 def achievements_my_progress():
     user_id = _uid_or_anon()
-    unlocked = UserAchievement.query.filter_by(user_id=user_id).all()
-    unlocked_ids = {u.achievement_id for u in unlocked}
-    all_ach = Achievement.query.all()
+    try:
+        limit, offset = _page_args()
+    except ValueError:
+        return jsonify({'error': 'page and per_page must be integers'}), 400
+    
+    stmt = _catalog_select(user_id, request.args.get('rarity'))
+    if limit:
+        stmt = stmt.limit(limit).offset(offset)
+    rows = db.session.execute(stmt).all()
     
-    # Calculate total points based on rarity
-    total_points = 0
-    for ua in unlocked:
-        achievement = Achievement.query.get(ua.achievement_id)
-        if achievement:
-                total_points += get_achievement_points(achievement.rarity)
+    # Points are summed in SQL over all matching live achievements, not just this page
+    total_points = int(rows[0].user_total_points or 0) if rows else 0
+    total_count = int(rows[0].total_count) if rows else 0
+    if not rows and offset:
+        # Past the last page: window totals aren't available, fetch them directly
+        first = db.session.execute(_catalog_select(user_id, request.args.get('rarity')).limit(1)).first()
+        total_points = int(first.user_total_points or 0) if first else 0
+        total_count = int(first.total_count) if first else 0
     
     return jsonify({
         'user_id': user_id,
         'total_points': total_points,
-        'unlocked': [_ser(a) for a in all_ach if a.id in unlocked_ids],
-        'locked':   [_ser(a) for a in all_ach if a.id not in unlocked_ids]
+        'total_achievements': total_count,
+        'unlocked': [_ser(r[0]) for r in rows if r.unlocked],
+        'locked':   [_ser(r[0]) for r in rows if not r.unlocked]
     }), 200
 
-@achievements_bp.post('/create-custom')  # create custom achievements # POST http://127.0.0.1:5001/achievements/create-custom - {"name":"My Custom Achievement", "description": "ok?", "rarity": "rare" }
+@achievements_bp.post('/create-custom')  # create custom achievements # POST http://127.0.0.1:5001/achievements/create-custom - {"name":"My Custom Achievement", "description": "ok?", "rarity": "rare", "criteria": {"metric": "max_progress", "gte": 500} }
 #@jwt_required(optional=True)
 def achievements_create_custom():
     data = request.get_json(silent=True) or {}
     name = data.get('name')
     if not name:
         return jsonify({'error': 'name is required'}), 400
+
+    # Optional auto-unlock rule
+    criteria = data.get('criteria') or {}
+    metric = criteria.get('metric')
+    threshold = None
+    if criteria:
+        if metric not in RULE_METRICS:
+            return jsonify({'error': f"criteria.metric must be one of {'|'.join(RULE_METRICS)}"}), 400
+        try:
+            threshold = int(criteria.get('gte', 1))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'criteria.gte must be an integer'}), 400
+
     a = Achievement(
         name=name,
         description=data.get('description'),
         locked=data.get('locked', 'locked'),
-        rarity=data.get('rarity', 'common')
+        rarity=data.get('rarity', 'common'),
+        criteria_event=RULE_METRICS[metric][0] if metric else None,
+        criteria_metric=metric,
+        criteria_threshold=threshold
     )
     db.session.add(a)
     db.session.commit()
+    if metric:
+        invalidate_rule_index()
     return jsonify(_ser(a)), 201
 
+@achievements_bp.get('/stats')  # unlock statistics # GET http://127.0.0.1:5001/achievements/stats?achievement_id=1
+def achievements_stats():
+    q = db.session.query(Achievement, AchievementStats).outerjoin(
+        AchievementStats, AchievementStats.achievement_id == Achievement.id
+    ).filter(_live())
+    achievement_id = request.args.get('achievement_id', type=int)
+    if achievement_id:
+        q = q.filter(Achievement.id == achievement_id)
+
+    result = []
+    for a, stats in q.order_by(Achievement.name.asc()).all():
+        count = stats.unlock_count if stats else 0
+        result.append({
+            'id': a.id,
+            'name': a.name,
+            'rarity': a.rarity,
+            'unlock_count': count,
+            'unlocked_by_percent': _unlock_percent(count),
+            'first_unlocked_at': stats.first_unlocked_at.isoformat() if stats and stats.first_unlocked_at else None,
+            'last_unlocked_at': stats.last_unlocked_at.isoformat() if stats and stats.last_unlocked_at else None
+        })
+    return jsonify({'players': _player_count(), 'stats': result}), 200
+
+@achievements_bp.get('/rarity-points')  # view rarity weights # GET http://127.0.0.1:5001/achievements/rarity-points
+def achievements_rarity_points():
+    rows = RarityPoints.query.order_by(RarityPoints.points.asc()).all()
+    return jsonify({r.rarity: r.points for r in rows}), 200
+
+@achievements_bp.put('/rarity-points')  # re-weight a rarity # PUT http://127.0.0.1:5001/achievements/rarity-points - {"rarity": "epic", "points": 50}
+@jwt_required()
+def achievements_rarity_points_update():
+    # Re-weights every leaderboard at once: admins only, like /users/import
+    if get_jwt_identity() not in current_app.config.get('ADMIN_USERS', []):
+        return jsonify({'error': 'Admin only'}), 403
+    data = request.get_json(silent=True) or {}
+    rarity = (data.get('rarity') or '').strip().lower()
+    if rarity not in RARITY_POINTS:
+        return jsonify({'error': f"rarity must be one of: {', '.join(RARITY_POINTS)}"}), 400
+    try:
+        points = int(data.get('points'))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'points must be integer'}), 400
+    if points < 1:
+        return jsonify({'error': 'points must be at least 1'}), 400
+
+    row = RarityPoints.query.get(rarity)
+    if row:
+        row.points = points
+    else:
+        db.session.add(RarityPoints(rarity=rarity, points=points))
+    db.session.commit()
+    invalidate_rarity_points()
+
+    L.log(f'Rarity points set by {_uid_or_anon()}: {rarity} -> {points}')
+    return jsonify({'rarity': rarity, 'points': points}), 200
+
 @achievements_bp.get('/celebrations')  # view celebrations
 @jwt_required(optional=True)
 def achievements_celebrations():
-    celebrations = Celebration.query.order_by(Celebration.created_at.desc()).limit(20).all()
-    celebration_data = []
-    for c in celebrations:
-        celebration_data.append({
-            'id': c.id,
-            'user_id': c.user_id,
-            'achievement_name': c.achievement_name,
-            'message': c.message,
-            'created_at': c.created_at.isoformat() if c.created_at else None
-        })
-    return jsonify({'celebrations': celebration_data}), 200
+    # Served from this worker's in-memory ring, no DB round trip
+    return jsonify(recent_celebrations()), 200
 
 @achievements_bp.delete('/achievement/remove')  # Remove achievement
 @jwt_required(optional=True)
@@ -207,6 +606,8 @@ def remove_achievement():
     achievement.name = f"{achievement.name}_deleted_{int(datetime.utcnow().timestamp())}"
     
     db.session.commit()
+    if achievement.criteria_event:
+        invalidate_rule_index()
     
     return jsonify({'message': 'achievement removed'}), 200
 
@@ -222,7 +623,8 @@ def remove_user_achievement():
     if not user_achievement:
         return jsonify({'error': 'user achievement not found'}), 404
     
-    db.session.delete(user_achievement)
+    _delete_unlock(user_achievement)
     db.session.commit()
+    refresh_rival_scores(user_achievement.user_id)
     
     return jsonify({'message': 'user achievement removed'}), 200
@@ -2,6 +2,7 @@
 from flask import Blueprint, jsonify, request, render_template
 from ..utils.db import db
 from ..utils.utils import get_achievement_points
+from ..utils.user_directory import user_directory
 from ..models.models import User
 from .games import Competition, Participation, Game, UserCompetition
 from .achievements import Achievement, UserAchievement
@@ -99,11 +100,11 @@ def api_players_grouped():
         grouped[uid]["competitions"].append(title)
         
     # 3. User details (Achievement, Banked, Spent)
+    directory = user_directory().lookup_many(all_users)
     for username in all_users:
         # Banked
-        u_obj = User.query.filter_by(username=username).first()
-        if u_obj:
-            grouped[username]["banked_points"] = u_obj.banked_points
+        if directory[username].exists:
+            grouped[username]["banked_points"] = directory[username].banked_points
             
         # Achievements
         unlocked = UserAchievement.query.filter_by(user_id=username).all()
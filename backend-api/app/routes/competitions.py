@@ -1,9 +1,16 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from ..utils.db import db
+from ..utils.db import db, insert_ignore
+from ..utils.schema import ensure_schema
+from .achievements import evaluate_achievement_rules
 from ..utils.utils import L
+from ..utils.user_directory import invalidate_users
 from datetime import datetime
 from .games import Competition, Participation, UserCompetition  # 👈 use Competition, Participation, and UserCompetition from games.py
+from .games import (
+    bump_participant_count, parse_participants_mode, participants_fields, list_participants,
+    MAX_PARTICIPANTS_PAGE, PARTICIPANTS_MODE_ERROR
+)
 
 competitions_bp = Blueprint('competitions_bp', __name__)
 
@@ -12,32 +19,50 @@ def _uid_or_anon() -> str:
     user = get_jwt_identity()
     return user if user else 'anonymous'
 
-def _ser(c: Competition):
-    # Get participants from both Participation and UserCompetition tables
-    participation_participants = [{'username': p.user_id, 'progress': p.progress} for p in c.participants]
-    user_competitions = UserCompetition.query.filter_by(competition_id=c.id).all()
-    user_competition_participants = [{'username': uc.user_id, 'progress': 0} for uc in user_competitions]
-    all_participants = participation_participants + user_competition_participants
-    
+def _participants_mode():
+    """Parsed ?participants= for the current request (None if invalid)."""
+    return parse_participants_mode(request.args.get('participants'))
+
+def _ser(c: Competition, mode=('count', None)):
     # Calculate duration
     duration = None
     if c.start_at and c.end_at:
         duration_delta = c.end_at - c.start_at
         duration = f"{duration_delta.days} days" if duration_delta.days > 0 else f"{duration_delta.seconds // 3600} hours"
     
-    return {
+    result = {
         "id": c.id,
         "title": getattr(c, "title", None),  # since Competition in games.py uses 'title'
         "description": c.description,
         "start_at": c.start_at.isoformat() if c.start_at else None,
         "end_at": c.end_at.isoformat() if c.end_at else None,
-        "participants": all_participants,
         "duration": duration,
         "is_active": c.is_active,
     }
+    result.update(participants_fields(c, mode))
+    return result
+
+def _upsert_membership(user_id: str, competition_id: int) -> bool:
+    """Idempotently add a UserCompetition row. Returns True if it was new."""
+    inserted = insert_ignore(
+        UserCompetition,
+        [{'user_id': user_id, 'competition_id': competition_id}],
+        ['user_id', 'competition_id']
+    ) > 0
+    if inserted:
+        bump_participant_count(competition_id, 1)
+    return inserted
+
+def _after_join(user_id: str, inserted: bool):
+    """Post-commit hooks for a new membership."""
+    if inserted:
+        evaluate_achievement_rules(user_id, 'join')
 
 def _join_competition(category: str, default_title: str, description: str):
     """Shared logic: ensure competition exists, join it for the current user."""
+    mode = _participants_mode()
+    if mode is None:
+        return jsonify({'error': PARTICIPANTS_MODE_ERROR}), 400
     try:
         comp = Competition.query.filter_by(title=default_title).first()
         if not comp:
@@ -52,14 +77,13 @@ def _join_competition(category: str, default_title: str, description: str):
             db.session.commit()
 
         user_id = _uid_or_anon()
-        # Allow duplicate competitions - users can join multiple of the same competition
-        uc = UserCompetition(user_id=user_id, competition_id=comp.id)
-        db.session.add(uc)
+        inserted = _upsert_membership(user_id, comp.id)
         db.session.commit()
+        _after_join(user_id, inserted)
         L.log(f"Competition joined by {user_id}: {comp.title}")
-        return jsonify({"message": "joined", "competition": _ser(comp)}), 200
+        return jsonify({"message": "joined" if inserted else "already joined", "competition": _ser(comp, mode)}), 200
     except Exception as e:
-        L.log(f"Error in _join_competition: {str(e)}")
+        L.error("Error in _join_competition: %s", e)
         db.session.rollback()
         raise e
 
@@ -72,7 +96,7 @@ def competitions_code_quality():
     try:
         return _join_competition("code-quality", "Code Quality Challenge", "Improve code readability and maintainability")
     except Exception as e:
-        L.log(f"Error in competitions_code_quality: {str(e)}")
+        L.error("Error in competitions_code_quality: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @competitions_bp.post("/learning")
@@ -83,7 +107,7 @@ def competitions_learning():
     try:
         return _join_competition("learning", "Learning Challenge", "Upskill and share knowledge")
     except Exception as e:
-        L.log(f"Error in competitions_learning: {str(e)}")
+        L.error("Error in competitions_learning: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @competitions_bp.post("/fitness")
@@ -94,7 +118,7 @@ def competitions_fitness():
     try:
         return _join_competition("fitness", "Office Fitness Challenge", "Stay active at work")
     except Exception as e:
-        L.log(f"Error in competitions_fitness: {str(e)}")
+        L.error("Error in competitions_fitness: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @competitions_bp.post("/sustainability")
@@ -105,7 +129,7 @@ def competitions_sustainability():
     try:
         return _join_competition("sustainability", "Green Office Challenge", "Promote eco-friendly practices")
     except Exception as e:
-        L.log(f"Error in competitions_sustainability: {str(e)}")
+        L.error("Error in competitions_sustainability: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @competitions_bp.post("/creativity")
@@ -116,7 +140,7 @@ def competitions_creativity():
     try:
         return _join_competition("creativity", "Creativity Challenge", "Express and innovate")
     except Exception as e:
-        L.log(f"Error in competitions_creativity: {str(e)}")
+        L.error("Error in competitions_creativity: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @competitions_bp.post("/team-building")
@@ -127,7 +151,7 @@ def competitions_team_building():
     try:
         return _join_competition("team-building", "Team Building Activity", "Strengthen collaboration")
     except Exception as e:
-        L.log(f"Error in competitions_team_building: {str(e)}")
+        L.error("Error in competitions_team_building: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @competitions_bp.get("/my-competitions")
@@ -135,6 +159,9 @@ def competitions_team_building():
 @jwt_required(optional=True)
 def competitions_my_competitions():
     """View competitions that the current user has joined"""
+    mode = _participants_mode()
+    if mode is None:
+        return jsonify({'error': PARTICIPANTS_MODE_ERROR}), 400
     try:
         user_id = _uid_or_anon()
         
@@ -145,7 +172,7 @@ def competitions_my_competitions():
         # Combine both lists and remove duplicates
         competition_ids = list(set([row[0] for row in participation_ids] + [row[0] for row in user_competition_ids]))
         
-        L.log(f"User {user_id} has {len(competition_ids)} competitions: {competition_ids}")
+        L.debug("User %s has %s competitions: %s", user_id, len(competition_ids), competition_ids)
         
         if not competition_ids:
             return jsonify([]), 200
@@ -156,16 +183,6 @@ def competitions_my_competitions():
         # Copy EXACT logic from games route
         result = []
         for c in competitions:
-            # Get participants from Participation table (games route joins)
-            participation_participants = [{'username': p.user_id, 'progress': p.progress} for p in c.participants]
-            
-            # Get participants from UserCompetition table (competitions route joins)
-            user_competitions = UserCompetition.query.filter_by(competition_id=c.id).all()
-            user_competition_participants = [{'username': uc.user_id, 'progress': 0} for uc in user_competitions]
-            
-            # Combine both lists
-            all_participants = participation_participants + user_competition_participants
-            
             # Check both tables for join date
             participation = Participation.query.filter_by(user_id=user_id, competition_id=c.id).first()
             user_competition = UserCompetition.query.filter_by(user_id=user_id, competition_id=c.id).first()
@@ -176,19 +193,20 @@ def competitions_my_competitions():
             elif participation and participation.updated_at:
                 joined_at = participation.updated_at.isoformat()
             
-            result.append({
+            item = {
                 'id': c.id,
                 'title': c.title,
                 'description': c.description,
                 'start_at': c.start_at.isoformat() if c.start_at else None,
                 'end_at': c.end_at.isoformat() if c.end_at else None,
-                'participants': all_participants,
                 'joined_at': joined_at
-            })
+            }
+            item.update(participants_fields(c, mode))
+            result.append(item)
         
         return jsonify(result), 200
     except Exception as e:
-        L.log(f"Error in competitions_my_competitions: {str(e)}")
+        L.error("Error in competitions_my_competitions: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @competitions_bp.get("/test-joined")
@@ -198,10 +216,10 @@ def test_joined():
 
 @competitions_bp.get("/create-tables")
 def create_tables():
-    """Create database tables"""
+    """Create database tables (normally done once at startup by the schema manager)"""
     try:
-        db.create_all()
-        return jsonify({"message": "Tables created successfully"}), 200
+        elapsed = ensure_schema()
+        return jsonify({"message": "Tables created successfully", "seconds": round(elapsed, 4)}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -209,8 +227,6 @@ def create_tables():
 def debug_competitions():
     """Debug endpoint to see all competitions"""
     try:
-        db.create_all()
-        
         # Get all competitions
         all_competitions = Competition.query.all()
         active_competitions = Competition.query.filter_by(is_active=True).all()
@@ -264,44 +280,35 @@ def test_create_competition():
 
 
 @competitions_bp.get("/all")
-# GET http://127.0.0.1:5001/competitions/all
+# GET http://127.0.0.1:5001/competitions/all?participants=count|none|top:N|all
 @jwt_required(optional=True)
 def competitions_all():
     """View all available competitions"""
+    mode = _participants_mode()
+    if mode is None:
+        return jsonify({'error': PARTICIPANTS_MODE_ERROR}), 400
     try:
-        # Ensure tables exist
-        db.create_all()
-        
         competitions = Competition.query.filter_by(is_active=True).all()
-        L.log(f"Found {len(competitions)} active competitions")
+        L.debug("Found %s active competitions", len(competitions))
         for comp in competitions:
-            L.log(f"Competition: {comp.id} - {comp.title}")
+            L.debug("Competition: %s - %s", comp.id, comp.title)
         
         # Copy EXACT logic from games route
         result = []
         for c in competitions:
-            # Get participants from Participation table (games route joins)
-            participation_participants = [{'username': p.user_id, 'progress': p.progress} for p in c.participants]
-            
-            # Get participants from UserCompetition table (competitions route joins)
-            user_competitions = UserCompetition.query.filter_by(competition_id=c.id).all()
-            user_competition_participants = [{'username': uc.user_id, 'progress': 0} for uc in user_competitions]
-            
-            # Combine both lists
-            all_participants = participation_participants + user_competition_participants
-            
-            result.append({
+            item = {
                 'id': c.id,
                 'title': c.title,
                 'description': c.description,
                 'start_at': c.start_at.isoformat() if c.start_at else None,
                 'end_at': c.end_at.isoformat() if c.end_at else None,
-                'participants': all_participants
-            })
+            }
+            item.update(participants_fields(c, mode))
+            result.append(item)
         
         return jsonify(result), 200
     except Exception as e:
-        L.log(f"Error in competitions_all: {str(e)}")
+        L.error("Error in competitions_all: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @competitions_bp.post("/join")
@@ -316,6 +323,10 @@ def competitions_join():
     if not competition_id:
         return jsonify({'error': 'competition_id is required'}), 400
     
+    mode = _participants_mode()
+    if mode is None:
+        return jsonify({'error': PARTICIPANTS_MODE_ERROR}), 400
+    
     user_id = _uid_or_anon()
     
     # Check if competition exists
@@ -323,13 +334,34 @@ def competitions_join():
     if not comp:
         return jsonify({'error': 'competition not found'}), 404
     
-    # Allow duplicate competitions - users can join multiple of the same competition
-    uc = UserCompetition(user_id=user_id, competition_id=competition_id)
-    db.session.add(uc)
+    inserted = _upsert_membership(user_id, comp.id)
     db.session.commit()
+    _after_join(user_id, inserted)
     
     L.log(f"Competition joined by {user_id}: {comp.title}")
-    return jsonify({"message": "joined", "competition": _ser(comp)}), 200
+    return jsonify({"message": "joined" if inserted else "already joined", "competition": _ser(comp, mode)}), 200
+
+@competitions_bp.get("/<int:competition_id>/participants")
+# GET http://127.0.0.1:5001/competitions/1/participants?page=1&per_page=50
+def competitions_participants(competition_id):
+    """Full participant list for one competition, paginated, highest progress first"""
+    comp = Competition.query.get(competition_id)
+    if not comp:
+        return jsonify({'error': 'competition not found'}), 404
+    
+    try:
+        page = max(1, int(request.args.get('page', 1)))
+        per_page = min(MAX_PARTICIPANTS_PAGE, max(1, int(request.args.get('per_page', 50))))
+    except ValueError:
+        return jsonify({'error': 'page and per_page must be integers'}), 400
+    
+    return jsonify({
+        'competition_id': comp.id,
+        'page': page,
+        'per_page': per_page,
+        'total': comp.participant_count or 0,
+        'participants': list_participants(comp.id, per_page, (page - 1) * per_page)
+    }), 200
 
 @competitions_bp.delete("/leave")
 # DELETE http://127.0.0.1:5001/competitions/leave
@@ -341,19 +373,13 @@ def competitions_leave():
         data = request.get_json(silent=True) or {}
         competition_id = data.get('competition_id')
         
-        L.log(f"Leave request: competition_id={competition_id}, data={data}")
+        L.debug("Leave request: competition_id=%s, data=%s", competition_id, data)
         
         if not competition_id:
             return jsonify({'error': 'competition_id is required'}), 400
         
         user_id = _uid_or_anon()
-        L.log(f"User {user_id} trying to leave competition {competition_id}")
-        
-        # Ensure tables exist
-        try:
-            db.create_all()
-        except Exception as create_error:
-            L.log(f"Error creating tables: {str(create_error)}")
+        L.debug("User %s trying to leave competition %s", user_id, competition_id)
         
         # Check both UserCompetition and Participation tables
         user_competition = UserCompetition.query.filter_by(
@@ -366,16 +392,19 @@ def competitions_leave():
             competition_id=competition_id
         ).first()
         
-        L.log(f"Found user_competition: {user_competition}")
-        L.log(f"Found participation: {participation}")
+        L.debug("Found user_competition: %s", user_competition.id if user_competition else None)
+        L.debug("Found participation: %s", participation.id if participation else None)
         
         if not user_competition and not participation:
             return jsonify({'error': 'user not joined to this competition'}), 404
         
         # Remove from whichever table has the record
+        removed = int(bool(user_competition)) + int(bool(participation))
+        bump_participant_count(competition_id, -removed)
+        
         if user_competition:
             db.session.delete(user_competition)
-            L.log(f"Removed UserCompetition record")
+            L.debug("Removed UserCompetition record")
         
         if participation:
             # Bank points before deleting participation
@@ -385,20 +414,21 @@ def competitions_leave():
                 if user:
                     user.banked_points += int(participation.progress)
                     db.session.add(user)
-                    L.log(f"CRITICAL BANKING: {participation.progress} points for user {user_id} (left comp {competition_id}). New banked: {user.banked_points}")
+                    L.debug("CRITICAL BANKING: %s points for user %s (left comp %s). New banked: %s", participation.progress, user_id, competition_id, user.banked_points)
                 else:
-                    L.log(f"ERROR: Could not find user {user_id} to bank {participation.progress} points.")
+                    L.error("ERROR: Could not find user %s to bank %s points.", user_id, participation.progress)
             
             db.session.flush()
             db.session.delete(participation)
-            L.log(f"Removed Participation record")
+            L.debug("Removed Participation record")
         
         db.session.commit()
+        invalidate_users(user_id)
         
         L.log(f"Competition left by {user_id}: {competition_id}")
         return jsonify({'message': 'left competition', 'competition_id': competition_id}), 200
     except Exception as e:
-        L.log(f"Error in competitions_leave: {str(e)}")
+        L.error("Error in competitions_leave: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @competitions_bp.delete("/remove")
@@ -435,9 +465,9 @@ def competitions_remove():
                 if user:
                     user.banked_points += int(p.progress)
                     db.session.add(user)
-                    L.log(f"CRITICAL BANKING: {p.progress} points for user {p.user_id} (comp {competition_id} removed). New banked: {user.banked_points}")
+                    L.debug("CRITICAL BANKING: %s points for user %s (comp %s removed). New banked: %s", p.progress, p.user_id, competition_id, user.banked_points)
                 else:
-                    L.log(f"ERROR: Could not find user {p.user_id} to bank {p.progress} points.")
+                    L.error("ERROR: Could not find user %s to bank %s points.", p.user_id, p.progress)
         
         db.session.flush()
         Participation.query.filter_by(competition_id=competition_id).delete()
@@ -445,10 +475,11 @@ def competitions_remove():
         # Delete the competition itself
         db.session.delete(comp)
         db.session.commit()
+        invalidate_users(*{p.user_id for p in participations})
         
         L.log(f"Competition deleted: {comp_title} (ID: {competition_id})")
         return jsonify({'message': 'competition deleted', 'competition_id': competition_id}), 200
     except Exception as e:
         db.session.rollback()
-        L.log(f"Error deleting competition: {str(e)}")
+        L.error("Error deleting competition: %s", e)
         return jsonify({'error': f'Failed to delete competition: {str(e)}'}), 500
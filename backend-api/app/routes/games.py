@@ -20,8 +20,12 @@ Key Features:
 
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from ..utils.db import db
+from ..utils.db import db, insert_ignore
 from ..utils.utils import L, get_achievement_points
+from ..utils.logger import DEBUG
+from .achievements import evaluate_achievement_rules
+from .social import refresh_rival_scores
+from ..utils.user_directory import invalidate_users
 from datetime import datetime
 import json
 
@@ -47,6 +51,8 @@ class Competition(db.Model):
         end_at (datetime): Optional end date/time
         is_active (bool): Whether the competition is currently active
         created_at (datetime): When the competition was created
+        participant_count (int): Participation + UserCompetition rows, kept in
+            step by joins/leaves so listings don't load every participant
     """
     __tablename__ = 'competitions'
     
@@ -57,6 +63,7 @@ class Competition(db.Model):
     end_at = db.Column(db.DateTime, nullable=True)
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    participant_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
 
 class Participation(db.Model):
@@ -73,8 +80,13 @@ class Participation(db.Model):
         progress (int): Progress points earned by user (default 0)
         updated_at (datetime): Last time progress was updated
         competition (Competition): Relationship to Competition model
+
+    A user has at most one participation per competition.
     """
     __tablename__ = 'participations'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'competition_id', name='uq_participations_user_competition'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.String(120), nullable=False)
@@ -97,8 +109,13 @@ class UserCompetition(db.Model):
         competition_id (int): Foreign key to Competition
         joined_at (datetime): When the user joined the competition
         competition (Competition): Relationship to Competition model
+
+    A user is a member of a competition at most once.
     """
     __tablename__ = 'user_competitions'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'competition_id', name='uq_user_competitions_user_competition'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.String(120), nullable=False)
@@ -195,6 +212,109 @@ def _dumps(obj):
         return None
 
 
+# Upper bound for top:N and per_page on participant listings
+MAX_PARTICIPANTS_PAGE = 500
+PARTICIPANTS_MODE_ERROR = 'participants must be one of none|count|top:N|all'
+
+def bump_participant_count(competition_id, delta):
+    """
+    Adjust a competition's maintained participant counter in the current transaction.
+
+    Args:
+        competition_id (int): Competition to update
+        delta (int): Number of membership rows added (positive) or removed (negative)
+    """
+    if not delta:
+        return
+    db.session.execute(
+        db.update(Competition)
+        .where(Competition.id == competition_id)
+        .values(participant_count=Competition.participant_count + delta)
+    )
+
+
+def parse_participants_mode(raw):
+    """
+    Parse the ?participants= query parameter.
+
+    Accepted values are none, count (default), top:N and all (full list).
+
+    Args:
+        raw (str): Raw query parameter value
+
+    Returns:
+        tuple: (mode, limit) or None if the value is invalid
+    """
+    if not raw:
+        return ('count', None)
+    raw = raw.strip().lower()
+    if raw in ('none', 'count', 'all'):
+        return (raw, None)
+    if raw.startswith('top:'):
+        try:
+            limit = int(raw[4:])
+        except ValueError:
+            return None
+        if 0 < limit <= MAX_PARTICIPANTS_PAGE:
+            return ('top', limit)
+    return None
+
+
+def participants_query(competition_id):
+    """
+    Participants from both membership tables as one (username, progress) subquery.
+
+    UserCompetition members have no progress tracking and report 0.
+    """
+    return db.union_all(
+        db.select(Participation.user_id.label('username'), Participation.progress.label('progress'))
+        .where(Participation.competition_id == competition_id),
+        db.select(UserCompetition.user_id.label('username'), db.literal(0).label('progress'))
+        .where(UserCompetition.competition_id == competition_id)
+    ).subquery()
+
+
+def list_participants(competition_id, limit, offset=0):
+    """
+    Page through a competition's participants, highest progress first.
+
+    Returns:
+        list: [{'username': str, 'progress': int}, ...]
+    """
+    sub = participants_query(competition_id)
+    rows = db.session.execute(
+        db.select(sub.c.username, sub.c.progress)
+        .order_by(sub.c.progress.desc(), sub.c.username.asc())
+        .limit(limit).offset(offset)
+    ).all()
+    return [{'username': username, 'progress': progress or 0} for username, progress in rows]
+
+
+def participants_fields(comp, mode):
+    """
+    Participant fields for a serialized competition according to a parsed mode.
+
+    Args:
+        comp (Competition): Competition being serialized
+        mode (tuple): Result of parse_participants_mode
+
+    Returns:
+        dict: Fields to merge into the competition payload
+    """
+    kind, limit = mode
+    if kind == 'none':
+        return {}
+    fields = {'participant_count': comp.participant_count or 0}
+    if kind == 'top':
+        fields['participants'] = list_participants(comp.id, limit)
+    elif kind == 'all':
+        fields['participants'] = (
+            [{'username': p.user_id, 'progress': p.progress} for p in comp.participants] +
+            [{'username': uc.user_id, 'progress': 0} for uc in UserCompetition.query.filter_by(competition_id=comp.id).all()]
+        )
+    return fields
+
+
 # =============================================================================
 # API ENDPOINTS
 # =============================================================================
@@ -209,7 +329,7 @@ def create_game():
     try:
         data = request.get_json(silent=True) or {}
         title = data.get('title')
-        L.log(f'Creating competition with data: {data}')
+        L.debug('Creating competition with data: %s', data)
         
         if not title:
             return jsonify({'error': 'title is required'}), 400
@@ -223,17 +343,18 @@ def create_game():
         )
         db.session.add(comp)
         db.session.commit()
-        L.log(f'Competition created #{comp.id} "{comp.title}"')
+        L.info('Competition created #%s "%s"', comp.id, comp.title)
         
-        # Verify it was created
-        all_comps = Competition.query.all()
-        L.log(f'Total competitions in database: {len(all_comps)}')
-        for c in all_comps:
-            L.log(f'  - {c.id}: {c.title} (active: {c.is_active})')
+        if L.enabled_for(DEBUG):
+            # Verify it was created (the query only runs when debug logging is on)
+            all_comps = db.session.query(Competition.id, Competition.title, Competition.is_active).all()
+            L.debug('Total competitions in database: %s', len(all_comps))
+            for c in all_comps:
+                L.debug('  - %s: %s (active: %s)', c.id, c.title, c.is_active)
         
         return jsonify({'id': comp.id, 'title': comp.title}), 201
     except Exception as e:
-        L.log(f'Error creating competition: {str(e)}')
+        L.error('Error creating competition: %s', e)
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
@@ -241,8 +362,6 @@ def create_game():
 def debug_competitions():
     """Debug endpoint to see all competitions from games route"""
     try:
-        db.create_all()
-        
         # Get all competitions
         all_competitions = Competition.query.all()
         active_competitions = Competition.query.filter_by(is_active=True).all()
@@ -258,33 +377,27 @@ def debug_competitions():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@games_bp.get('/active')  # view competition # http://127.0.0.1:5001/games/active
+@games_bp.get('/active')  # view competition # http://127.0.0.1:5001/games/active?participants=count|none|top:N|all
 def active_game():
-    now = datetime.utcnow()
+    mode = parse_participants_mode(request.args.get('participants'))
+    if mode is None:
+        return jsonify({'error': PARTICIPANTS_MODE_ERROR}), 400
+
     q = Competition.query.filter_by(is_active=True)
     # (Optional) filter by time window if desired
     comps = q.all()
     
     result = []
     for c in comps:
-        # Get participants from Participation table (games route joins)
-        participation_participants = [{'username': p.user_id, 'progress': p.progress} for p in c.participants]
-        
-        # Get participants from UserCompetition table (competitions route joins)
-        user_competitions = UserCompetition.query.filter_by(competition_id=c.id).all()
-        user_competition_participants = [{'username': uc.user_id, 'progress': 0} for uc in user_competitions]
-        
-        # Combine both lists
-        all_participants = participation_participants + user_competition_participants
-        
-        result.append({
+        item = {
             'id': c.id,
             'title': c.title,
             'description': c.description,
             'start_at': c.start_at.isoformat() if c.start_at else None,
             'end_at': c.end_at.isoformat() if c.end_at else None,
-            'participants': all_participants
-        })
+        }
+        item.update(participants_fields(c, mode))
+        result.append(item)
     
     return jsonify(result), 200
 
@@ -301,14 +414,22 @@ def join_game():
     if not comp:
         return jsonify({'error': 'competition not found'}), 404
 
-    existing = Participation.query.filter_by(user_id=user_id, competition_id=comp_id).first()
-    if existing:
-        return jsonify({'message': 'already joined', 'participation_id': existing.id}), 200
-
-    p = Participation(user_id=user_id, competition_id=comp_id, progress=0)
-    db.session.add(p)
+    # Single upsert: concurrent joins can't both insert
+    inserted = insert_ignore(
+        Participation,
+        [{'user_id': user_id, 'competition_id': comp.id, 'progress': 0}],
+        ['user_id', 'competition_id']
+    )
+    if inserted:
+        bump_participant_count(comp.id, 1)
     db.session.commit()
-    return jsonify({'message': 'joined', 'participation_id': p.id}), 201
+
+    participation_id = db.session.query(Participation.id).filter_by(user_id=user_id, competition_id=comp.id).scalar()
+    if inserted:
+        evaluate_achievement_rules(user_id, 'join')
+    if not inserted:
+        return jsonify({'message': 'already joined', 'participation_id': participation_id}), 200
+    return jsonify({'message': 'joined', 'participation_id': participation_id}), 201
 
 @games_bp.put('/progress/update')  # competition progress and update #postman - http://127.0.0.1:5001/games/progress/update - PUT { "competition_id": "Game Name", "delta": 10}
 @jwt_required(optional=True)
@@ -340,6 +461,8 @@ def update_progress_game():
         return jsonify({'error': 'delta must be an integer'}), 400
 
     db.session.commit()
+    evaluate_achievement_rules(user_id, 'progress')
+    refresh_rival_scores(user_id)
     return jsonify({'message': 'progress updated', 'progress': p.progress}), 200
 
 @games_bp.get('/rules/update')  # view rules #postman - http://127.0.0.1:5001/games/rules/update - GET
@@ -385,15 +508,16 @@ def remove_competition():
             if user:
                 user.banked_points += int(p.progress)
                 db.session.add(user)
-                L.log(f"CRITICAL BANKING: {p.progress} points for user {p.user_id} (competition {comp_id} removed). New banked: {user.banked_points}")
+                L.debug("CRITICAL BANKING: %s points for user %s (competition %s removed). New banked: %s", p.progress, p.user_id, comp_id, user.banked_points)
             else:
-                L.log(f"ERROR: Could not find user {p.user_id} to bank {p.progress} points.")
+                L.error("ERROR: Could not find user %s to bank %s points.", p.user_id, p.progress)
     
     db.session.flush() # Ensure banking is processed
     Participation.query.filter_by(competition_id=comp_id).delete()
     # Remove the competition
     db.session.delete(comp)
     db.session.commit()
+    invalidate_users(*{p.user_id for p in participations})
     
     return jsonify({'message': 'competition removed'}), 200
 
@@ -416,13 +540,15 @@ def remove_participation():
         if user:
             user.banked_points += int(participation.progress)
             db.session.add(user)
-            L.log(f"CRITICAL BANKING: {participation.progress} points for user {participation.user_id} (participation {part_id} removed). New banked: {user.banked_points}")
+            L.debug("CRITICAL BANKING: %s points for user %s (participation %s removed). New banked: %s", participation.progress, participation.user_id, part_id, user.banked_points)
         else:
-            L.log(f"ERROR: Could not find user {participation.user_id} to bank {participation.progress} points.")
+            L.error("ERROR: Could not find user %s to bank %s points.", participation.user_id, participation.progress)
 
     db.session.flush()
+    bump_participant_count(participation.competition_id, -1)
     db.session.delete(participation)
     db.session.commit()
+    invalidate_users(participation.user_id)
     
     return jsonify({'message': 'participation removed'}), 200
 
@@ -467,13 +593,15 @@ def leave_game():
         if user:
             user.banked_points += int(participation.progress)
             db.session.add(user)
-            L.log(f"CRITICAL BANKING: {participation.progress} points for user {user_id} (left game comp {comp_id}). New banked: {user.banked_points}")
+            L.debug("CRITICAL BANKING: %s points for user %s (left game comp %s). New banked: %s", participation.progress, user_id, comp_id, user.banked_points)
         else:
-            L.log(f"ERROR: Could not find user {user_id} to bank {participation.progress} points.")
+            L.error("ERROR: Could not find user %s to bank %s points.", user_id, participation.progress)
 
     db.session.flush()
+    bump_participant_count(participation.competition_id, -1)
     db.session.delete(participation)
     db.session.commit()
+    invalidate_users(user_id)
     
     L.log(f"User {user_id} left competition {comp_id}")
     return jsonify({'message': 'left competition'}), 200
\ No newline at end of file
@@ -20,6 +20,12 @@ def readiness():
     except Exception as e:
         return jsonify({"status": "not ready", "database": "disconnected", "error": str(e)}), 503
 
+@health_bp.route("/user-directory", methods=["GET"])
+def user_directory_stats():
+    """This worker's username directory cache: size, hits, misses, hit rate"""
+    from ..utils.user_directory import user_directory
+    return jsonify(user_directory().stats()), 200
+
 @health_bp.route("/live", methods=["GET"])
 def liveness():
     """Liveness probe - indicates process is running"""
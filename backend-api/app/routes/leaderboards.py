@@ -1,10 +1,11 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 from ..utils.db import db
 from ..utils.utils import L, get_achievement_points
 from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request, jwt_required
 from datetime import datetime
 from .achievements import UserAchievement, Achievement
-from .social import UserTeam
+from .social import UserTeam, refresh_rival_scores
+from ..utils.user_directory import invalidate_users, user_directory
 from .games import Participation
 from .games import Competition
 
@@ -92,6 +93,7 @@ def leaderboard_global():
     
     # Calculate total points for each user
     leaderboard_data = []
+    directory = user_directory().lookup_many(all_users)  # one query for uncached names
     for user in all_users:
         # Achievement points and get achievement details (prevent duplicates)
         unlocked_achievements = UserAchievement.query.filter_by(user_id=user).all()
@@ -122,14 +124,9 @@ def leaderboard_global():
             manual_points = manual_entry.points
         
         # Banked points from permanent account
-        user_obj = User.query.filter_by(username=user).first()
-        banked_points = user_obj.banked_points if user_obj else 0
+        banked_points = directory[user].banked_points
         
         # Combined game points (participation + manual + banked)
-        # Banked points
-        from ..models.models import User
-        user_obj = User.query.filter_by(username=user).first()
-        banked_points = user_obj.banked_points if user_obj else 0
         combined_game_points = int(participation_points) + manual_points + banked_points + banked_points
         
         # Calculate spent points from redemptions
@@ -154,7 +151,7 @@ def leaderboard_global():
     # Sort by total points descending
     leaderboard_data.sort(key=lambda x: x["points"], reverse=True)
     
-    L.log("Fetched global leaderboard with achievement points")
+    L.info("Fetched global leaderboard with achievement points", sample=0.1)
     return jsonify({"leaderboard": leaderboard_data}), 200
 
 
@@ -174,6 +171,7 @@ def leaderboard_team():
     
     # Calculate total points for each team user
     leaderboard_data = []
+    directory = user_directory().lookup_many(all_users)  # one query for uncached names
     for user in all_users:
         # Achievement points and get achievement details (prevent duplicates)
         unlocked_achievements = UserAchievement.query.filter_by(user_id=user).all()
@@ -205,9 +203,7 @@ def leaderboard_team():
         
         # Combined game points (participation + manual)
         # Banked points
-        from ..models.models import User
-        user_obj = User.query.filter_by(username=user).first()
-        banked_points = user_obj.banked_points if user_obj else 0
+        banked_points = directory[user].banked_points
         combined_game_points = int(participation_points) + manual_points + banked_points
         
         # Calculate spent points from redemptions
@@ -236,7 +232,7 @@ def leaderboard_team():
     # Sort by total points descending
     leaderboard_data.sort(key=lambda x: x["points"], reverse=True)
     
-    L.log("Fetched team leaderboard with achievement points (team members only)")
+    L.info("Fetched team leaderboard with achievement points (team members only)", sample=0.1)
     return jsonify({"leaderboard": leaderboard_data}), 200
 
 
@@ -276,6 +272,7 @@ def leaderboard_monthly():
     
     # Calculate total points for each user
     leaderboard_data = []
+    directory = user_directory().lookup_many(all_users)  # one query for uncached names
     for user in all_users:
         # Achievement points and get achievement details (prevent duplicates)
         unlocked_achievements = UserAchievement.query.filter_by(user_id=user).all()
@@ -307,9 +304,7 @@ def leaderboard_monthly():
         
         # Combined game points (participation + manual)
         # Banked points
-        from ..models.models import User
-        user_obj = User.query.filter_by(username=user).first()
-        banked_points = user_obj.banked_points if user_obj else 0
+        banked_points = directory[user].banked_points
         combined_game_points = int(participation_points) + manual_points + banked_points
         
         # Calculate spent points from redemptions
@@ -330,7 +325,7 @@ def leaderboard_monthly():
     # Sort by points descending
     leaderboard_data.sort(key=lambda x: x["points"], reverse=True)
     
-    L.log("Fetched monthly leaderboard with achievement points")
+    L.info("Fetched monthly leaderboard with achievement points", sample=0.1)
     return jsonify({"leaderboard": leaderboard_data}), 200
 
 
@@ -370,6 +365,7 @@ def leaderboard_hall_of_fame():
     
     # Calculate total points for each user
     leaderboard_data = []
+    directory = user_directory().lookup_many(all_users)  # one query for uncached names
     for user in all_users:
         # Achievement points and get achievement details (prevent duplicates)
         unlocked_achievements = UserAchievement.query.filter_by(user_id=user).all()
@@ -401,9 +397,7 @@ def leaderboard_hall_of_fame():
         
         # Combined game points (participation + manual)
         # Banked points
-        from ..models.models import User
-        user_obj = User.query.filter_by(username=user).first()
-        banked_points = user_obj.banked_points if user_obj else 0
+        banked_points = directory[user].banked_points
         combined_game_points = int(participation_points) + manual_points + banked_points
         
         # Calculate spent points from redemptions
@@ -424,7 +418,7 @@ def leaderboard_hall_of_fame():
     # Sort by points descending
     leaderboard_data.sort(key=lambda x: x["points"], reverse=True)
     
-    L.log("Fetched hall of fame with achievement points")
+    L.info("Fetched hall of fame with achievement points", sample=0.1)
     return jsonify({"hall_of_fame": leaderboard_data}), 200
 
 
@@ -465,7 +459,7 @@ def leaderboard_predictions_view():
             "prediction": pred.prediction,
             "created_at": pred.created_at.isoformat() if pred.created_at else None
         })
-    L.log("Fetched predictions")
+    L.info("Fetched predictions", sample=0.1)
     return jsonify({"predictions": data}), 200
 
 
@@ -513,6 +507,7 @@ def leaderboard_add():
         # Update existing entry
         existing_entry.points = points
         db.session.commit()
+        refresh_rival_scores(user)
         L.log(f"Manual leaderboard update: [{board}] {user} -> {points}")
         return jsonify({"message": "updated", "board": board, "user": user, "points": points}), 200
     else:
@@ -520,6 +515,7 @@ def leaderboard_add():
         row = ManualLeaderboardEntry(user=user, points=points, board=board)
         db.session.add(row)
         db.session.commit()
+        refresh_rival_scores(user)
         L.log(f"Manual leaderboard add: [{board}] {user} -> {points}")
         return jsonify({"message": "added", "board": board, "user": user, "points": points}), 201
 
@@ -549,14 +545,19 @@ def leaderboard_remove():
             for p in participations:
                 if (p.progress or 0) > 0:
                     user_obj.banked_points += int(p.progress)
-                    L.log(f"Banking {p.progress} points for user {username} during user removal.")
+                    L.debug("Banking %s points for user %s during user removal.", p.progress, username)
             db.session.add(user_obj)
         
         # Remove participations and manual entries
+        from .games import bump_participant_count
+        for p in participations:
+            bump_participant_count(p.competition_id, -1)
         Participation.query.filter_by(user_id=username).delete()
         ManualLeaderboardEntry.query.filter_by(user=username).delete()
         ManualLeaderboard.query.filter_by(user=username).delete()
         db.session.commit()
+        invalidate_users(username)
+        refresh_rival_scores(username)
         
         return jsonify({"message": f"User {username} removed from manual leaderboards.", "id": entry_id}), 200
     
@@ -569,6 +570,7 @@ def leaderboard_remove():
         
         db.session.delete(entry)
         db.session.commit()
+        refresh_rival_scores(entry.user)
         L.log(f"Manual leaderboard remove: [{entry.board}] {entry.user} -> {entry.points}")
         return jsonify({"message": "removed", "board": entry.board, "user": entry.user, "points": entry.points}), 200
     except Exception:
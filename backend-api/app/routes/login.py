@@ -1,8 +1,12 @@
-from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
-from flask_jwt_extended import create_access_token, jwt_required, JWTManager, get_jwt_identity
+import io
+from flask import Blueprint, current_app, request, jsonify
+from flask_jwt_extended import create_access_token, jwt_required, JWTManager, get_jwt_identity, get_jwt
 from ..utils.db import db
 from ..utils.utils import L
+from ..utils.passwords import PasswordHasher, PasswordHasherBusy, password_hasher
+from ..utils.user_directory import invalidate_users
+from ..utils.revocation import revoke_token
+from ..utils.user_import import DEFAULT_CHUNK_SIZE, detect_format, import_users, iter_records
 from ..models.models import User
 
 login_bp = Blueprint('login_bp', __name__)
@@ -11,6 +15,12 @@ login_bp = Blueprint('login_bp', __name__)
 #try jwt
 users_db = {} 
 
+def _busy(e):
+    # Hashing pool saturated (login storm): tell clients to back off instead of queueing
+    response = jsonify({"msg": str(e)})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 @login_bp.post('/register') #postman - http://127.0.0.1:5001/register - {"username":"gilad","password":123}
 def register_user():
     """Endpoint to register a new user."""
@@ -26,12 +36,19 @@ def register_user():
     if existing_user:
         return jsonify({"msg": "Username already exists"}), 409
 
+    # Hash on the bounded pool so the KDF never runs on the request thread
+    try:
+        hashed = password_hasher().hash(str(password))
+    except PasswordHasherBusy as e:
+        return _busy(e)
+
     # יצירת אובייקט משתמש חדש והוספתו ל-session של בסיס הנתונים
-    new_user = User(username=username, password=password)
+    new_user = User(username=username, password=hashed)
     db.session.add(new_user)
     
     # ביצוע commit כדי לשמור את השינויים באופן קבוע
     db.session.commit()
+    invalidate_users(username)  # drop any cached "not registered" entry
 
     return jsonify({"msg": "User created successfully!", "username": new_user.username}), 201
 
@@ -46,8 +63,19 @@ def login_user():
         return jsonify({"msg": "Username and password are required"}), 400
 
     # Check user in the database
-    user = User.query.filter_by(username=username, password=password).first()
-    if user:
+    user = User.query.filter_by(username=username).first()
+    try:
+        # Unknown users are verified against a dummy hash so both paths take the same time
+        stored = user.password if user else password_hasher().dummy_hash()
+        ok, needs_rehash = password_hasher().verify(stored, str(password))
+        ok = ok and user is not None
+        if ok and needs_rehash:
+            # Cost changed (or legacy plaintext row): upgrade transparently while we have the password
+            user.password = password_hasher().hash(str(password))
+            db.session.commit()
+    except PasswordHasherBusy as e:
+        return _busy(e)
+    if ok:
         access_token = create_access_token(identity=username)
         return jsonify(access_token=access_token), 200
     else:
@@ -60,4 +88,38 @@ def protected_route():
     # Access the user identity from the JWT
     current_user_username = get_jwt_identity()
     return jsonify(logged_in_as=current_user_username), 200
+
+@login_bp.post('/users/import')# postman - http://127.0.0.1:5001/users/import?format=csv - raw body: username,password\nalice,pw
+@jwt_required()
+def import_users_endpoint():
+    """Admin: stream a CSV/NDJSON body of users into the database in chunks."""
+    if get_jwt_identity() not in current_app.config.get('ADMIN_USERS', []):
+        return jsonify({"msg": "Admin only"}), 403
+    fmt = request.args.get('format') or detect_format(request.content_type)
+    try:
+        chunk_size = max(1, int(request.args.get('chunk_size', DEFAULT_CHUNK_SIZE)))
+        # Read the body as a stream so large files never sit in memory whole
+        lines = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+        # Own pool: a long import must not hold the slots /login and /register hash on
+        hasher = PasswordHasher(method=password_hasher().method, workers=current_app.config.get('PASSWORD_HASH_IMPORT_WORKERS', 2))
+        try:
+            report = import_users(iter_records(lines, fmt), hasher, chunk_size)
+        finally:
+            hasher.shutdown()
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+    except Exception as e:
+        L.error("Bulk user import failed: %s", e)
+        return jsonify({"msg": f"Import failed: {str(e)}"}), 500
+    return jsonify(report), 200
+
+@login_bp.post('/logout')# postman - http://127.0.0.1:5001/logout - auth - bearer Token
+@jwt_required()
+def logout_user():
+    """
+    Revoke the presented token. This worker rejects it immediately; other
+    workers and pods pick the revocation up within REVOCATION_REFRESH_SECONDS.
+    """
+    revoke_token(get_jwt())
+    return jsonify({"msg": "Logged out"}), 200
 #end try jwt
\ No newline at end of file
@@ -27,7 +27,9 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from ..utils.db import db
 from datetime import datetime
 
-from .achievements import UserAchievement, Achievement
+from .achievements import UserAchievement, Achievement, evaluate_achievement_rules
+from .social import refresh_rival_scores
+from ..utils.user_directory import lookup_user
 from ..utils.utils import L, get_achievement_points
 from .games import Participation
 
@@ -92,11 +94,8 @@ def _calculate_user_achievement_points(user_id: str) -> int:
     Calculate total achievement points for a user based on rarity.
     
     This function sums up all achievement points earned by a user,
-    where points are determined by achievement rarity:
-    - Common: 10 points
-    - Rare: 20 points  
-    - Epic: 40 points
-    - Legendary: 80 points
+    where points are determined by achievement rarity via the rarity_points
+    table (defaults: common 10, rare 20, epic 40, legendary 80).
     
     Args:
         user_id (str): User identifier (username or 'anonymous')
@@ -104,13 +103,35 @@ def _calculate_user_achievement_points(user_id: str) -> int:
     Returns:
         int: Total achievement points earned by the user
     """
-    unlocked = UserAchievement.query.filter_by(user_id=user_id).all()
-    total_points = 0
-    for ua in unlocked:
-        achievement = Achievement.query.get(ua.achievement_id)
-        if achievement:
-            total_points += get_achievement_points(achievement.rarity)
-    return total_points
+    from ..models.models import RarityPoints
+    # Summed in SQL against the rarity_points table
+    total_points = db.session.query(
+        db.func.coalesce(db.func.sum(db.func.coalesce(RarityPoints.points, get_achievement_points('common'))), 0)
+    ).select_from(UserAchievement).join(
+        Achievement, Achievement.id == UserAchievement.achievement_id
+    ).outerjoin(
+        RarityPoints, RarityPoints.rarity == Achievement.rarity
+    ).filter(UserAchievement.user_id == user_id).scalar()
+    return int(total_points or 0)
+
+def _banked_points_for_spend(user_id: str) -> int:
+    """Banked points read from the user row, never the directory cache: spending must see the current balance."""
+    from ..models.models import User
+    return int(db.session.query(User.banked_points).filter_by(username=user_id).scalar() or 0)
+
+def user_point_balance(user_id: str) -> int:
+    """
+    Net points for a user: achievements + game progress + manual + banked - spent.
+
+    Same sources as /rewards/my-points, without clamping at zero, so it can be
+    compared between users (e.g. rivalry point differentials).
+    """
+    from .leaderboards import ManualLeaderboardEntry
+    game_points = db.session.query(db.func.coalesce(db.func.sum(Participation.progress), 0)).filter_by(user_id=user_id).scalar() or 0
+    spent = db.session.query(db.func.coalesce(db.func.sum(Redemption.points), 0)).filter_by(user_id=user_id).scalar() or 0
+    manual_points = db.session.query(db.func.coalesce(db.func.sum(ManualLeaderboardEntry.points), 0)).filter_by(user=user_id, board='global').scalar() or 0
+    banked_points = lookup_user(user_id).banked_points
+    return int(_calculate_user_achievement_points(user_id)) + int(game_points) + int(manual_points) + int(banked_points) - int(spent)
 
 # -------------------------------
 # Rewards-related Routes
@@ -155,9 +176,7 @@ def rewards_redeem():
         manual_points = manual_entry.points if manual_entry else 0
         
         # Include banked points from permanent account
-        from ..models.models import User
-        user_obj = User.query.filter_by(username=user).first()
-        banked_points = user_obj.banked_points if user_obj else 0
+        banked_points = _banked_points_for_spend(user)
         
         available = max(0, int(ach_points) + int(game_points) + int(manual_points) + int(banked_points) - int(spent))
         
@@ -168,6 +187,8 @@ def rewards_redeem():
         red = Redemption(user_id=user, reward_id=r.id, points=r.points)
         db.session.add(red)
         db.session.commit()
+        evaluate_achievement_rules(user, 'redeem')
+        refresh_rival_scores(user)
 
         return jsonify({"status": "success", "reward": r.serialize(), "redeemed_by": user, "remaining_points": available - r.points}), 200
     
@@ -190,9 +211,7 @@ def rewards_my_points():
     manual_points = manual_entry.points if manual_entry else 0
     
     # Include banked points from permanent account
-    from ..models.models import User
-    user_obj = User.query.filter_by(username=user).first()
-    banked_points = user_obj.banked_points if user_obj else 0
+    banked_points = lookup_user(user).banked_points
     
     total = int(ach_points) + int(game_points) + int(manual_points) + int(banked_points)
     available = max(0, total - int(spent))
@@ -226,16 +245,12 @@ def rewards_donate_points():
         donor = (get_jwt_identity() or 'anonymous')
         
         # Check if recipient exists in the system
-        from ..models.models import User
         from .leaderboards import ManualLeaderboardEntry
         from .games import Participation, UserCompetition
         from .achievements import UserAchievement
         
-        # Check if recipient is a registered user
-        recipient_user = User.query.filter_by(username=recipient).first()
-        
-        # If not registered, check if they have any data in the system
-        if not recipient_user:
+        # Registered users resolve from the directory cache; only unregistered names probe player data
+        if not lookup_user(recipient).exists:
             has_manual_points = ManualLeaderboardEntry.query.filter_by(user=recipient).first()
             has_participations = Participation.query.filter_by(user_id=recipient).first()
             has_competitions = UserCompetition.query.filter_by(user_id=recipient).first()
@@ -252,8 +267,7 @@ def rewards_donate_points():
         manual_points = manual_entry.points if manual_entry else 0
         
         # Include banked points from permanent account
-        user_obj = User.query.filter_by(username=donor).first()
-        banked_points = user_obj.banked_points if user_obj else 0
+        banked_points = _banked_points_for_spend(donor)
         
         available = max(0, int(ach_points) + int(game_points) + int(manual_points) + int(banked_points) - int(spent))
         
@@ -276,6 +290,7 @@ def rewards_donate_points():
             db.session.add(recipient_entry)
 
         db.session.commit()
+        refresh_rival_scores(donor, recipient)
 
         return jsonify({
             "status": "success",
@@ -1,8 +1,12 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 from flask_jwt_extended import get_jwt_identity, jwt_required
-from ..utils.db import db
+from ..utils.db import db, insert_ignore
 from ..utils.utils import L
 from ..models.models import User
+from ..utils.purger import retention_cutoff
+from ..utils.pagination import MAX_PAGE_SIZE, parse_page_args, keyset_page
+from ..utils.celebration_feed import recent_celebrations
+from ..utils.activity_inbox import inbox_fanout
 from datetime import datetime
 
 social_bp = Blueprint('social_bp', __name__)
@@ -12,6 +16,373 @@ def _uid_or_anon() -> str:
     user = get_jwt_identity()
     return user if user else 'anonymous'
 
+def _live_challenges():
+    """Challenges inside the retention window; expired rows may linger until the next purge."""
+    cutoff = retention_cutoff('challenges')
+    q = Challenge.query
+    return q.filter(Challenge.created_at >= cutoff) if cutoff else q
+
+def _live_activities():
+    cutoff = retention_cutoff('activities')
+    q = SocialActivity.query
+    return q.filter(SocialActivity.created_at >= cutoff) if cutoff else q
+
+def _ser_activity(activity):
+    return {
+        "id": activity.id,
+        "user": activity.user_id,
+        "activity_type": activity.activity_type,
+        "description": activity.description,
+        "team_name": activity.team_name,
+        "members_count": activity.members_count,
+        "member_names": getattr(activity, 'member_names', None) or "",
+        "created_at": activity.created_at.isoformat() if activity.created_at else None
+    }
+
+def _inbox_page(user_id, cursor, limit):
+    """
+    One keyset page of a user's personal feed.
+
+    Normally a single range read on the user's inbox. Members of teams too large
+    to fan out also see their teammates' activities, merged in at read time.
+
+    Returns:
+        tuple: (activities, next_cursor)
+    """
+    q = _live_activities()
+    large_team = db.session.query(UserTeam.team_name).join(Team, Team.name == UserTeam.team_name).filter(
+        UserTeam.user_id == user_id,
+        Team.member_count > current_app.config.get('INBOX_FANOUT_MAX_TEAM', 200)
+    ).scalar()
+    if not large_team:
+        q = q.join(ActivityInbox, ActivityInbox.activity_id == SocialActivity.id).filter(ActivityInbox.user_id == user_id)
+        return keyset_page(q, SocialActivity, cursor, limit, keys=(ActivityInbox.created_at, ActivityInbox.activity_id))
+    delivered = db.select(ActivityInbox.activity_id).where(ActivityInbox.user_id == user_id)
+    teammates = db.select(UserTeam.user_id).where(UserTeam.team_name == large_team)
+    q = q.filter(db.or_(
+        SocialActivity.id.in_(delivered),
+        SocialActivity.user_id.in_(teammates),
+        SocialActivity.team_name == large_team
+    ))
+    return keyset_page(q, SocialActivity, cursor, limit)
+
+def _ser_challenge(challenge):
+    return {
+        "id": challenge.id,
+        "challenger": challenge.challenger,
+        "challenged": challenge.challenged,
+        "challenge": challenge.challenge_text,
+        "created_at": challenge.created_at.isoformat() if challenge.created_at else None
+    }
+
+def _challenges_page():
+    """
+    One keyset page of live challenges, filtered by ?challenger= / ?challenged=.
+
+    Returns:
+        tuple: (serialized challenges, next_cursor)
+    Raises:
+        ValueError: on bad cursor/limit
+    """
+    cursor, limit = parse_page_args(request.args)
+    q = _live_challenges()
+    if request.args.get("challenger"):
+        q = q.filter(Challenge.challenger == request.args["challenger"])
+    if request.args.get("challenged"):
+        q = q.filter(Challenge.challenged == request.args["challenged"])
+    challenges, next_cursor = keyset_page(q, Challenge, cursor, limit)
+    return [_ser_challenge(c) for c in challenges], next_cursor
+
+
+# Longest member preview stored on a team_created activity (column is 500 chars)
+MEMBER_NAMES_PREVIEW = 480
+
+def _member_list(raw):
+    """Dedupe a members payload, preserving order."""
+    if not isinstance(raw, list):
+        raise ValueError("members must be a list")
+    return list(dict.fromkeys(str(m) for m in raw if m))
+
+def _member_preview(members):
+    """Comma-separated names that fit member_names; the full list lives in user_teams."""
+    preview = ""
+    for i, member in enumerate(members):
+        candidate = f"{preview}, {member}" if preview else member
+        more = f" (+{len(members) - i} more)"
+        if len(candidate) + len(more) > MEMBER_NAMES_PREVIEW:
+            return preview + more
+        preview = candidate
+    return preview
+
+def _get_or_create_team(team_name, created_by):
+    insert_ignore(Team, [{'name': team_name, 'created_by': created_by, 'member_count': 0}], ['name'])
+    return Team.query.filter_by(name=team_name).first()
+
+def _bump_team_counts(deltas):
+    """Apply {team_name: delta} to teams.member_count in the current transaction."""
+    for team_name, delta in deltas.items():
+        if delta:
+            db.session.execute(
+                db.update(Team).where(Team.name == team_name).values(member_count=Team.member_count + delta)
+            )
+
+def _remove_memberships(members, team_name=None):
+    """
+    Delete memberships for `members` in one statement (optionally only in `team_name`).
+
+    Returns:
+        list: user_ids that were actually removed
+    """
+    if not members:
+        return []
+    q = db.session.query(UserTeam.user_id, UserTeam.team_name).filter(UserTeam.user_id.in_(members))
+    if team_name:
+        q = q.filter(UserTeam.team_name == team_name)
+    existing = q.all()
+    if not existing:
+        return []
+    deltas = {}
+    for _, name in existing:
+        deltas[name] = deltas.get(name, 0) - 1
+    _bump_team_counts(deltas)
+
+    delete = db.delete(UserTeam).where(UserTeam.user_id.in_(members))
+    if team_name:
+        delete = delete.where(UserTeam.team_name == team_name)
+    db.session.execute(delete)
+    removed = list(dict.fromkeys(uid for uid, _ in existing))
+    _unlink_teammates(removed)
+    return removed
+
+def _add_memberships(team, members):
+    """Move `members` into `team`: one DELETE of their old memberships plus one bulk INSERT."""
+    if not members:
+        return
+    _remove_memberships(members)
+    now = datetime.utcnow()
+    db.session.execute(db.insert(UserTeam), [
+        {'user_id': member, 'team_name': team.name, 'created_at': now} for member in members
+    ])
+    _bump_team_counts({team.name: len(members)})
+    _link_teammates(team.name, members)
+
+# ---------- friends graph ----------
+# Symmetric adjacency list (both directions stored) so a user's colleagues are
+# one index range on friendships.user_id instead of self-joins at read time.
+
+def _prune_friendships():
+    db.session.execute(db.delete(Friendship).where(Friendship.via_team == False, Friendship.challenges <= 0))
+
+def _link_teammates(team_name, members):
+    """Connect newly added `members` with everyone on `team_name` (skipped for teams above FRIENDS_MAX_TEAM)."""
+    roster = [uid for (uid,) in db.session.query(UserTeam.user_id).filter(UserTeam.team_name == team_name).all()]
+    if not members or len(roster) > current_app.config.get('FRIENDS_MAX_TEAM', 100):
+        return
+    now = datetime.utcnow()
+    pairs = {(a, b) for a in members for b in roster if a != b}
+    pairs |= {(b, a) for a, b in pairs}
+    insert_ignore(Friendship, [
+        {'user_id': a, 'friend_id': b, 'via_team': True, 'challenges': 0, 'updated_at': now} for a, b in pairs
+    ], ['user_id', 'friend_id'])
+    # Pairs that were already linked through challenges
+    db.session.execute(db.update(Friendship).where(
+        db.or_(
+            db.and_(Friendship.user_id.in_(members), Friendship.friend_id.in_(roster)),
+            db.and_(Friendship.user_id.in_(roster), Friendship.friend_id.in_(members)),
+        ),
+        Friendship.via_team == False
+    ).values(via_team=True, updated_at=now))
+
+def _unlink_teammates(user_ids):
+    """Drop team edges of users who left their team (a user is on at most one team)."""
+    if not user_ids:
+        return
+    db.session.execute(db.update(Friendship).where(
+        db.or_(Friendship.user_id.in_(user_ids), Friendship.friend_id.in_(user_ids)),
+        Friendship.via_team == True
+    ).values(via_team=False))
+    _prune_friendships()
+
+def _record_challenge_link(challenger, challenged, delta=1):
+    """Add `delta` to the challenge count of the pair in both directions."""
+    if not challenger or not challenged or challenger == challenged:
+        return
+    now = datetime.utcnow()
+    pair = [(challenger, challenged), (challenged, challenger)]
+    if delta > 0:
+        insert_ignore(Friendship, [
+            {'user_id': a, 'friend_id': b, 'via_team': False, 'challenges': 0, 'updated_at': now} for a, b in pair
+        ], ['user_id', 'friend_id'])
+    db.session.execute(db.update(Friendship).where(
+        db.tuple_(Friendship.user_id, Friendship.friend_id).in_(pair)
+    ).values(
+        challenges=db.case((Friendship.challenges + delta < 0, 0), else_=Friendship.challenges + delta),
+        updated_at=now
+    ))
+    if delta < 0:
+        _prune_friendships()
+
+def release_challenge_links(conn, pairs):
+    """
+    Take purged challenges back out of the friendship weights, on the purger's connection.
+
+    Args:
+        conn: Connection whose transaction also deletes the challenges
+        pairs: (challenger, challenged) of each deleted challenge
+    """
+    counts = {}
+    for challenger, challenged in pairs:
+        if challenger and challenged and challenger != challenged:
+            for edge in ((challenger, challenged), (challenged, challenger)):
+                counts[edge] = counts.get(edge, 0) + 1
+    # One UPDATE per distinct decrement rather than per edge
+    by_delta = {}
+    for edge, n in counts.items():
+        by_delta.setdefault(n, []).append(edge)
+    now = datetime.utcnow()
+    for n, edges in by_delta.items():
+        conn.execute(db.update(Friendship).where(
+            db.tuple_(Friendship.user_id, Friendship.friend_id).in_(edges)
+        ).values(
+            challenges=db.case((Friendship.challenges - n < 0, 0), else_=Friendship.challenges - n),
+            updated_at=now
+        ))
+    if counts:
+        conn.execute(db.delete(Friendship).where(Friendship.via_team == False, Friendship.challenges <= 0))
+
+def _friend_suggestions(user_id, limit):
+    """
+    People you may know: friends of friends ranked by mutual friends.
+
+    Bounded two-hop expansion: only the strongest FRIENDS_SUGGEST_SEEDS friends
+    are expanded and at most FRIENDS_SUGGEST_SCAN second-hop edges are scanned,
+    so cost doesn't grow with the size of the graph.
+    """
+    config = current_app.config
+    seeds = db.select(Friendship.friend_id).where(Friendship.user_id == user_id).order_by(
+        Friendship.challenges.desc(), Friendship.friend_id
+    ).limit(config.get('FRIENDS_SUGGEST_SEEDS', 50)).subquery()
+    known = db.select(Friendship.friend_id).where(Friendship.user_id == user_id)
+    hops = db.select(Friendship.friend_id.label('candidate')).where(
+        Friendship.user_id.in_(db.select(seeds.c.friend_id)),
+        Friendship.friend_id != user_id,
+        Friendship.friend_id.not_in(known)
+    ).limit(config.get('FRIENDS_SUGGEST_SCAN', 5000)).subquery()
+    mutual = db.func.count().label('mutual')
+    rows = db.session.query(hops.c.candidate, mutual).group_by(hops.c.candidate).order_by(
+        mutual.desc(), hops.c.candidate
+    ).limit(limit).all()
+    return [{"user": candidate, "mutual_friends": count} for candidate, count in rows]
+
+# ---------- rivalries ----------
+# One row per unordered pair (user_a < user_b) with both players' point balances,
+# refreshed whenever a balance changes, so /rivalries never aggregates at read time.
+# Pairs are ordered here, by code point, and nowhere else: a database comparison
+# would follow the column collation, which on Postgres disagrees for mixed case.
+
+def _rival_pair(u1, u2):
+    return (u1, u2) if u1 < u2 else (u2, u1)
+
+def rebuild_rivalries():
+    """
+    Rebuild the rivalries table from the challenge history still on record. Commits.
+
+    Returns:
+        set: Players with at least one rivalry (refresh their scores next)
+    """
+    directed = db.session.query(
+        Challenge.challenger, Challenge.challenged, db.func.count(), db.func.max(Challenge.created_at)
+    ).filter(Challenge.challenger != Challenge.challenged).group_by(Challenge.challenger, Challenge.challenged).all()
+    pairs = {}
+    for challenger, challenged, count, last in directed:
+        key = _rival_pair(challenger, challenged)
+        prev_count, prev_last = pairs.get(key, (0, None))
+        pairs[key] = (prev_count + count, max(filter(None, (prev_last, last)), default=None))
+    db.session.execute(db.delete(Rivalry))
+    db.session.add_all([
+        Rivalry(user_a=a, user_b=b, challenges=count, last_challenge_at=last, score_a=0, score_b=0)
+        for (a, b), (count, last) in pairs.items()
+    ])
+    db.session.commit()
+    return {u for pair in pairs for u in pair}
+
+def _record_rivalry(challenger, challenged, delta=1, at=None):
+    """Count a challenge between the pair (in the caller's transaction)."""
+    if not challenger or not challenged or challenger == challenged:
+        return
+    from .rewards import user_point_balance
+    user_a, user_b = _rival_pair(challenger, challenged)
+    if delta > 0 and not db.session.get(Rivalry, (user_a, user_b)):
+        insert_ignore(Rivalry, [{
+            'user_a': user_a, 'user_b': user_b, 'challenges': 0,
+            'score_a': user_point_balance(user_a), 'score_b': user_point_balance(user_b)
+        }], ['user_a', 'user_b'])
+    values = {'challenges': db.case((Rivalry.challenges + delta < 0, 0), else_=Rivalry.challenges + delta)}
+    if delta > 0:
+        values['last_challenge_at'] = at or datetime.utcnow()
+    where = (Rivalry.user_a == user_a, Rivalry.user_b == user_b)
+    db.session.execute(db.update(Rivalry).where(*where).values(**values))
+    if delta < 0:
+        db.session.execute(db.delete(Rivalry).where(*where, Rivalry.challenges <= 0))
+
+def refresh_rival_scores(*user_ids):
+    """
+    Store the current point balance of `user_ids` on their rivalry rows.
+
+    Called after a commit that changed someone's points; users without
+    rivalries cost two indexed lookups. Commits its own transaction and
+    logs errors so the triggering request is never affected.
+    """
+    from .rewards import user_point_balance
+    try:
+        user_ids = [u for u in user_ids if u]
+        if not user_ids:
+            return
+        rivals = {u for (u,) in db.session.query(Rivalry.user_a).filter(Rivalry.user_a.in_(user_ids)).distinct()}
+        rivals |= {u for (u,) in db.session.query(Rivalry.user_b).filter(Rivalry.user_b.in_(user_ids)).distinct()}
+        if not rivals:
+            return
+        for user_id in rivals:
+            score = user_point_balance(user_id)
+            db.session.execute(db.update(Rivalry).where(Rivalry.user_a == user_id).values(score_a=score))
+            db.session.execute(db.update(Rivalry).where(Rivalry.user_b == user_id).values(score_b=score))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        L.error("Error refreshing rivalry scores for %s: %s", user_ids, e)
+
+def _top_rivals(user_id, limit):
+    """A user's rivals by challenge count: one UNION ALL over the two indexed sides of the pair."""
+    as_a = db.select(
+        Rivalry.user_b.label('rival'), Rivalry.challenges, Rivalry.last_challenge_at,
+        Rivalry.score_a.label('points'), Rivalry.score_b.label('rival_points')
+    ).where(Rivalry.user_a == user_id)
+    as_b = db.select(
+        Rivalry.user_a.label('rival'), Rivalry.challenges, Rivalry.last_challenge_at,
+        Rivalry.score_b.label('points'), Rivalry.score_a.label('rival_points')
+    ).where(Rivalry.user_b == user_id)
+    both = db.union_all(as_a, as_b).subquery()
+    rows = db.session.execute(db.select(both).order_by(
+        both.c.challenges.desc(), both.c.last_challenge_at.desc(), both.c.rival
+    ).limit(limit)).all()
+    return [{
+        "rival": r.rival,
+        "challenges": r.challenges,
+        "last_challenge_at": r.last_challenge_at.isoformat() if r.last_challenge_at else None,
+        "points": r.points,
+        "rival_points": r.rival_points,
+        "point_differential": r.points - r.rival_points
+    } for r in rows]
+
+def _ser_team(team):
+    return {
+        "id": team.id,
+        "name": team.name,
+        "member_count": team.member_count,
+        "created_by": team.created_by,
+        "created_at": team.created_at.isoformat() if team.created_at else None
+    }
+
 
 # ---------- ROUTES ----------
 
@@ -33,13 +404,14 @@ def social_teams_create():
         if not team_name:
             return jsonify({"status": "error", "message": "team_name is required"}), 400
 
-        # Create UserTeam records for each member
-        for member in members:
-            # Remove existing team membership for this user
-            UserTeam.query.filter_by(user_id=member).delete()
-            # Add new team membership
-            user_team = UserTeam(user_id=member, team_name=team_name)
-            db.session.add(user_team)
+        try:
+            members = _member_list(members)
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+
+        # Members leave any previous team: one DELETE + one bulk INSERT regardless of team size
+        team = _get_or_create_team(team_name, uid)
+        _add_memberships(team, members)
 
         # Record team creation activity
         activity = SocialActivity(
@@ -48,10 +420,11 @@ def social_teams_create():
             description=f"Created team '{team_name}' with {len(members)} members",
             team_name=team_name,
             members_count=len(members),
-            member_names=", ".join(members) if members else ""
+            member_names=_member_preview(members)
         )
         db.session.add(activity)
         db.session.commit()
+        inbox_fanout().publish([activity.id])
 
         return jsonify({
             "status": "success",
@@ -62,12 +435,92 @@ def social_teams_create():
         return jsonify({"status": "error", "message": f"Failed to create team: {str(e)}"}), 500
 
 
+@social_bp.get("/teams")
+# GET http://127.0.0.1:5001/social/teams
+def social_teams():
+    teams = Team.query.order_by(Team.name.asc()).all()
+    return jsonify({"teams": [_ser_team(t) for t in teams]}), 200
+
+
+@social_bp.get("/teams/<team_name>")
+# GET http://127.0.0.1:5001/social/teams/Winners
+def social_team_view(team_name):
+    team = Team.query.filter_by(name=team_name).first()
+    if not team:
+        return jsonify({"status": "error", "message": "team not found"}), 404
+    members = [uid for (uid,) in db.session.query(UserTeam.user_id).filter_by(team_name=team_name).order_by(UserTeam.user_id).all()]
+    return jsonify({"team": _ser_team(team), "members": members}), 200
+
+
+@social_bp.post("/teams/<team_name>/members")
+# POST http://127.0.0.1:5001/social/teams/Winners/members
+# Body: { "members": ["carol"] }
+@jwt_required(optional=True)
+def social_team_add_members(team_name):
+    try:
+        team = Team.query.filter_by(name=team_name).first()
+        if not team:
+            return jsonify({"status": "error", "message": "team not found"}), 404
+        try:
+            members = _member_list((request.get_json(silent=True) or {}).get("members", []))
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+
+        _add_memberships(team, members)
+        db.session.commit()
+        db.session.refresh(team)
+        return jsonify({"status": "success", "team": _ser_team(team), "added": members}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"status": "error", "message": f"Failed to add members: {str(e)}"}), 500
+
+
+@social_bp.delete("/teams/<team_name>/members")
+# DELETE http://127.0.0.1:5001/social/teams/Winners/members
+# Body: { "members": ["carol"] }
+@jwt_required(optional=True)
+def social_team_remove_members(team_name):
+    try:
+        team = Team.query.filter_by(name=team_name).first()
+        if not team:
+            return jsonify({"status": "error", "message": "team not found"}), 404
+        try:
+            members = _member_list((request.get_json(silent=True) or {}).get("members", []))
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+
+        removed = _remove_memberships(members, team_name)
+        db.session.commit()
+        db.session.refresh(team)
+        return jsonify({"status": "success", "team": _ser_team(team), "removed": removed}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"status": "error", "message": f"Failed to remove members: {str(e)}"}), 500
+
+
 @social_bp.get("/friends")  # צפייה בחברים/עמיתים מהמשרד
-# GET http://127.0.0.1:5001/social/friends
+# GET http://127.0.0.1:5001/social/friends?limit=50&suggestions=10 - auth - bearer Token
+@jwt_required(optional=True)
 def social_friends():
-    data = []
-    # L.log("Fetched friends list")
-    return jsonify({"friends": data}), 200
+    try:
+        user_id = _uid_or_anon()
+        try:
+            limit = min(MAX_PAGE_SIZE, max(1, int(request.args.get("limit", 50))))
+            suggestions = min(MAX_PAGE_SIZE, max(0, int(request.args.get("suggestions", 10))))
+        except ValueError:
+            return jsonify({"status": "error", "message": "limit and suggestions must be integers"}), 400
+
+        friends = Friendship.query.filter(Friendship.user_id == user_id).order_by(
+            Friendship.challenges.desc(), Friendship.friend_id
+        ).limit(limit).all()
+        data = [{"user": f.friend_id, "teammate": f.via_team, "challenges": f.challenges} for f in friends]
+        # L.log("Fetched friends list")
+        return jsonify({
+            "friends": data,
+            "suggestions": _friend_suggestions(user_id, suggestions) if suggestions else []
+        }), 200
+    except Exception as e:
+        return jsonify({"status": "error", "message": f"Failed to fetch friends: {str(e)}"}), 500
 
 
 @social_bp.post("/challenges/send")  # שליחת אתגרים אישיים
@@ -91,6 +544,8 @@ def social_challenges_send():
         # Store challenge in database
         challenge_entry = Challenge(challenger=uid, challenged=target, challenge_text=challenge)
         db.session.add(challenge_entry)
+        _record_challenge_link(uid, target)
+        _record_rivalry(uid, target)
         db.session.commit()
         
         # Record challenge activity
@@ -100,10 +555,12 @@ def social_challenges_send():
             description=f"Sent challenge to {target}: {challenge}",
             team_name=None,
             members_count=None,
-            member_names=None
+            member_names=None,
+            target_user=target
         )
         db.session.add(activity)
         db.session.commit()
+        inbox_fanout().publish([activity.id])
 
         # L.log(f"Challenge sent by {uid} to {target}: {challenge}")
         return jsonify({
@@ -114,109 +571,83 @@ def social_challenges_send():
             "challenge": challenge
         }), 200
     except Exception as e:
-        # L.log(f"Error sending challenge: {str(e)}")
+        db.session.rollback()
+        L.error("Error sending challenge: %s", e)
         return jsonify({"status": "error", "message": "Failed to send challenge"}), 500
 
 
 @social_bp.get("/challenges/view")
-# GET http://127.0.0.1:5001/social/challenges/view
+# GET http://127.0.0.1:5001/social/challenges/view?challenged=alice&limit=20&cursor=<next_cursor>
 @jwt_required(optional=True)
 def social_challenges_view():
     try:
-        # Clean up old challenges (older than 7 days to keep them longer than activities)
-        from datetime import datetime, timedelta
-        one_week_ago = datetime.utcnow() - timedelta(days=7)
-        old_challenges = Challenge.query.filter(Challenge.created_at < one_week_ago).all()
-        for challenge in old_challenges:
-            db.session.delete(challenge)
-        db.session.commit()
-        
-        challenges = Challenge.query.order_by(Challenge.created_at.desc()).limit(20).all()
-        data = []
-        for challenge in challenges:
-            data.append({
-                "id": challenge.id,
-                "challenger": challenge.challenger,
-                "challenged": challenge.challenged,
-                "challenge": challenge.challenge_text,
-                "created_at": challenge.created_at.isoformat() if challenge.created_at else None
-            })
-        return jsonify({"challenges": data}), 200
+        # Pure read: expired challenges are deleted by the background purger
+        data, next_cursor = _challenges_page()
+        return jsonify({"challenges": data, "next_cursor": next_cursor}), 200
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
     except Exception as e:
         return jsonify({"status": "error", "message": f"Failed to fetch challenges: {str(e)}"}), 500
 
 
 @social_bp.get("/activity-feed")  # פיד של פעילות חברתית
-# GET http://127.0.0.1:5001/social/activity-feed
+# GET http://127.0.0.1:5001/social/activity-feed?user_id=alice&activity_type=team_created&limit=20&cursor=<next_cursor>
 def social_activity_feed():
     try:
-        # Clean up old activities (older than 1 day)
-        from datetime import datetime, timedelta
-        one_day_ago = datetime.utcnow() - timedelta(days=1)
-        old_activities = SocialActivity.query.filter(SocialActivity.created_at < one_day_ago).all()
-        for activity in old_activities:
-            db.session.delete(activity)
-        db.session.commit()
+        try:
+            cursor, limit = parse_page_args(request.args)
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
         
-        activities = SocialActivity.query.order_by(SocialActivity.created_at.desc()).limit(20).all()
-        data = []
-        for activity in activities:
-            data.append({
-                "id": activity.id,
-                "user": activity.user_id,
-                "activity_type": activity.activity_type,
-                "description": activity.description,
-                "team_name": activity.team_name,
-                "members_count": activity.members_count,
-                "member_names": getattr(activity, 'member_names', None) or "",
-                "created_at": activity.created_at.isoformat() if activity.created_at else None
-            })
+        # Pure read: expired activities are deleted by the background purger
+        q = _live_activities()
+        if request.args.get("user_id"):
+            q = q.filter(SocialActivity.user_id == request.args["user_id"])
+        if request.args.get("activity_type"):
+            q = q.filter(SocialActivity.activity_type == request.args["activity_type"])
+        activities, next_cursor = keyset_page(q, SocialActivity, cursor, limit)
         # L.log("Fetched activity feed")
-        return jsonify({"feed": data}), 200
+        return jsonify({"feed": [_ser_activity(a) for a in activities], "next_cursor": next_cursor}), 200
     except Exception as e:
         return jsonify({"status": "error", "message": f"Failed to fetch activity feed: {str(e)}"}), 500
 
 
+@social_bp.get("/inbox")  # Personal feed: own, teammates' and incoming-challenge activity
+# GET http://127.0.0.1:5001/social/inbox?limit=20&cursor=<next_cursor> - auth - bearer Token
+@jwt_required(optional=True)
+def social_inbox():
+    try:
+        try:
+            cursor, limit = parse_page_args(request.args)
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        # Only ever the caller's own inbox: it includes challenges sent to them
+        activities, next_cursor = _inbox_page(_uid_or_anon(), cursor, limit)
+        return jsonify({"feed": [_ser_activity(a) for a in activities], "next_cursor": next_cursor}), 200
+    except Exception as e:
+        return jsonify({"status": "error", "message": f"Failed to fetch inbox: {str(e)}"}), 500
+
+
 @social_bp.get("/celebrations")  # View celebrations
 def social_celebrations():
     try:
-        # Fetch celebrations from achievements endpoint
-        from flask import current_app
-        with current_app.test_client() as client:
-            response = client.get('/achievements/celebrations')
-            if response.status_code == 200:
-                data = response.get_json()
-                return jsonify(data), 200
-            else:
-                return jsonify({"celebrations": []}), 200
+        # Same payload as /achievements/celebrations, read directly from the shared feed
+        return jsonify(recent_celebrations()), 200
     except Exception as e:
         return jsonify({"celebrations": []}), 200
 
 
 @social_bp.get("/rivalries")  # יריבויות משרדיות מהנות
-# GET http://127.0.0.1:5001/social/rivalries
+# GET http://127.0.0.1:5001/social/rivalries?user_id=bob&limit=10
 @jwt_required(optional=True)
 def social_rivalries():
     try:
-        # Clean up old challenges (older than 7 days)
-        from datetime import datetime, timedelta
-        one_week_ago = datetime.utcnow() - timedelta(days=7)
-        old_challenges = Challenge.query.filter(Challenge.created_at < one_week_ago).all()
-        for challenge in old_challenges:
-            db.session.delete(challenge)
-        db.session.commit()
-        
-        challenges = Challenge.query.order_by(Challenge.created_at.desc()).limit(20).all()
-        data = []
-        for challenge in challenges:
-            data.append({
-                "id": challenge.id,
-                "challenger": challenge.challenger,
-                "challenged": challenge.challenged,
-                "challenge": challenge.challenge_text,
-                "created_at": challenge.created_at.isoformat() if challenge.created_at else None
-            })
-        return jsonify({"rivalries": data}), 200
+        user_id = request.args.get("user_id") or _uid_or_anon()
+        try:
+            limit = min(MAX_PAGE_SIZE, max(1, int(request.args.get("limit", 10))))
+        except ValueError:
+            return jsonify({"status": "error", "message": "limit must be an integer"}), 400
+        return jsonify({"user": user_id, "rivalries": _top_rivals(user_id, limit)}), 200
     except Exception as e:
         return jsonify({"status": "error", "message": f"Failed to fetch rivalries: {str(e)}"}), 500
 
@@ -240,6 +671,7 @@ def social_activity_remove():
         if not activity:
             return jsonify({"status": "error", "message": "activity not found"}), 404
         
+        db.session.execute(db.delete(ActivityInbox).where(ActivityInbox.activity_id == activity_id))
         db.session.delete(activity)
         db.session.commit()
         return jsonify({"status": "success", "message": "Activity removed successfully"}), 200
@@ -266,6 +698,8 @@ def social_challenges_remove():
         if not challenge:
             return jsonify({"status": "error", "message": "challenge not found"}), 404
         
+        _record_challenge_link(challenge.challenger, challenge.challenged, -1)
+        _record_rivalry(challenge.challenger, challenge.challenged, -1)
         db.session.delete(challenge)
         db.session.commit()
         return jsonify({"status": "success", "message": "Challenge removed successfully"}), 200
@@ -274,15 +708,56 @@ def social_challenges_remove():
 
 
 # --- Models ---
+class Team(db.Model):
+    __tablename__ = 'teams'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(150), nullable=False, unique=True)
+    created_by = db.Column(db.String(120), nullable=True)
+    member_count = db.Column(db.Integer, nullable=False, default=0)  # kept in step with user_teams
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class Friendship(db.Model):
+    __tablename__ = 'friendships'
+    # One row per direction; (user_id, friend_id) is the primary key and the read path
+    __table_args__ = (
+        db.Index('ix_friendships_friend', 'friend_id'),
+    )
+    user_id = db.Column(db.String(120), primary_key=True)
+    friend_id = db.Column(db.String(120), primary_key=True)
+    via_team = db.Column(db.Boolean, nullable=False, default=False)  # currently on the same team
+    challenges = db.Column(db.Integer, nullable=False, default=0)    # challenges exchanged, either way
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class Rivalry(db.Model):
+    __tablename__ = 'rivalries'
+    # Unordered pair stored once with user_a < user_b (ordered by _rival_pair; no CHECK, whose
+    # collation-dependent order could disagree); each side has its own index for "my rivals"
+    __table_args__ = (
+        db.Index('ix_rivalries_a_challenges', 'user_a', 'challenges'),
+        db.Index('ix_rivalries_b_challenges', 'user_b', 'challenges'),
+    )
+    user_a = db.Column(db.String(120), primary_key=True)
+    user_b = db.Column(db.String(120), primary_key=True)
+    challenges = db.Column(db.Integer, nullable=False, default=0)
+    last_challenge_at = db.Column(db.DateTime, nullable=True)
+    score_a = db.Column(db.Integer, nullable=False, default=0)  # point balances, see rewards.user_point_balance
+    score_b = db.Column(db.Integer, nullable=False, default=0)
+
 class UserTeam(db.Model):
     __tablename__ = 'user_teams'
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.String(120), nullable=False)
-    team_name = db.Column(db.String(150), nullable=False)
+    user_id = db.Column(db.String(120), nullable=False, index=True)
+    team_name = db.Column(db.String(150), nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class SocialActivity(db.Model):
     __tablename__ = 'social_activities'
+    # Keyset pagination on (created_at, id), optionally narrowed by user or type
+    __table_args__ = (
+        db.Index('ix_social_activities_created_id', 'created_at', 'id'),
+        db.Index('ix_social_activities_user_created_id', 'user_id', 'created_at', 'id'),
+        db.Index('ix_social_activities_type_created_id', 'activity_type', 'created_at', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.String(120), nullable=False)
     activity_type = db.Column(db.String(50), nullable=False)  # team_created, challenge_sent, etc.
@@ -290,11 +765,31 @@ class SocialActivity(db.Model):
     team_name = db.Column(db.String(150), nullable=True)
     members_count = db.Column(db.Integer, nullable=True)
     member_names = db.Column(db.String(500), nullable=True)
+    target_user = db.Column(db.String(120), nullable=True)  # e.g. the challenged user; receives it in their inbox
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 
+class ActivityInbox(db.Model):
+    __tablename__ = 'activity_inbox'
+    # A personal feed page is one range scan on (user_id, created_at, activity_id)
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'activity_id', name='uq_activity_inbox_user_activity'),
+        db.Index('ix_activity_inbox_user_created_activity', 'user_id', 'created_at', 'activity_id'),
+        db.Index('ix_activity_inbox_created_id', 'created_at', 'id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.String(120), nullable=False)
+    activity_id = db.Column(db.Integer, db.ForeignKey('social_activities.id', ondelete='CASCADE'), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)  # copied from the activity
+
+
 class Challenge(db.Model):
     __tablename__ = 'social_challenges'
+    __table_args__ = (
+        db.Index('ix_social_challenges_created_id', 'created_at', 'id'),
+        db.Index('ix_social_challenges_challenger_created_id', 'challenger', 'created_at', 'id'),
+        db.Index('ix_social_challenges_challenged_created_id', 'challenged', 'created_at', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     challenger = db.Column(db.String(120), nullable=False)
     challenged = db.Column(db.String(120), nullable=False)
@@ -9,3 +9,639 @@ def test_metrics_endpoint(client):
     assert response.status_code == 200
     # Check for any prometheus content
     assert b'# HELP' in response.data or b'# TYPE' in response.data
+
+def _create_competition(client, title="Chess"):
+    response = client.post('/games/create', json={"title": title})
+    assert response.status_code == 201
+    return response.json['id']
+
+def _auth(app, user):
+    from flask_jwt_extended import create_access_token
+    app.config['JWT_SECRET_KEY'] = "test"
+    with app.app_context():
+        return {"Authorization": f"Bearer {create_access_token(identity=user)}"}
+
+def _admin(app, user="boss"):
+    app.config['ADMIN_USERS'] = [user]
+    return _auth(app, user)
+
+def test_competition_join_is_idempotent(client):
+    from app.routes.games import UserCompetition
+    comp_id = _create_competition(client)
+    first = client.post('/competitions/join', json={"competition_id": comp_id})
+    second = client.post('/competitions/join', json={"competition_id": comp_id})
+    assert first.json['message'] == 'joined'
+    assert second.json['message'] == 'already joined'
+    assert UserCompetition.query.filter_by(competition_id=comp_id).count() == 1
+
+def test_game_join_is_idempotent(client):
+    comp_id = _create_competition(client)
+    first = client.post('/games/join', json={"competition_id": comp_id})
+    second = client.post('/games/join', json={"competition_id": comp_id})
+    assert first.status_code == 201
+    assert second.status_code == 200
+    assert first.json['participation_id'] == second.json['participation_id']
+
+def test_active_competitions_default_to_participant_count(client):
+    comp_id = _create_competition(client)
+    client.post('/games/join', json={"competition_id": comp_id})
+    client.post('/competitions/join', json={"competition_id": comp_id})
+    client.post('/competitions/join', json={"competition_id": comp_id})
+
+    comp = client.get('/games/active').json[0]
+    assert comp['participant_count'] == 2
+    assert 'participants' not in comp
+
+    comp = client.get('/competitions/all?participants=top:1').json[0]
+    assert comp['participants'] == [{"username": "anonymous", "progress": 0}]
+    assert 'participant_count' not in client.get('/competitions/all?participants=none').json[0]
+    assert client.get('/games/active?participants=bogus').status_code == 400
+
+def test_competition_participants_paginated(client):
+    comp_id = _create_competition(client)
+    client.post('/games/join', json={"competition_id": comp_id})
+    client.delete('/games/leave', json={"competition_id": comp_id})
+    response = client.get(f'/competitions/{comp_id}/participants?per_page=10')
+    assert response.status_code == 200
+    assert response.json['total'] == 0
+    assert response.json['participants'] == []
+
+def test_schema_manager_is_idempotent(client):
+    from app.utils.schema import ensure_schema
+    assert ensure_schema() >= 0
+    assert ensure_schema() >= 0
+    assert client.get('/competitions/all').status_code == 200
+
+def test_rule_based_achievement_unlocks_on_join_and_progress(client):
+    from app.routes.achievements import UserAchievement, Celebration
+    client.post('/achievements/create-custom', json={"name": "Joiner", "criteria": {"metric": "competitions_joined", "gte": 2}})
+    client.post('/achievements/create-custom', json={"name": "Grinder", "criteria": {"metric": "max_progress", "gte": 500}})
+    first = _create_competition(client, "One")
+    second = _create_competition(client, "Two")
+
+    client.post('/games/join', json={"competition_id": first})
+    assert UserAchievement.query.count() == 0
+    client.post('/competitions/join', json={"competition_id": second})
+    assert [c.achievement_name for c in Celebration.query.all()] == ["Joiner"]
+
+    client.put('/games/progress/update', json={"competition_id": first, "delta": 500})
+    client.put('/games/progress/update', json={"competition_id": first, "delta": 1})
+    assert UserAchievement.query.count() == 2
+
+def test_rule_criteria_validated(client):
+    response = client.post('/achievements/create-custom', json={"name": "Bad", "criteria": {"metric": "nope"}})
+    assert response.status_code == 400
+
+def test_bulk_grant_skips_existing_unlocks(app, client):
+    from app.routes.achievements import UserAchievement, Celebration
+    ach_id = client.post('/achievements/create-custom', json={"name": "Team Player"}).json['id']
+    body = {"achievement_id": ach_id, "users": ["alice"]}
+    assert client.post('/achievements/grant', json=body).status_code == 403
+    assert client.post('/achievements/grant', json=body, headers=_auth(app, "mallory")).status_code == 403
+    admin = _admin(app)
+    client.post('/achievements/grant', json=body, headers=admin)
+    response = client.post('/achievements/grant', json={"achievement_id": ach_id, "users": ["alice", "bob", "carol", "bob"]}, headers=admin)
+    assert response.status_code == 200
+    assert response.json['granted'] == ["bob", "carol"]
+    assert response.json['already_unlocked'] == ["alice"]
+    assert UserAchievement.query.filter_by(achievement_id=ach_id).count() == 3
+    assert Celebration.query.count() == 3
+
+def test_my_progress_sums_points_in_sql_and_skips_deleted(client):
+    rare = client.post('/achievements/create-custom', json={"name": "Rare One", "rarity": "rare"}).json['id']
+    epic = client.post('/achievements/create-custom', json={"name": "Epic One", "rarity": "epic"}).json['id']
+    gone = client.post('/achievements/create-custom', json={"name": "Gone", "rarity": "legendary"}).json['id']
+    for ach_id in (rare, epic, gone):
+        client.post('/achievements/unlock', json={"achievement_id": ach_id})
+    client.delete('/achievements/achievement/remove', json={"id": gone})
+
+    progress = client.get('/achievements/my-progress').json
+    assert progress['total_points'] == 60
+    assert sorted(a['name'] for a in progress['unlocked']) == ["Epic One", "Rare One"]
+
+    page = client.get('/achievements/my-progress?rarity=rare&page=1&per_page=1').json
+    assert page['total_points'] == 20
+    assert [a['name'] for a in page['unlocked']] == ["Rare One"]
+
+    available = client.get('/achievements/available?per_page=1&page=2').json
+    assert [a['name'] for a in available] == ["Rare One"]
+    assert available[0]['user_unlocked'] is True
+
+def test_rarity_points_reweight_applies_to_scoring(app, client):
+    assert client.get('/achievements/rarity-points').json['legendary'] == 80
+    ach_id = client.post('/achievements/create-custom', json={"name": "Big", "rarity": "legendary"}).json['id']
+    client.post('/achievements/unlock', json={"achievement_id": ach_id})
+    app.config['ADMIN_USERS'] = ["boss"]
+    admin = _auth(app, "boss")
+    assert client.put('/achievements/rarity-points', json={"rarity": "legendary", "points": 1000}, headers=_auth(app, "eve")).status_code == 403
+    assert client.put('/achievements/rarity-points', json={"rarity": "mythic", "points": 5}, headers=admin).status_code == 400
+    assert client.put('/achievements/rarity-points', json={"rarity": "legendary", "points": 0}, headers=admin).status_code == 400
+    assert client.put('/achievements/rarity-points', json={"rarity": "legendary", "points": 100}, headers=admin).status_code == 200
+    assert client.get('/achievements/my-progress').json['total_points'] == 100
+    assert client.get('/rewards/my-points').json['achievement_points'] == 100
+
+def test_celebrations_served_from_feed(client):
+    ach_id = client.post('/achievements/create-custom', json={"name": "Party"}).json['id']
+    client.post('/achievements/unlock', json={"achievement_id": ach_id})
+    feed = client.get('/achievements/celebrations').json['celebrations']
+    assert [c['achievement_name'] for c in feed] == ["Party"]
+    assert feed[0]['id'] is not None
+
+def test_celebration_feed_batches_writes_and_stays_bounded(app, client):
+    from app.utils.celebration_feed import CelebrationFeed
+    from app.routes.achievements import Celebration
+    feed = CelebrationFeed(app, size=2, async_writes=False)
+    feed.async_writes = True  # queue without starting the writer thread
+    feed.publish_many([("a", "One"), ("b", "Two"), ("c", "Three")])
+    assert [c['user_id'] for c in feed.latest()] == ["c", "b"]
+    assert Celebration.query.count() == 0
+    assert feed.flush() == 3
+    assert Celebration.query.count() == 3
+
+def test_batch_writer_bounds_backlog_and_gives_up_on_failing_batch(app, client):
+    from app.utils.batch_writer import BatchWriter
+
+    class Failing(BatchWriter):
+        def _write(self, batch):
+            raise RuntimeError("db down")
+
+    writer = Failing(app, max_pending=3, max_retries=2)
+    writer.enqueue([1, 2, 3, 4, 5])
+    assert writer._pending == [3, 4, 5] and writer.dropped == 2
+    assert writer.flush() == 0
+    assert writer._pending == [3, 4, 5]  # retried on the next flush
+    writer.flush()
+    assert writer._pending == [] and writer.dropped == 5
+
+def test_achievement_stats_maintained_incrementally(app, client):
+    for name in ("alice", "bob"):
+        client.post('/register', json={"username": name, "password": "pw"})
+    ach_id = client.post('/achievements/create-custom', json={"name": "Popular"}).json['id']
+    client.post('/achievements/grant', json={"achievement_id": ach_id, "users": ["alice", "bob"]}, headers=_admin(app))
+    client.post('/achievements/unlock', json={"achievement_id": ach_id})
+    client.post('/achievements/lock', json={"achievement_id": ach_id})
+
+    stats = client.get(f'/achievements/stats?achievement_id={ach_id}').json['stats'][0]
+    assert stats['unlock_count'] == 2
+    assert stats['unlocked_by_percent'] == 100.0
+    assert stats['first_unlocked_at'] is not None
+    assert client.get('/achievements/available').json[0]['unlock_count'] == 2
+
+def test_achievement_stats_backfill_matches_incremental_counts(app, client):
+    from app import db
+    from app.routes.achievements import AchievementStats, UserAchievement, _insert_unlocks, rebuild_achievement_stats
+    ach_id = client.post('/achievements/create-custom', json={"name": "Twice"}).json['id']
+
+    def incremental():
+        db.session.expire_all()
+        return db.session.get(AchievementStats, ach_id).unlock_count
+
+    def backfilled():
+        rebuild_achievement_stats()
+        db.session.commit()
+        return db.session.get(AchievementStats, ach_id).unlock_count
+
+    client.post('/achievements/grant', json={"achievement_id": ach_id, "users": ["alice", "bob"]}, headers=_admin(app))
+    _insert_unlocks([("carol", ach_id, "Twice"), ("carol", ach_id, "Twice")])  # one holder, two rows
+    db.session.commit()
+    assert incremental() == backfilled() == 3
+
+    # Dropping one of carol's two rows leaves her a holder
+    dup = UserAchievement.query.filter_by(user_id="carol").first()
+    client.delete('/achievements/user-achievement/remove', json={"id": dup.id})
+    assert incremental() == backfilled() == 3
+    client.post('/achievements/grant', json={"achievement_id": ach_id, "users": ["dan"]}, headers=_admin(app))
+    assert incremental() == backfilled() == 4
+
+def test_purger_removes_expired_rows_and_reads_hide_them(app, client):
+    from datetime import datetime, timedelta
+    from app import db
+    from app.routes.social import Challenge, Friendship, SocialActivity, _record_challenge_link
+    old = datetime.utcnow() - timedelta(days=8)
+    db.session.add_all([
+        Challenge(challenger="a", challenged="b", challenge_text="old", created_at=old),
+        Challenge(challenger="a", challenged="b", challenge_text="new"),
+        Challenge(challenger="c", challenged="d", challenge_text="old", created_at=old),
+        SocialActivity(user_id="a", activity_type="x", description="old", created_at=old),
+    ])
+    for pair in (("a", "b"), ("a", "b"), ("c", "d")):
+        _record_challenge_link(*pair)
+    db.session.commit()
+
+    assert [c['challenge'] for c in client.get('/social/challenges/view').json['challenges']] == ["new"]
+    assert Challenge.query.count() == 3  # GET no longer deletes
+
+    removed = app.extensions['retention_purger'].run_once()
+    assert removed['challenges'] == 2 and removed['activities'] == 1
+    assert Challenge.query.count() == 1
+    assert SocialActivity.query.count() == 0
+    # Purged challenges leave the friendship weights too
+    db.session.expire_all()
+    assert {(f.user_id, f.friend_id): f.challenges for f in Friendship.query.all()} == {("a", "b"): 1, ("b", "a"): 1}
+
+def test_challenges_keyset_pagination_and_filters(client):
+    for i in range(5):
+        client.post('/social/challenges/send', json={"to": "alice" if i % 2 else "bob", "challenge": f"c{i}"})
+
+    first = client.get('/social/challenges/view?limit=2').json
+    assert [c['challenge'] for c in first['challenges']] == ["c4", "c3"]
+    second = client.get(f"/social/challenges/view?limit=2&cursor={first['next_cursor']}").json
+    assert [c['challenge'] for c in second['challenges']] == ["c2", "c1"]
+    last = client.get(f"/social/challenges/view?limit=2&cursor={second['next_cursor']}").json
+    assert [c['challenge'] for c in last['challenges']] == ["c0"]
+    assert last['next_cursor'] is None
+
+    mine = client.get('/social/challenges/view?challenged=alice').json['challenges']
+    assert [c['challenge'] for c in mine] == ["c3", "c1"]
+    assert client.get('/social/activity-feed?cursor=garbage').status_code == 400
+
+def test_social_celebrations_matches_achievements_feed(client):
+    ach_id = client.post('/achievements/create-custom', json={"name": "Shared"}).json['id']
+    client.post('/achievements/unlock', json={"achievement_id": ach_id})
+    assert client.get('/social/celebrations').json == client.get('/achievements/celebrations').json
+
+def test_team_membership_bulk_updates_keep_counts(client):
+    members = [f"user{i}" for i in range(200)]
+    res = client.post('/social/teams/create', json={"team_name": "Big", "members": members + ["user0"]})
+    assert res.status_code == 201
+    client.post('/social/teams/create', json={"team_name": "Small", "members": ["user0", "user1"]})
+
+    teams = {t['name']: t['member_count'] for t in client.get('/social/teams').json['teams']}
+    assert teams == {"Big": 198, "Small": 2}
+
+    client.post('/social/teams/Small/members', json={"members": ["user2"]})
+    removed = client.delete('/social/teams/Small/members', json={"members": ["user1", "nobody"]}).json
+    assert removed['removed'] == ["user1"]
+    view = client.get('/social/teams/Small').json
+    assert view['members'] == ["user0", "user2"] and view['team']['member_count'] == 2
+    assert client.get('/social/teams/Big').json['team']['member_count'] == 197
+
+    activity = client.get('/social/activity-feed?activity_type=team_created').json['feed'][-1]
+    assert len(activity['member_names']) <= 500 and activity['member_names'].endswith("more)")
+
+def test_personal_inbox_fans_out_to_teammates_and_challenged(app, client):
+    client.post('/social/teams/create', json={"team_name": "Red", "members": ["alice", "bob"]})
+    client.post('/social/challenges/send', json={"to": "bob", "challenge": "Plank-off"})
+
+    bob = client.get('/social/inbox', headers=_auth(app, "bob")).json['feed']
+    assert [a['activity_type'] for a in bob] == ["challenge_sent", "team_created"]
+    assert [a['activity_type'] for a in client.get('/social/inbox', headers=_auth(app, "alice")).json['feed']] == ["team_created"]
+    assert client.get('/social/inbox', headers=_auth(app, "dave")).json['feed'] == []
+    # Nobody can read someone else's inbox
+    assert client.get('/social/inbox?user_id=bob', headers=_auth(app, "dave")).json['feed'] == []
+
+    # Above the fan-out limit, teammates' activity is merged in on read instead
+    app.config['INBOX_FANOUT_MAX_TEAM'] = app.extensions['inbox_fanout'].max_team = 1
+    client.post('/social/teams/create', json={"team_name": "Blue", "members": ["carol", "erin"]})
+    from app.routes.social import ActivityInbox
+    assert ActivityInbox.query.filter_by(user_id="erin").count() == 0
+    assert [a['team_name'] for a in client.get('/social/inbox', headers=_auth(app, "erin")).json['feed']] == ["Blue"]
+
+def test_friends_graph_from_teams_and_challenges(app, client):
+    client.post('/social/teams/create', json={"team_name": "Red", "members": ["alice", "bob"]})
+    client.post('/social/teams/create', json={"team_name": "Blue", "members": ["bob2", "carol"]})
+    client.post('/social/challenges/send', json={"to": "bob", "challenge": "Sprint"})  # from anonymous
+    client.post('/social/challenges/send', json={"to": "carol", "challenge": "Quiz"})
+
+    alice = client.get('/social/friends', headers=_auth(app, "alice")).json
+    assert alice['friends'] == [{"user": "bob", "teammate": True, "challenges": 0}]
+    assert alice['suggestions'] == [{"user": "anonymous", "mutual_friends": 1}]
+    anon = client.get('/social/friends').json['friends']
+    assert {f['user'] for f in anon} == {"bob", "carol"}
+
+    # Leaving the team drops the team edge; challenge edges stay
+    client.delete('/social/teams/Red/members', json={"members": ["bob"]})
+    assert client.get('/social/friends?user_id=bob', headers=_auth(app, "alice")).json['friends'] == []
+    assert [f['user'] for f in client.get('/social/friends', headers=_auth(app, "bob")).json['friends']] == ["anonymous"]
+
+def test_rivalries_precomputed_per_pair(client):
+    cid = _create_competition(client)
+    client.post('/games/join', json={"competition_id": cid})
+    client.post('/leaderboards/add', json={"user": "bob", "points": 30})
+    client.post('/social/challenges/send', json={"to": "bob", "challenge": "Round 1"})
+    client.post('/social/challenges/send', json={"to": "bob", "challenge": "Round 2"})
+    client.post('/social/challenges/send', json={"to": "carol", "challenge": "Round 1"})
+
+    # Score change after the rivalry exists is reflected without recomputing at read time
+    client.put('/games/progress/update', json={"competition_id": cid, "delta": 50})
+
+    rivals = client.get('/social/rivalries').json['rivalries']
+    assert [r['rival'] for r in rivals] == ["bob", "carol"]
+    assert rivals[0]['challenges'] == 2 and rivals[0]['point_differential'] == 20
+    bob = client.get('/social/rivalries?user_id=bob').json['rivalries'][0]
+    assert bob['rival'] == "anonymous" and bob['point_differential'] == -20
+
+def test_rivalries_mixed_case_pair_has_one_key(app, client):
+    from app.routes.social import Rivalry, rebuild_rivalries
+    client.post('/social/challenges/send', json={"to": "alice", "challenge": "Race"}, headers=_auth(app, "Bob"))
+    client.post('/social/challenges/send', json={"to": "Bob", "challenge": "Rematch"}, headers=_auth(app, "alice"))
+    assert [(r.user_a, r.user_b, r.challenges) for r in Rivalry.query.all()] == [("Bob", "alice", 2)]
+
+    # The rebuild keys pairs exactly like the request path
+    rebuild_rivalries()
+    assert [(r.user_a, r.user_b, r.challenges) for r in Rivalry.query.all()] == [("Bob", "alice", 2)]
+    rivals = client.get('/social/rivalries', headers=_auth(app, "alice")).json['rivalries']
+    assert rivals[0]['rival'] == "Bob" and rivals[0]['challenges'] == 2
+
+def test_passwords_hashed_and_rehashed_on_login(app, client):
+    from app import db
+    from app.models.models import User
+    app.config['JWT_SECRET_KEY'] = "test"
+    client.post('/register', json={"username": "hasher", "password": "s3cret"})
+    user = User.query.filter_by(username="hasher").first()
+    assert user.password.startswith("scrypt:") and "s3cret" not in user.password
+    assert client.post('/login', json={"username": "hasher", "password": "nope"}).status_code == 401
+    # Unknown users pay for a KDF run with the configured method too
+    assert client.post('/login', json={"username": "ghost", "password": "s3cret"}).status_code == 401
+    assert app.extensions['password_hasher'].dummy_hash().startswith("scrypt:")
+
+    # Raising the cost upgrades the stored hash on the next successful login
+    app.extensions['password_hasher'].method = "pbkdf2:sha256:1000"
+    assert client.post('/login', json={"username": "hasher", "password": "s3cret"}).status_code == 200
+    assert User.query.filter_by(username="hasher").first().password.startswith("pbkdf2:sha256:1000$")
+
+    # Legacy plaintext rows still log in and get hashed
+    db.session.add(User(username="legacy", password="old"))
+    db.session.commit()
+    assert client.post('/login', json={"username": "legacy", "password": "old"}).status_code == 200
+    assert User.query.filter_by(username="legacy").first().password.startswith("pbkdf2:")
+
+def test_user_directory_caches_lookups_and_invalidates(app, client):
+    from app.utils.user_directory import lookup_user
+    directory = app.extensions['user_directory']
+
+    assert lookup_user("zoe").exists is False  # negative entry
+    assert lookup_user("zoe").exists is False
+    client.post('/register', json={"username": "zoe", "password": "pw"})
+    assert lookup_user("zoe").exists is True   # register invalidated the negative entry
+
+    client.post('/leaderboards/add', json={"user": "zoe", "points": 5})
+    client.get('/leaderboards/global')
+    stats = client.get('/health/user-directory').json
+    assert stats['hits'] >= 2 and stats['misses'] >= 2 and 0 < stats['hit_rate'] < 1
+    assert directory.stats() == stats
+
+    # Spending reads the user row, not an entry another worker has not invalidated yet
+    from app import db
+    from app.models.models import User
+    reward = client.post('/rewards/add', json={"name": "Mug", "points": 50}).json['reward']
+    User.query.filter_by(username="zoe").update({"banked_points": 50})
+    db.session.commit()
+    assert lookup_user("zoe").banked_points == 0
+    res = client.post('/rewards/redeem', json={"reward_id": reward['id']}, headers=_auth(app, "zoe"))
+    assert res.status_code == 200 and res.json['remaining_points'] == 5
+
+def test_logout_revokes_token(app, client):
+    app.config['JWT_SECRET_KEY'] = "test"
+    client.post('/register', json={"username": "leaver", "password": "pw"})
+    token = client.post('/login', json={"username": "leaver", "password": "pw"}).json['access_token']
+    other = client.post('/login', json={"username": "leaver", "password": "pw"}).json['access_token']
+    auth = {"Authorization": f"Bearer {token}"}
+
+    assert client.get('/protected', headers=auth).status_code == 200
+    assert client.post('/logout', headers=auth).status_code == 200
+    assert client.get('/protected', headers=auth).status_code == 401
+    assert client.get('/protected', headers={"Authorization": f"Bearer {other}"}).status_code == 200
+
+    # A fresh worker learns about the revocation from the store
+    from app.utils.revocation import RevocationStore
+    store = RevocationStore()
+    from flask_jwt_extended import decode_token
+    assert store.is_revoked(decode_token(other)['jti']) is False
+    assert store.is_revoked(decode_token(token, allow_expired=True)['jti']) is True
+
+    # A revocation whose lower id commits after a higher one was synced is still picked up
+    from app import db
+    from app.models.models import RevokedToken
+    db.session.add(RevokedToken(id=1000, jti="early-commit"))
+    db.session.commit()
+    store._sync()
+    db.session.add(RevokedToken(id=999, jti="late-commit"))
+    db.session.commit()
+    store._sync()
+    assert "late-commit" in store._bloom and store.is_revoked("late-commit") is True
+
+def test_rate_limit_returns_429_and_sheds_when_saturated(tmp_path):
+    from app import create_app
+    from app.utils.rate_limit import SqliteBucketStore
+    limited = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        "RATE_LIMIT_ENABLED": True,
+        "RATE_LIMIT_DEFAULT": None,
+        "RATE_LIMITS": {"leaderboards_bp.leaderboard_global": (0.001, 2)},
+    })
+    client = limited.test_client()
+    assert [client.get('/leaderboards/global').status_code for _ in range(3)] == [200, 200, 429]
+    res = client.get('/leaderboards/global')
+    assert res.status_code == 429 and int(res.headers['Retry-After']) >= 1
+    # Budgets are per client
+    assert client.get('/leaderboards/global', environ_base={"REMOTE_ADDR": "10.0.0.9"}).status_code == 200
+    # A spoofed X-Forwarded-For does not mint a fresh budget
+    assert client.get('/leaderboards/global', headers={"X-Forwarded-For": "203.0.113.7"}).status_code == 429
+    assert client.get('/health/').status_code == 200
+
+    limiter = limited.extensions['rate_limiter']
+    limiter.max_in_flight = 1
+    assert limiter.acquire_slot()
+    res = client.get('/achievements/celebrations')
+    assert res.status_code == 503 and res.headers['Retry-After'] == "1"
+    limiter.release_slot()
+    assert client.get('/achievements/celebrations').status_code == 200
+
+    # Behind one trusted proxy only the hop it appended counts
+    proxied = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        "RATE_LIMIT_ENABLED": True,
+        "RATE_LIMIT_DEFAULT": None,
+        "RATE_LIMITS": {"leaderboards_bp.leaderboard_global": (0.001, 1)},
+        "TRUSTED_PROXY_HOPS": 1,
+    }).test_client()
+    spoofed = [proxied.get('/leaderboards/global', headers={"X-Forwarded-For": f"198.51.100.{i}, 10.1.1.1"}).status_code for i in range(3)]
+    assert spoofed == [200, 429, 429]
+
+    # Shared store: a second worker's view of the same file sees the spent tokens
+    path = str(tmp_path / "buckets.db")
+    assert SqliteBucketStore(path).take("k", 0.001, 1) == 0
+    assert SqliteBucketStore(path).take("k", 0.001, 1) > 0
+
+def test_bulk_user_import_cli_and_endpoint(app, client, tmp_path):
+    from app.models.models import User
+    app.config.update(JWT_SECRET_KEY="test", ADMIN_USERS=["boss"])
+    app.extensions['password_hasher'].method = "pbkdf2:sha256:1000"
+    client.post('/register', json={"username": "boss", "password": "pw"})
+
+    csv_file = tmp_path / "users.csv"
+    csv_file.write_text("username,password\nu1,a\nu2,b\nu1,dup\nboss,x\n,missing\n")
+    result = app.test_cli_runner().invoke(args=["import-users", str(csv_file), "--chunk-size", "2", "--workers", "2"])
+    assert result.exit_code == 0, result.output
+    assert '"imported": 2, "existing": 2' in result.output  # u1 repeats across chunks
+
+    token = client.post('/login', json={"username": "boss", "password": "pw"}).json['access_token']
+    def _shared_pool_used(passwords):
+        raise AssertionError("bulk import must not hash on the request-path pool")
+    app.extensions['password_hasher'].hash_many = _shared_pool_used
+    body = '{"username": "u3", "password": "c"}\n{"username": "u2", "password": "b"}\nnot json\n'
+    res = client.post('/users/import', data=body, content_type='application/x-ndjson',
+                      headers={"Authorization": f"Bearer {token}"})
+    assert res.json['imported'] == 1 and res.json['existing'] == 1 and res.json['invalid'] == 1
+    assert client.post('/login', json={"username": "u3", "password": "c"}).status_code == 200
+    assert User.query.count() == 4
+
+def test_bulk_user_import_skips_users_registered_mid_chunk(app, client, monkeypatch):
+    from app import db
+    from app.models.models import User
+    from app.utils import user_import
+    from app.utils.user_import import import_users
+
+    class RacingHasher:
+        """Registers one of the names after the dedupe query, like a concurrent /register."""
+        def hash_many(self, passwords):
+            db.session.add(User(username="racer", password="x", banked_points=0))
+            db.session.commit()
+            return [f"h:{p}" for p in passwords]
+
+    report = import_users([{"username": "racer", "password": "a"}, {"username": "calm", "password": "b"}], RacingHasher())
+    assert report["imported"] == 1 and report["existing"] == 1
+    assert User.query.filter_by(username="racer").one().password == "x"
+
+    # Postgres path: COPY into staging, then INSERT ... ON CONFLICT DO NOTHING reports what landed
+    executed = []
+
+    class Cursor:
+        rowcount = 1
+        def __enter__(self):
+            return self
+        def __exit__(self, *exc):
+            return False
+        def execute(self, sql):
+            executed.append(sql)
+        def copy_expert(self, sql, buf):
+            executed.append(sql)
+
+    class Raw:
+        dbapi_connection = type("Conn", (), {"cursor": lambda self: Cursor()})()
+
+    monkeypatch.setattr(db.session, "connection", lambda: type("C", (), {"connection": Raw()})())
+    rows = [{"username": "a", "password": "h", "banked_points": 0}, {"username": "b", "password": "h", "banked_points": 0}]
+    assert user_import._copy_rows(rows) == 1
+    assert any("ON CONFLICT (username) DO NOTHING" in sql for sql in executed)
+
+def test_logger_writes_batches_in_background(tmp_path):
+    from app.utils.logger import Logger
+    path = tmp_path / "app.log"
+    log = Logger(str(path), batch_size=10, flush_interval=0.05)
+    for i in range(25):
+        log.log(f"line {i}")
+    log.flush()
+    lines = path.read_text().splitlines()
+    assert len(lines) == 25 and lines[0].endswith("line 0 ") and lines[0].startswith("[")
+    log.log("last")
+    log.close()
+    assert path.read_text().splitlines()[-1].endswith("last ")
+
+def test_logger_levels_lazy_args_json_and_sampling(tmp_path):
+    import json
+    from app.utils.logger import Logger, DEBUG
+    path = tmp_path / "app.jsonl"
+    log = Logger(str(path), level='INFO', fmt='json', flush_interval=0.05)
+
+    class Exploding:
+        def __str__(self):
+            raise AssertionError("formatted a filtered record")
+
+    log.debug("hidden %s", Exploding())
+    assert not log.enabled_for(DEBUG)
+    log.info("banked %s points for %s", 5, "alice", board="global")
+    log.error("never sampled", sample=0.0)
+    log.close()
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(records) == 1
+    assert records[0]["level"] == "INFO" and records[0]["msg"] == "banked 5 points for alice" and records[0]["board"] == "global"
+
+def test_logger_survives_unformattable_arguments(tmp_path):
+    from app.utils.logger import Logger
+    path = tmp_path / "app.log"
+    log = Logger(str(path), flush_interval=0.05)
+
+    class Bad:
+        def __str__(self):
+            raise RuntimeError("boom")
+
+    log.info("a %s", Bad())
+    log.info("after %s", 1)
+    log.flush()
+    assert log._thread.is_alive()
+    lines = path.read_text().splitlines()
+    assert "unformattable" in lines[0] and lines[1].endswith("after 1 ")
+
+    # A writer that has died (here: stopped behind the logger's back) is replaced on the next record
+    from app.utils.logger import _STOP
+    log._queue.put(_STOP)
+    log._thread.join()
+    log.info("restarted")
+    log.close()
+    assert path.read_text().splitlines()[-1].endswith("restarted ")
+
+def test_logger_rotates_compresses_and_keeps_backup_count(tmp_path):
+    import gzip
+    import time
+    from app.utils.logger import Logger
+    path = tmp_path / "app.log"
+    log = Logger(str(path), batch_size=1, flush_interval=0.01, max_bytes=200, backup_count=2)
+    for i in range(40):
+        log.info("rotating line %s", i)
+        log.flush()
+    log.close()
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        segments = sorted(p.name for p in tmp_path.glob("app.log.*"))
+        if len(segments) == 2 and all(name.endswith(".gz") for name in segments):
+            break
+        time.sleep(0.05)
+    assert len(segments) == 2 and all(name.endswith(".gz") for name in segments)
+    assert path.stat().st_size <= 200
+    assert "rotating line 39" in path.read_text()
+    assert "rotating line" in gzip.decompress((tmp_path / segments[-1]).read_bytes()).decode()
+
+
+def test_logger_max_age_counts_from_segment_start(tmp_path):
+    import os
+    from app.utils.logger import Logger
+    path = tmp_path / "aged.log"
+    log = Logger(str(path), flush_interval=0.01, max_age=60)
+    log.info("first")
+    log.flush()
+    log.close()
+    # Later writes bump the mtime, but a restarted worker still sees the segment's real start
+    start = float((tmp_path / ".aged.log.start").read_text())
+    os.utime(path, (start + 30, start + 30))
+    with open(path, 'a+') as f:
+        assert log._segment_start(f) == start
+
+def test_logger_rotation_shared_between_processes_loses_nothing(tmp_path):
+    import gzip
+    import time
+    from app.utils.logger import Logger
+    path = tmp_path / "shared.log"
+    # Two loggers on one file stand in for two gunicorn workers
+    workers = [Logger(str(path), batch_size=1, flush_interval=0.01, max_bytes=300, backup_count=50) for _ in range(2)]
+    for i in range(30):
+        for n, log in enumerate(workers):
+            log.info("worker %s line %s", n, i)
+            log.flush()
+    for log in workers:
+        log.close()
+    deadline = time.time() + 5
+    while time.time() < deadline and list(tmp_path.glob("shared.log.*[0-9]")):
+        time.sleep(0.05)  # raw segments still being compressed
+    text = path.read_text() + "".join(gzip.decompress(p.read_bytes()).decode() for p in tmp_path.glob("shared.log.*.gz"))
+    assert sum(1 for line in text.splitlines() if "worker" in line) == 60
+
+def test_logger_stdout_mode(capsys):
+    from app.utils.logger import Logger
+    log = Logger("-", flush_interval=0.01)
+    log.info("to stdout %s", 1)
+    log.close()
+    assert "to stdout 1" in capsys.readouterr().out
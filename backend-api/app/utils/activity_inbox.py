@@ -0,0 +1,107 @@
+"""
+Per-user activity inboxes (fan-out on write).
+
+When a SocialActivity is recorded its id is queued here; a background thread
+copies it into the inbox of every interested user (the actor, the challenged
+user and the actor's teammates) in batched inserts, so reading a personal feed
+is one range scan on (user_id, created_at, activity_id).
+
+Teams larger than INBOX_FANOUT_MAX_TEAM are not fanned out: their members'
+activities are merged in at read time instead (see routes/social.py), which
+keeps one post from turning into thousands of inbox writes. Inboxes are capped
+at INBOX_CAP rows; older entries are trimmed after each batch. The queue is
+bounded and failed batches are retried a limited number of times (see
+utils/batch_writer.py).
+"""
+from flask import current_app
+from .batch_writer import BatchWriter
+from .db import db, insert_ignore
+
+
+class InboxFanout(BatchWriter):
+
+    name = 'inbox-fanout'
+
+    def __init__(self, app, cap=500, max_team=200, flush_interval=1.0,
+                 batch_size=100, max_pending=10000, max_retries=5, async_writes=True):
+        super().__init__(app, flush_interval=flush_interval, batch_size=batch_size, max_pending=max_pending,
+                         max_retries=max_retries, async_writes=async_writes)
+        self.cap = cap
+        self.max_team = max_team
+
+    def publish(self, activity_ids):
+        """Queue committed activities for delivery."""
+        self.enqueue(activity_ids)
+
+    def _write(self, batch):
+        """Fan out one batch of activities in one transaction. Returns the number of inbox rows written."""
+        written = self._deliver(batch)
+        db.session.commit()
+        return written
+
+    def _deliver(self, activity_ids):
+        from ..routes.social import ActivityInbox, SocialActivity, Team, UserTeam
+        activities = SocialActivity.query.filter(SocialActivity.id.in_(activity_ids)).all()
+        if not activities:
+            return 0
+
+        # Teams involved: the actors' own teams plus any team an activity is about
+        actors = {a.user_id for a in activities}
+        actor_team = dict(db.session.query(UserTeam.user_id, UserTeam.team_name).filter(UserTeam.user_id.in_(actors)).all())
+        team_names = set(actor_team.values()) | {a.team_name for a in activities if a.team_name}
+        small_teams = {name for (name,) in db.session.query(Team.name).filter(
+            Team.name.in_(team_names), Team.member_count <= self.max_team
+        ).all()} if team_names else set()
+        members = {}
+        if small_teams:
+            for user_id, team_name in db.session.query(UserTeam.user_id, UserTeam.team_name).filter(UserTeam.team_name.in_(small_teams)).all():
+                members.setdefault(team_name, []).append(user_id)
+
+        rows = []
+        for a in activities:
+            recipients = {a.user_id}
+            if a.target_user:
+                recipients.add(a.target_user)
+            for team_name in {actor_team.get(a.user_id), a.team_name}:
+                recipients.update(members.get(team_name, ()))
+            rows.extend({'user_id': r, 'activity_id': a.id, 'created_at': a.created_at} for r in recipients)
+
+        written = insert_ignore(ActivityInbox, rows, ['user_id', 'activity_id'])
+        self._trim({r['user_id'] for r in rows})
+        return written
+
+    def _trim(self, user_ids):
+        """Drop the oldest entries of any inbox above the cap."""
+        from ..routes.social import ActivityInbox
+        if not self.cap or not user_ids:
+            return
+        over = db.session.query(ActivityInbox.user_id).filter(ActivityInbox.user_id.in_(user_ids)).group_by(
+            ActivityInbox.user_id
+        ).having(db.func.count() > self.cap).all()
+        for (user_id,) in over:
+            keep = db.select(ActivityInbox.id).where(ActivityInbox.user_id == user_id).order_by(
+                ActivityInbox.created_at.desc(), ActivityInbox.activity_id.desc()
+            ).limit(self.cap).scalar_subquery()
+            db.session.execute(db.delete(ActivityInbox).where(
+                ActivityInbox.user_id == user_id, ActivityInbox.id.not_in(keep)
+            ))
+
+
+def init_inbox_fanout(app):
+    """Create the app's fan-out writer (synchronous under TESTING unless configured)."""
+    fanout = InboxFanout(
+        app,
+        cap=app.config.get('INBOX_CAP', 500),
+        max_team=app.config.get('INBOX_FANOUT_MAX_TEAM', 200),
+        flush_interval=app.config.get('INBOX_FLUSH_SECONDS', 1.0),
+        max_pending=app.config.get('BATCH_WRITER_MAX_PENDING', 10000),
+        max_retries=app.config.get('BATCH_WRITER_MAX_RETRIES', 5),
+        async_writes=app.config.get('INBOX_ASYNC_FANOUT', not app.testing)
+    )
+    app.extensions['inbox_fanout'] = fanout
+    fanout.start()
+    return fanout
+
+
+def inbox_fanout():
+    return current_app.extensions['inbox_fanout']
@@ -0,0 +1,119 @@
+"""
+Background batch writer.
+
+Base class for per-worker queues that are written to the DB in batches by a
+daemon thread (celebration feed, inbox fan-out). Subclasses implement
+_write(batch), which persists and commits one batch.
+
+The queue is bounded: past max_pending the oldest entries are dropped. A batch
+that fails is put back at the head of the queue and retried on the next flush;
+after max_retries consecutive failures it is dropped (and logged) so one bad
+entry or a long DB outage cannot grow the backlog without limit.
+"""
+import atexit
+import threading
+from .db import db
+from .utils import L
+
+
+class BatchWriter:
+
+    name = 'batch-writer'
+
+    def __init__(self, app, flush_interval=1.0, batch_size=100, max_pending=10000,
+                 max_retries=5, async_writes=True):
+        self.app = app
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.async_writes = async_writes
+
+        self._pending = []  # entries not yet written
+        self._failures = 0  # consecutive failed flushes
+        self.dropped = 0    # entries given up on since start
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def enqueue(self, entries):
+        """Queue entries for the next flush (synchronously when async_writes is off)."""
+        if not entries:
+            return
+        with self._lock:
+            self._pending.extend(entries)
+            self._bound()
+            backlog = len(self._pending)
+        if not self.async_writes:
+            self.flush()
+        elif backlog >= self.batch_size:
+            self._wake.set()
+
+    def flush(self):
+        """Write pending entries in one batch. Returns what _write returns (0 on failure)."""
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return 0
+        try:
+            written = self._write(batch)
+        except Exception as e:
+            db.session.rollback()
+            with self._lock:
+                self._failures += 1
+                if self._failures >= self.max_retries:
+                    self._failures = 0
+                    self.dropped += len(batch)
+                    give_up = True
+                else:
+                    self._pending = batch + self._pending
+                    self._bound()
+                    give_up = False
+            if give_up:
+                L.error("%s: dropping %s entries after %s failed attempts: %s", self.name, len(batch), self.max_retries, e)
+            else:
+                L.error("%s: error writing %s entries: %s", self.name, len(batch), e)
+            return 0
+        with self._lock:
+            self._failures = 0
+        return written
+
+    def _write(self, batch):
+        raise NotImplementedError
+
+    def _tick(self):
+        """Hook run by the writer thread after each flush."""
+
+    def _bound(self):
+        # Caller holds the lock
+        excess = len(self._pending) - self.max_pending
+        if self.max_pending and excess > 0:
+            del self._pending[:excess]
+            self.dropped += excess
+            L.warning("%s: backlog over %s, dropped %s oldest entries", self.name, self.max_pending, excess)
+
+    # ---------- background writer ----------
+    def start(self):
+        if self._thread is None and self.async_writes:
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def stop(self):
+        """Stop the writer and write anything still pending."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+        with self.app.app_context():
+            self.flush()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            with self.app.app_context():
+                self.flush()
+                self._tick()
@@ -0,0 +1,138 @@
+"""
+Recent-celebrations feed.
+
+Each worker keeps the newest celebrations in a bounded ring buffer and serves
+/achievements/celebrations from memory. The ring is warmed from the DB on boot,
+fed directly by unlock events, and re-synced periodically so other workers'
+unlocks show up. New celebrations are persisted in batches by a background
+thread rather than inside the unlock transaction (see utils/batch_writer.py
+for the backlog and retry limits). Old rows are removed by the retention
+purger (utils/purger.py).
+"""
+import time
+from collections import deque
+from datetime import datetime
+from flask import current_app
+from .batch_writer import BatchWriter
+from .db import db
+from .utils import L
+
+
+class CelebrationFeed(BatchWriter):
+
+    name = 'celebration-feed'
+
+    def __init__(self, app, size=50, flush_interval=2.0, batch_size=100,
+                 refresh_interval=30.0, max_pending=10000, max_retries=5, async_writes=True):
+        super().__init__(app, flush_interval=flush_interval, batch_size=batch_size, max_pending=max_pending,
+                         max_retries=max_retries, async_writes=async_writes)
+        self.size = size
+        self.refresh_interval = refresh_interval
+
+        self._ring = deque(maxlen=size)  # newest at the left
+        self._warmed = False
+        self._last_refresh = 0.0
+
+    # ---------- reads ----------
+    def latest(self, limit=20):
+        """Newest-first celebration dicts, at most `limit` (capped by the ring size)."""
+        if not self._warmed:
+            self.warm()
+        with self._lock:
+            return [dict(e) for e in list(self._ring)[:limit]]
+
+    def warm(self):
+        """(Re)load the ring from the DB, keeping entries that are still waiting to be written."""
+        from ..routes.achievements import Celebration
+        try:
+            rows = Celebration.query.order_by(Celebration.created_at.desc(), Celebration.id.desc()).limit(self.size).all()
+        except Exception as e:
+            db.session.rollback()
+            L.error("Error warming celebration feed: %s", e)
+            return
+        persisted = [self._ser(c) for c in rows]
+        with self._lock:
+            unsaved = [e for e in self._ring if e['id'] is None]
+            merged = sorted(unsaved + persisted, key=lambda e: e['created_at'] or '', reverse=True)
+            self._ring.clear()
+            self._ring.extend(merged[:self.size])
+            self._warmed = True
+            self._last_refresh = time.monotonic()
+
+    # ---------- writes ----------
+    def publish_many(self, unlocks):
+        """
+        Add celebrations for committed unlocks.
+
+        Args:
+            unlocks (list): (user_id, achievement_name) tuples
+        """
+        if not unlocks:
+            return
+        now = datetime.utcnow().isoformat()
+        entries = [{
+            'id': None,
+            'user_id': user_id,
+            'achievement_name': name,
+            'message': f"{user_id} has unlocked {name} achievement! 🎉",
+            'created_at': now
+        } for user_id, name in unlocks]
+        with self._lock:
+            for entry in entries:
+                self._ring.appendleft(entry)
+        self.enqueue(entries)
+
+    def _write(self, batch):
+        """Persist one batch of celebrations. Returns the number written."""
+        from ..routes.achievements import Celebration
+        rows = [Celebration(
+            user_id=e['user_id'],
+            achievement_name=e['achievement_name'],
+            message=e['message'],
+            created_at=datetime.fromisoformat(e['created_at'])
+        ) for e in batch]
+        db.session.add_all(rows)
+        db.session.commit()
+        with self._lock:
+            for entry, row in zip(batch, rows):
+                entry['id'] = row.id
+        return len(batch)
+
+    def _tick(self):
+        if time.monotonic() - self._last_refresh >= self.refresh_interval:
+            self.warm()
+
+    @staticmethod
+    def _ser(c):
+        return {
+            'id': c.id,
+            'user_id': c.user_id,
+            'achievement_name': c.achievement_name,
+            'message': c.message,
+            'created_at': c.created_at.isoformat() if c.created_at else None
+        }
+
+
+def init_celebration_feed(app):
+    """Create the app's feed, warm it and start the writer (async unless TESTING)."""
+    feed = CelebrationFeed(
+        app,
+        size=app.config.get('CELEBRATION_FEED_SIZE', 50),
+        flush_interval=app.config.get('CELEBRATION_FLUSH_SECONDS', 2.0),
+        max_pending=app.config.get('BATCH_WRITER_MAX_PENDING', 10000),
+        max_retries=app.config.get('BATCH_WRITER_MAX_RETRIES', 5),
+        async_writes=app.config.get('CELEBRATION_ASYNC_WRITES', not app.testing)
+    )
+    app.extensions['celebration_feed'] = feed
+    feed.warm()
+    feed.start()
+    return feed
+
+
+def celebration_feed():
+    return current_app.extensions['celebration_feed']
+
+
+def recent_celebrations(limit=20):
+    """Shared payload for /achievements/celebrations and /social/celebrations."""
+    return {'celebrations': celebration_feed().latest(limit)}
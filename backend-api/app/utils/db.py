@@ -1,3 +1,56 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 
-db = SQLAlchemy()
\ No newline at end of file
+db = SQLAlchemy()
+
+# Rows per multi-VALUES statement; keeps SQLite under its bound-parameter limit
+INSERT_CHUNK_SIZE = 500
+
+
+def insert_ignore(model, rows, conflict_cols, conn=None):
+    """
+    Insert rows, silently skipping any that collide on a unique key.
+
+    Uses INSERT ... ON CONFLICT DO NOTHING on Postgres and its SQLite
+    equivalent, so concurrent joins can't race a SELECT-then-INSERT.
+    The caller owns the transaction (commit/rollback).
+
+    Args:
+        model: SQLAlchemy model class to insert into
+        rows (list[dict]): Column values, one dict per row
+        conflict_cols (list[str]): Columns of the unique constraint
+        conn: Optional Connection to run on instead of db.session
+
+    Returns:
+        int: Number of rows actually inserted
+    """
+    if not rows:
+        return 0
+
+    target = conn if conn is not None else db.session
+    dialect = (conn.dialect if conn is not None else db.session.get_bind().dialect).name
+    if dialect == 'postgresql':
+        insert = postgresql.insert
+    elif dialect == 'sqlite':
+        insert = sqlite.insert
+    else:
+        insert = None
+
+    inserted = 0
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        chunk = rows[start:start + INSERT_CHUNK_SIZE]
+        if insert is None:
+            # Generic fallback: one savepoint per row
+            for row in chunk:
+                try:
+                    with target.begin_nested():
+                        target.execute(model.__table__.insert().values(**row))
+                    inserted += 1
+                except IntegrityError:
+                    pass
+            continue
+        stmt = insert(model.__table__).values(chunk).on_conflict_do_nothing(index_elements=conflict_cols)
+        result = target.execute(stmt)
+        inserted += max(result.rowcount or 0, 0)
+    return inserted
@@ -21,14 +21,311 @@
 # with open('log.txt') as file:
 # file.write()
 
+import atexit
 import datetime
+import glob
+import gzip
+import json
+import os
+import queue
+import random
+import shutil
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: rotation is only serialized within the process
+    fcntl = None
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVEL_NAMES = {DEBUG: 'DEBUG', INFO: 'INFO', WARNING: 'WARNING', ERROR: 'ERROR'}
+_LEVELS = {name: level for level, name in LEVEL_NAMES.items()}
+
+_STOP = object()
+
+
+def parse_level(value, default=INFO):
+    if isinstance(value, int):
+        return value
+    return _LEVELS.get(str(value or '').upper(), default)
 
 
 class Logger:
+    """
+    Append-only application logger with a background writer.
+
+    log() only checks the level (and sample rate), timestamps the record and
+    puts it on a queue; the message is %-formatted with its args by the writer
+    thread, so records below the level cost one comparison. Args must still be
+    safe to format later from another thread (no lazy-loading attributes). A
+    daemon thread keeps the file open and writes records in batches, flushing
+    every `batch_size` records or `flush_interval` seconds, whichever comes
+    first. If the queue is full the record is dropped (and counted) rather than
+    blocking the request. Pending records are drained at interpreter exit.
+
+    fmt is "text" ("[H:M]  LEVEL message key=value") or "json" (one object per
+    line with ts, level, msg and any extra fields).
+
+    The file is rotated once it reaches `max_bytes` or is `max_age` seconds
+    old (0 disables either check; age counts from when the segment was
+    started, kept in a hidden .<file>.start file): it is renamed to
+    <file>.<YYYYmmdd-HHMMSS-micros>, gzipped on a background thread when `compress` is set, and only the newest
+    `backup_count` rotated segments are kept. Several processes (gunicorn
+    workers) may share one file: rotation is serialized by a lock file and
+    every writer reopens the live file once another process has rotated it.
+    file="-" (or "stdout") writes to stdout instead, with no rotation, and is
+    the default in the container image.
+    """
 
-    def __init__(self, file):
+    def __init__(self, file, level=INFO, fmt='text', batch_size=256, flush_interval=0.5, max_queue=10000,
+                 max_bytes=0, max_age=0, backup_count=5, compress=True):
         self.file = file
+        self.level = parse_level(level)
+        self.fmt = fmt
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.backup_count = backup_count
+        self.compress = compress
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._rotation_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        atexit.register(self.close)
+
+    def enabled_for(self, level):
+        """True if records at `level` are written; guard work done only to build a log line."""
+        return level >= self.level
+
+    def log(self, msg, *args, level=INFO, sample=None, **fields):
+        """
+        Queue a record.
+
+        Args:
+            msg (str): Message, %-formatted with `args` by the writer
+            level (int): DEBUG, INFO, WARNING or ERROR
+            sample (float): Keep this fraction of calls from this call site (e.g. 0.01)
+            **fields: Extra key/values (JSON keys, or key=value in text)
+        """
+        if level < self.level or (sample is not None and random.random() >= sample):
+            return
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait((time.time(), level, msg, args, fields))
+        except queue.Full:
+            self.dropped += 1
+
+    def debug(self, msg, *args, **kwargs):
+        self.log(msg, *args, level=DEBUG, **kwargs)
+
+    def info(self, msg, *args, **kwargs):
+        self.log(msg, *args, level=INFO, **kwargs)
+
+    def warning(self, msg, *args, **kwargs):
+        self.log(msg, *args, level=WARNING, **kwargs)
+
+    def error(self, msg, *args, **kwargs):
+        self.log(msg, *args, level=ERROR, **kwargs)
+
+    def flush(self):
+        """Block until everything logged so far is written."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def close(self):
+        """Drain pending records and stop the writer."""
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            self._queue.put(_STOP)
+            self._thread.join(timeout=10)
+        self._thread = None
+
+    def _ensure_writer(self):
+        # Started lazily, again in a forked worker (threads don't survive fork),
+        # and again if the writer ever died
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                if self._pid is not None and self._pid != os.getpid():
+                    self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='logger-writer', daemon=True)
+                self._thread.start()
+
+    def _format(self, ts, level, msg, args, fields):
+        now = datetime.datetime.fromtimestamp(ts)
+        try:
+            try:
+                message = str(msg) % args if args else str(msg)
+            except (TypeError, ValueError):
+                message = ' '.join(str(part) for part in (msg,) + args)
+            if self.fmt == 'json':
+                record = {'ts': now.isoformat(timespec='milliseconds'), 'level': LEVEL_NAMES.get(level, str(level)), 'msg': message}
+                record.update(fields)
+                return json.dumps(record, default=str) + '\n'
+            extra = ''.join(f' {k}={v}' for k, v in fields.items())
+            return f'[{now.hour}:{now.minute}]  {LEVEL_NAMES.get(level, level)} {message}{extra} \n'
+        except Exception as e:
+            # A bad argument costs its own record, never the writer thread
+            placeholder = f'<unformattable log record {msg!r}: {type(e).__name__}>'
+            if self.fmt == 'json':
+                return json.dumps({'ts': now.isoformat(timespec='milliseconds'), 'level': LEVEL_NAMES.get(level, str(level)), 'msg': placeholder}) + '\n'
+            return f'[{now.hour}:{now.minute}]  {LEVEL_NAMES.get(level, level)} {placeholder} \n'
+
+    def _open(self):
+        if self.file in ('-', 'stdout'):
+            return sys.stdout, None
+        f = open(self.file, 'a+')
+        return f, self._segment_start(f)
+
+    def _sidecar(self, suffix):
+        head, tail = os.path.split(self.file)
+        return os.path.join(head, f'.{tail}.{suffix}')
+
+    def _segment_start(self, f):
+        """
+        When the live segment was started, for max_age.
+
+        Recorded in a hidden .<file>.start sidecar by whichever process opens
+        the file empty, so every worker (and a restarted one) ages the segment
+        from the same moment. The file's mtime would only give the last write.
+        """
+        path = self._sidecar('start')
+        if f.tell():
+            try:
+                with open(path) as sidecar:
+                    return float(sidecar.read())
+            except (OSError, ValueError):
+                pass  # written before the sidecar existed: start counting now
+        started = time.time()
+        try:
+            tmp = f'{path}.{os.getpid()}'
+            with open(tmp, 'w') as sidecar:
+                sidecar.write(repr(started))
+            os.replace(tmp, path)
+        except OSError as e:
+            sys.stderr.write(f"log segment start not recorded: {e}\n")
+        return started
+
+    def _should_rotate(self, f, opened_at, pending):
+        if opened_at is None or not f.tell():
+            return False
+        if self.max_bytes and f.tell() + pending > self.max_bytes:
+            return True
+        return bool(self.max_age) and time.time() - opened_at >= self.max_age
+
+    def _replaced(self, f):
+        """True once the live file is no longer the one `f` has open (rotated by another process)."""
+        try:
+            return os.stat(self.file).st_ino != os.fstat(f.fileno()).st_ino
+        except FileNotFoundError:
+            return True
+
+    @contextmanager
+    def _rotating(self):
+        """Serialize rotation work across this process's threads and, via a lock file, across processes."""
+        with self._rotation_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self._sidecar('lock'), 'a') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _rotate(self, f):
+        with self._rotating():
+            if self._replaced(f):
+                # Another worker rotated first: just follow it to the new file
+                f.close()
+                return self._open()
+            f.close()
+            target = f"{self.file}.{datetime.datetime.now().strftime('%Y%m%d-%H%M%S-%f')}"
+            os.replace(self.file, target)
+        threading.Thread(target=self._finish_rotation, args=(target,), name='logger-rotate', daemon=True).start()
+        return self._open()
+
+    def _finish_rotation(self, segment):
+        """Compress a rotated segment and drop the ones past backup_count."""
+        try:
+            with self._rotating():
+                if self.compress:
+                    with open(segment, 'rb') as src, gzip.open(segment + '.gz', 'wb') as dst:
+                        shutil.copyfileobj(src, dst)
+                    os.remove(segment)
+                # Timestamped names sort chronologically
+                segments = sorted(
+                    p for p in glob.glob(glob.escape(self.file) + '.*')
+                    if p[len(self.file) + 1:].split('.')[0][:8].isdigit()
+                )
+                for old in segments[:max(0, len(segments) - self.backup_count)]:
+                    os.remove(old)
+        except OSError as e:
+            sys.stderr.write(f"log rotation failed for {segment}: {e}\n")
+
+    def _run(self):
+        f, opened_at = self._open()
+        path = self.file
+        try:
+            while True:
+                try:
+                    first = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    continue
+                batch = [first]
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size and batch[-1] is not _STOP:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(self._queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+                try:
+                    data = ''.join(self._format(*r) for r in batch if r is not _STOP)
+                    if path != self.file:
+                        # Reconfigured (init_logging) after the writer started
+                        if opened_at is not None:
+                            f.close()
+                        f, opened_at = self._open()
+                        path = self.file
+                    elif opened_at is not None and self._replaced(f):
+                        # Another process rotated the file: keep appending to the live one
+                        f.close()
+                        f, opened_at = self._open()
+                    if self._should_rotate(f, opened_at, len(data)):
+                        f, opened_at = self._rotate(f)
+                    f.write(data)
+                    f.flush()
+                except Exception as e:
+                    sys.stderr.write(f"log write failed: {e}\n")
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+                if batch[-1] is _STOP:
+                    return
+        finally:
+            if opened_at is not None and not f.closed:
+                f.close()
 
-    def log(self, data):
-        with open(self.file, 'a+') as f:
-            f.write(f'[{datetime.datetime.now().hour}:{datetime.datetime.now().minute}]  {data} \n')
\ No newline at end of file
+def init_logging(app, logger=None):
+    """Apply the LOG_* settings to the shared application logger."""
+    if logger is None:
+        from .utils import L as logger
+    logger.level = parse_level(app.config.get('LOG_LEVEL', 'INFO'))
+    logger.fmt = app.config.get('LOG_FORMAT', 'text')
+    logger.file = app.config.get('LOG_FILE', logger.file)
+    logger.max_bytes = app.config.get('LOG_MAX_BYTES', logger.max_bytes)
+    logger.max_age = app.config.get('LOG_MAX_AGE_SECONDS', logger.max_age)
+    logger.backup_count = app.config.get('LOG_BACKUP_COUNT', logger.backup_count)
+    logger.compress = app.config.get('LOG_COMPRESS', logger.compress)
+    return logger
@@ -0,0 +1,72 @@
+"""
+Keyset (cursor) pagination on (created_at, id).
+
+Cursors are opaque URL-safe strings encoding the last row served; the next page
+is `(created_at, id) < cursor` in descending order, which a composite index on
+(..., created_at, id) answers as a range scan no matter how deep the page.
+"""
+import base64
+from datetime import datetime
+from .db import db
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(created_at, row_id):
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Returns:
+        tuple: (created_at, id)
+    Raises:
+        ValueError: if the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split('|', 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise ValueError('invalid cursor')
+
+
+def parse_page_args(args):
+    """
+    Read ?cursor=&limit= from request args.
+
+    Returns:
+        tuple: (cursor or None, limit)
+    Raises:
+        ValueError: on a malformed cursor or non-integer limit
+    """
+    cursor = args.get('cursor')
+    limit = min(MAX_PAGE_SIZE, max(1, int(args.get('limit', DEFAULT_PAGE_SIZE))))
+    return (decode_cursor(cursor) if cursor else None), limit
+
+
+def keyset_page(query, model, cursor, limit, keys=None):
+    """
+    Fetch one page newest-first.
+
+    Args:
+        query: Filtered query returning `model` rows
+        model: Model with created_at and id columns
+        cursor (tuple): Decoded (created_at, id) of the last row already seen, or None
+        limit (int): Page size
+        keys (tuple): Optional (created_at, id) columns to seek on instead of the model's,
+            e.g. a joined table whose index matches the filter
+
+    Returns:
+        tuple: (rows, next_cursor or None)
+    """
+    created_col, id_col = keys or (model.created_at, model.id)
+    if cursor:
+        query = query.filter(db.tuple_(created_col, id_col) < db.tuple_(*cursor))
+    rows = query.order_by(created_col.desc(), id_col.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
@@ -0,0 +1,110 @@
+"""
+Password hashing off the request thread.
+
+Hashing and verification run on a small per-worker thread pool (hashlib's
+scrypt/pbkdf2 release the GIL, so threads give real parallelism) with a bound
+on queued work: during a login storm requests wait briefly for a slot and then
+fail fast with PasswordHasherBusy instead of piling up behind the KDF. This
+relies on gunicorn's threaded workers (see the Dockerfile): the request
+thread blocks on the result, and the worker's other threads keep serving.
+
+The cost is PASSWORD_HASH_METHOD in werkzeug's format (e.g. "scrypt:32768:8:1"
+or "pbkdf2:sha256:600000"). Stored hashes made with a different method, and
+legacy plaintext passwords, verify normally and report needs_rehash so login
+can upgrade them in place. Unknown usernames are checked against dummy_hash()
+so they cost the same KDF work as a wrong password.
+"""
+import hmac
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+DEFAULT_METHOD = 'scrypt:32768:8:1'
+_KNOWN_PREFIXES = ('scrypt:', 'pbkdf2:')
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing pool is saturated; callers should answer 503."""
+
+
+def _is_hash(stored):
+    return bool(stored) and stored.startswith(_KNOWN_PREFIXES) and stored.count('$') == 2
+
+
+class PasswordHasher:
+
+    def __init__(self, method=DEFAULT_METHOD, workers=2, max_pending=32, wait_seconds=5.0):
+        self.method = method
+        self.wait_seconds = wait_seconds
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hasher')
+        # Running + queued jobs; acquiring a slot is the backpressure point
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._dummy = None
+
+    def _enqueue(self, fn, *args, wait_forever=False):
+        if not self._slots.acquire(timeout=None if wait_forever else self.wait_seconds):
+            raise PasswordHasherBusy('password hashing is saturated, retry shortly')
+        try:
+            future = self._pool.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _submit(self, fn, *args):
+        return self._enqueue(fn, *args).result()
+
+    def hash(self, password):
+        return self._submit(generate_password_hash, password, self.method)
+
+    def hash_many(self, passwords):
+        """Hash a batch in parallel, in order. Blocks for free slots instead of failing (bulk jobs)."""
+        futures = [self._enqueue(generate_password_hash, p, self.method, wait_forever=True) for p in passwords]
+        return [f.result() for f in futures]
+
+    def verify(self, stored, password):
+        """
+        Check `password` against a stored credential.
+
+        Returns:
+            tuple: (matches, needs_rehash)
+        """
+        if not _is_hash(stored):
+            # Legacy plaintext row: constant-time compare, then upgrade on success
+            ok = hmac.compare_digest(str(stored or '').encode(), str(password).encode())
+            return ok, ok
+        ok = self._submit(check_password_hash, stored, password)
+        return ok, ok and self.needs_rehash(stored)
+
+    def dummy_hash(self):
+        """A hash made with the configured method that no password matches, for unknown users."""
+        dummy = self._dummy
+        if dummy is None or not dummy.startswith(self.method + '$'):
+            # Benign race: concurrent first callers each build an equivalent hash
+            dummy = self._dummy = generate_password_hash(secrets.token_hex(16), self.method)
+        return dummy
+
+    def needs_rehash(self, stored):
+        return not _is_hash(stored) or stored.split('$', 1)[0] != self.method
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
+
+
+def init_password_hasher(app):
+    """Create the app's hashing pool from PASSWORD_HASH_* settings."""
+    hasher = PasswordHasher(
+        method=app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD),
+        workers=app.config.get('PASSWORD_HASH_WORKERS', 2),
+        max_pending=app.config.get('PASSWORD_HASH_MAX_PENDING', 32),
+        wait_seconds=app.config.get('PASSWORD_HASH_WAIT_SECONDS', 5.0)
+    )
+    app.extensions['password_hasher'] = hasher
+    return hasher
+
+
+def password_hasher():
+    return current_app.extensions['password_hasher']
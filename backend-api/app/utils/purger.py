@@ -0,0 +1,171 @@
+"""
+Background retention purger.
+
+Expired challenges, activity-feed entries (and their inbox copies) and
+celebrations are removed by a per-worker background thread using chunked bulk
+DELETEs on indexed created_at columns, so GET handlers never write. On
+Postgres each pass takes an advisory try-lock, so only one replica purges at
+a time.
+"""
+import atexit
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import text
+from .db import db
+from .utils import L
+
+# Arbitrary app-wide key for pg_try_advisory_lock
+PURGE_LOCK_KEY = 72_011_036
+
+
+def _retention(config, name):
+    """Retention window for a purge target, or None when disabled."""
+    if name == 'challenges':
+        days = config.get('CHALLENGE_RETENTION_DAYS', 7)
+        return timedelta(days=days) if days else None
+    if name in ('activities', 'inbox'):
+        hours = config.get('ACTIVITY_RETENTION_HOURS', 24)
+        return timedelta(hours=hours) if hours else None
+    if name == 'celebrations':
+        days = config.get('CELEBRATIONS_RETENTION_DAYS', 30)
+        return timedelta(days=days) if days else None
+    if name == 'revoked_tokens':
+        # A token revoked longer ago than its lifetime has expired anyway
+        lifetime = config.get('JWT_ACCESS_TOKEN_EXPIRES', timedelta(minutes=15))
+        return lifetime if isinstance(lifetime, timedelta) else None
+    raise KeyError(name)
+
+
+def retention_cutoff(name):
+    """
+    Oldest created_at still visible for a purge target.
+
+    Reads filter on this so expired rows stay hidden between purge passes.
+
+    Returns:
+        datetime: Cutoff, or None when retention is disabled
+    """
+    window = _retention(current_app.config, name)
+    return datetime.utcnow() - window if window else None
+
+
+def _targets():
+    from ..routes.social import ActivityInbox, Challenge, SocialActivity
+    from ..routes.achievements import Celebration
+    from ..models.models import RevokedToken
+    return {
+        'challenges': Challenge,
+        'inbox': ActivityInbox,
+        'activities': SocialActivity,
+        'celebrations': Celebration,
+        'revoked_tokens': RevokedToken,
+    }
+
+
+def _purge_hooks():
+    """Per target: (columns returned by the DELETE, callback(conn, rows) run in the same transaction)."""
+    from ..routes.social import Challenge, release_challenge_links
+    return {
+        'challenges': ([Challenge.challenger, Challenge.challenged], release_challenge_links),
+    }
+
+
+def purge_expired(chunk_size=1000):
+    """
+    Delete expired rows from every target in chunks of `chunk_size`.
+
+    Must run inside an application context.
+
+    Returns:
+        dict: Rows removed per target (empty if another replica holds the lock)
+    """
+    removed = {}
+    with db.engine.connect() as conn:
+        locked = conn.dialect.name == 'postgresql'
+        if locked:
+            got_lock = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": PURGE_LOCK_KEY}).scalar()
+            conn.commit()
+            if not got_lock:
+                return removed
+        try:
+            hooks = _purge_hooks()
+            for name, model in _targets().items():
+                window = _retention(current_app.config, name)
+                if not window:
+                    continue
+                cutoff = datetime.utcnow() - window
+                table = model.__table__
+                total = 0
+                while True:
+                    # One short transaction per chunk keeps row locks brief
+                    expired = db.select(table.c.id).where(table.c.created_at < cutoff).limit(chunk_size).scalar_subquery()
+                    delete = table.delete().where(table.c.id.in_(expired))
+                    if name in hooks:
+                        columns, on_delete = hooks[name]
+                        rows = conn.execute(delete.returning(*columns)).all()
+                        on_delete(conn, rows)
+                        count = len(rows)
+                    else:
+                        count = conn.execute(delete).rowcount or 0
+                    conn.commit()
+                    total += count
+                    if count < chunk_size:
+                        break
+                removed[name] = total
+        finally:
+            if locked:
+                conn.rollback()
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": PURGE_LOCK_KEY})
+                conn.commit()
+    return removed
+
+
+class RetentionPurger:
+
+    def __init__(self, app, interval=300, chunk_size=1000):
+        self.app = app
+        self.interval = interval
+        self.chunk_size = chunk_size
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self):
+        with self.app.app_context():
+            try:
+                removed = purge_expired(self.chunk_size)
+                if any(removed.values()):
+                    L.log(f"Purged expired rows: {removed}")
+                return removed
+            except Exception as e:
+                L.error("Error purging expired rows: %s", e)
+                return {}
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='retention-purger', daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+
+def init_purger(app):
+    """Create the app's purger and start it (disabled under TESTING unless configured)."""
+    purger = RetentionPurger(
+        app,
+        interval=app.config.get('PURGE_INTERVAL_SECONDS', 300),
+        chunk_size=app.config.get('PURGE_CHUNK_SIZE', 1000)
+    )
+    app.extensions['retention_purger'] = purger
+    if app.config.get('PURGE_ENABLED', not app.testing):
+        purger.start()
+    return purger
@@ -0,0 +1,190 @@
+"""
+Per-client rate limiting and load shedding.
+
+Every request draws a token from a bucket keyed by (route budget, client),
+where the client is the JWT identity or, for anonymous calls, the remote
+address (rewritten from X-Forwarded-For only for TRUSTED_PROXY_HOPS proxies).
+Budgets are (tokens per second, burst) per endpoint, with RATE_LIMIT_DEFAULT
+for everything else; an empty bucket answers 429 with Retry-After. Buckets
+live in process memory, or in a SQLite file
+(RATE_LIMIT_STORAGE = "sqlite:////tmp/ratelimit.db") shared by the gunicorn
+workers of one pod.
+
+Independently, a worker serving MAX_IN_FLIGHT requests sheds new ones with a
+503 instead of queueing them behind a saturated CPU.
+"""
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from flask import g, jsonify, request
+from werkzeug.middleware.proxy_fix import ProxyFix
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from ..metrics import REQUESTS_SHED
+
+# Probes and scrapes must never be throttled
+EXEMPT_BLUEPRINTS = {'health_bp'}
+EXEMPT_ENDPOINTS = {'prometheus_metrics', 'static'}
+
+
+def _refill(tokens, updated, now, rate, burst):
+    return min(burst, tokens + (now - updated) * rate)
+
+
+class MemoryBucketStore:
+    """Token buckets in this process, LRU-bounded so idle clients are forgotten."""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated)
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst, now=None):
+        """
+        Take one token.
+
+        Returns:
+            float: 0 if allowed, else seconds until a token is available
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = _refill(tokens, updated, now, rate, burst)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            self._buckets[key] = (tokens - 1 if not wait else tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class SqliteBucketStore:
+    """Token buckets in a local SQLite file, so all workers on a host share budgets."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, updated REAL)")
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, rate, burst, now=None):
+        now = time.time() if now is None else now  # wall clock: shared across processes
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = _refill(*row, now, rate, burst) if row else burst
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                (key, tokens - 1 if not wait else tokens, now)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+
+def _store_from_config(storage):
+    if storage and storage.startswith('sqlite:///'):
+        return SqliteBucketStore(storage[len('sqlite:///'):])
+    return MemoryBucketStore()
+
+
+class RateLimiter:
+
+    def __init__(self, store, default=(10.0, 20), budgets=None, max_in_flight=12):
+        self.store = store
+        self.default = default
+        self.budgets = budgets or {}
+        self.max_in_flight = max_in_flight
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def budget(self, endpoint):
+        return self.budgets.get(endpoint, self.default)
+
+    def acquire_slot(self):
+        with self._lock:
+            if self.max_in_flight and self._in_flight >= self.max_in_flight:
+                return False
+            self._in_flight += 1
+            return True
+
+    def release_slot(self):
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+
+
+def _client_key():
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        identity = None  # bad/expired/revoked tokens are rejected by the route itself
+    if identity:
+        return f"user:{identity}"
+    # remote_addr only: X-Forwarded-For is client-controlled unless ProxyFix (TRUSTED_PROXY_HOPS) vetted it
+    return f"ip:{request.remote_addr}"
+
+
+def _refuse(status, message, retry_after):
+    response = jsonify({"status": "error", "message": message})
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response, status
+
+
+def init_rate_limiting(app):
+    """Install the limiter's request hooks (off under TESTING unless RATE_LIMIT_ENABLED)."""
+    limiter = RateLimiter(
+        _store_from_config(app.config.get('RATE_LIMIT_STORAGE', 'memory')),
+        default=app.config.get('RATE_LIMIT_DEFAULT', (10.0, 20)),
+        budgets=app.config.get('RATE_LIMITS', {}),
+        max_in_flight=app.config.get('MAX_IN_FLIGHT', 12)
+    )
+    app.extensions['rate_limiter'] = limiter
+    hops = app.config.get('TRUSTED_PROXY_HOPS', 0)
+    if hops:
+        # Take the client address from the last `hops` X-Forwarded-For entries, set by our own proxies
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
+    if not app.config.get('RATE_LIMIT_ENABLED', not app.testing):
+        return limiter
+
+    @app.before_request
+    def _limit():
+        endpoint = request.endpoint
+        if endpoint is None or endpoint in EXEMPT_ENDPOINTS or request.blueprint in EXEMPT_BLUEPRINTS:
+            return None
+        if not limiter.acquire_slot():
+            REQUESTS_SHED.labels(reason='in_flight').inc()
+            return _refuse(503, "server busy, retry shortly", 1)
+        g.rate_limit_slot = True
+
+        budget = limiter.budget(endpoint)
+        if budget:
+            rate, burst = budget
+            try:
+                wait = limiter.store.take(f"{endpoint}|{_client_key()}", rate, burst)
+            except Exception:
+                wait = 0  # a broken shared store must not take the API down
+            if wait:
+                REQUESTS_SHED.labels(reason='rate_limit').inc()
+                return _refuse(429, "rate limit exceeded", wait)
+        return None
+
+    @app.teardown_request
+    def _release(exc):
+        if g.pop('rate_limit_slot', False):
+            limiter.release_slot()
+
+    return limiter
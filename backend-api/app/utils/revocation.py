@@ -0,0 +1,189 @@
+"""
+JWT revocation (logout) with an in-memory fast path.
+
+Revoked token ids (jti) are persisted in revoked_tokens. Each worker mirrors
+them into a bloom filter that is extended incrementally every
+REVOCATION_REFRESH_SECONDS (rows with id above the last one seen, plus the
+last REVOCATION_LOOKBACK_SECONDS of rows in case ids committed out of order)
+and rebuilt from scratch every REVOCATION_REBUILD_SECONDS, once purged rows
+have aged out.
+
+A token the filter has never seen is accepted without touching the DB, which
+is almost every request. Only filter hits are checked against the store, and
+the answers are remembered in small bounded sets, so a revoked (or falsely
+matching) token costs at most one lookup per worker.
+"""
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from .db import db, insert_ignore
+from .utils import L
+from ..metrics import TOKEN_REVOCATION_CHECKS
+
+
+class BloomFilter:
+
+    def __init__(self, capacity=100000, error_rate=0.001):
+        self.capacity = max(1, capacity)
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class _BoundedSet:
+    """Insertion-ordered set that forgets its oldest members past `limit`."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._items = OrderedDict()
+
+    def add(self, key):
+        self._items[key] = None
+        self._items.move_to_end(key)
+        while len(self._items) > self.limit:
+            self._items.popitem(last=False)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def discard(self, key):
+        self._items.pop(key, None)
+
+    def clear(self):
+        self._items.clear()
+
+
+class RevocationStore:
+
+    def __init__(self, capacity=100000, error_rate=0.001, exact_size=1024,
+                 refresh_interval=5.0, rebuild_interval=3600.0, lookback=60.0):
+        self.capacity = capacity
+        self.lookback = lookback
+        self.error_rate = error_rate
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self._lock = threading.Lock()
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._revoked = _BoundedSet(exact_size)  # confirmed revoked
+        self._clean = _BoundedSet(exact_size)    # confirmed false positives
+        self._high_water = 0
+        self._last_refresh = None
+        self._last_rebuild = None
+
+    def _sync(self, rebuild=False):
+        """
+        Pull revocations newer than the high-water mark (or everything, on rebuild).
+
+        Sequence ids can commit out of order, so each refresh also re-reads rows
+        created within the last `lookback` seconds: a revocation that committed
+        after a higher id was seen is still picked up on the next refresh.
+        """
+        from ..models.models import RevokedToken
+        q = db.session.query(RevokedToken.id, RevokedToken.jti)
+        if not rebuild:
+            recent = datetime.utcnow() - timedelta(seconds=self.lookback)
+            q = q.filter(db.or_(RevokedToken.id > self._high_water, RevokedToken.created_at >= recent))
+        rows = q.order_by(RevokedToken.id).all()
+        with self._lock:
+            if rebuild:
+                self._bloom = BloomFilter(max(self.capacity, 2 * len(rows)), self.error_rate)
+                self._clean.clear()
+                self._last_rebuild = time.monotonic()
+            for row_id, jti in rows:
+                if jti not in self._bloom:  # re-read rows are already in; don't inflate the count
+                    self._bloom.add(jti)
+                self._clean.discard(jti)  # revoked elsewhere since we last checked it
+                self._high_water = max(self._high_water, row_id)
+            if self._bloom.count > self._bloom.capacity:
+                self._last_rebuild = None  # saturated: rebuild bigger on the next check
+            self._last_refresh = time.monotonic()
+
+    def _maybe_sync(self):
+        now = time.monotonic()
+        try:
+            if self._last_rebuild is None or now - self._last_rebuild >= self.rebuild_interval:
+                self._sync(rebuild=True)
+            elif now - self._last_refresh >= self.refresh_interval:
+                self._sync()
+        except Exception as e:
+            db.session.rollback()
+            L.error("Error refreshing token revocations: %s", e)
+            # Back off: retry after one refresh interval rather than on every request
+            self._last_refresh = now
+            if self._last_rebuild is None:
+                self._last_rebuild = now - self.rebuild_interval + self.refresh_interval
+
+    def is_revoked(self, jti):
+        from ..models.models import RevokedToken
+        self._maybe_sync()
+        with self._lock:
+            if jti in self._revoked:
+                TOKEN_REVOCATION_CHECKS.labels(result='exact').inc()
+                return True
+            if jti not in self._bloom or jti in self._clean:
+                TOKEN_REVOCATION_CHECKS.labels(result='memory').inc()
+                return False
+        TOKEN_REVOCATION_CHECKS.labels(result='store').inc()
+        revoked = db.session.query(RevokedToken.id).filter_by(jti=jti).first() is not None
+        with self._lock:
+            (self._revoked if revoked else self._clean).add(jti)
+        return revoked
+
+    def revoke(self, jti, user_id=None, expires_at=None):
+        """Persist a revocation and apply it to this worker immediately. Commits."""
+        from ..models.models import RevokedToken
+        insert_ignore(RevokedToken, [{
+            'jti': jti, 'user_id': user_id, 'expires_at': expires_at, 'created_at': datetime.utcnow()
+        }], ['jti'])
+        db.session.commit()
+        with self._lock:
+            self._bloom.add(jti)
+            self._revoked.add(jti)
+
+
+def init_revocation(app, jwt):
+    """Create the app's revocation store and register it as the JWT blocklist loader."""
+    store = RevocationStore(
+        capacity=app.config.get('REVOCATION_BLOOM_CAPACITY', 100000),
+        error_rate=app.config.get('REVOCATION_BLOOM_ERROR_RATE', 0.001),
+        exact_size=app.config.get('REVOCATION_EXACT_SIZE', 1024),
+        refresh_interval=app.config.get('REVOCATION_REFRESH_SECONDS', 5.0),
+        rebuild_interval=app.config.get('REVOCATION_REBUILD_SECONDS', 3600.0),
+        lookback=app.config.get('REVOCATION_LOOKBACK_SECONDS', 60.0)
+    )
+    app.extensions['revocation_store'] = store
+
+    @jwt.token_in_blocklist_loader
+    def _token_revoked(jwt_header, jwt_payload):
+        return store.is_revoked(jwt_payload['jti'])
+
+    return store
+
+
+def revocation_store():
+    return current_app.extensions['revocation_store']
+
+
+def revoke_token(jwt_payload):
+    """Revoke a decoded token (e.g. the current one on logout)."""
+    exp = jwt_payload.get('exp')
+    expires_at = datetime.fromtimestamp(exp, timezone.utc).replace(tzinfo=None) if exp else None
+    revocation_store().revoke(jwt_payload['jti'], jwt_payload.get('sub'), expires_at)
@@ -0,0 +1,78 @@
+"""
+Startup schema manager.
+
+Creates missing tables and seeds reference data once when the app boots
+instead of on request paths.
+On Postgres the DDL runs under a session advisory lock, so replicas (and
+gunicorn workers) starting together don't race each other's CREATE TABLEs.
+"""
+import time
+from sqlalchemy import text
+from .db import db, insert_ignore
+from .utils import L, RARITY_POINTS
+
+# Arbitrary app-wide key for pg_advisory_lock
+SCHEMA_LOCK_KEY = 72_011_028
+
+
+def _ensure_indexes(conn):
+    """create_all skips existing tables, so add indexes declared on models since the table was created."""
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=conn, checkfirst=True)
+
+
+def _seed(conn):
+    """Insert reference rows that the app expects; existing rows are left alone."""
+    from ..models.models import RarityPoints
+    insert_ignore(
+        RarityPoints,
+        [{'rarity': rarity, 'points': points} for rarity, points in RARITY_POINTS.items()],
+        ['rarity'],
+        conn=conn
+    )
+
+
+def ensure_schema():
+    """
+    Create any missing tables, serialized across processes where the DB allows it.
+
+    Must run inside an application context with all models imported.
+
+    Returns:
+        float: Seconds spent, including time waiting for the lock
+    """
+    started = time.perf_counter()
+    with db.engine.connect() as conn:
+        locked = conn.dialect.name == 'postgresql'
+        if locked:
+            conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+        try:
+            db.metadata.create_all(bind=conn)
+            _ensure_indexes(conn)
+            _seed(conn)
+            conn.commit()
+        finally:
+            if locked:
+                conn.rollback()  # clear a failed transaction so the unlock can run
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": SCHEMA_LOCK_KEY})
+                conn.commit()
+    return time.perf_counter() - started
+
+
+def init_schema(app):
+    """
+    Run ensure_schema once at startup and record its cost.
+
+    Controlled by the SCHEMA_AUTO_INIT config flag. Failures are logged rather
+    than raised so the app still boots when the DB isn't reachable yet.
+    """
+    if not app.config.get('SCHEMA_AUTO_INIT', True):
+        return
+    from ..metrics import SCHEMA_INIT_SECONDS
+    try:
+        elapsed = ensure_schema()
+        SCHEMA_INIT_SECONDS.set(elapsed)
+        L.log(f"Schema ready in {elapsed * 1000:.1f} ms")
+    except Exception as e:
+        L.error("Schema init failed: %s", e)
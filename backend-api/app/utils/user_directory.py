@@ -0,0 +1,131 @@
+"""
+Per-worker username directory.
+
+Most routes only need to know whether a username is registered and its banked
+points. This caches username -> DirectoryEntry in a bounded LRU with a TTL, so
+repeated lookups (leaderboards resolve every player, donations check the
+recipient) stop costing a query each. Unknown usernames are cached too, for a
+shorter time, so probes for unregistered players are also served from memory.
+
+Writers invalidate entries in their own worker after commit (register, banking,
+removal); other workers converge within the TTL.
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from flask import current_app
+from .db import db
+from ..metrics import USER_DIRECTORY_LOOKUPS
+
+DirectoryEntry = namedtuple('DirectoryEntry', ['id', 'banked_points', 'exists'])
+MISSING = DirectoryEntry(None, 0, False)
+
+# Usernames per IN (...) query when resolving many at once
+LOOKUP_CHUNK_SIZE = 500
+
+
+class UserDirectory:
+
+    def __init__(self, max_entries=10000, ttl=30.0, negative_ttl=5.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()  # username -> (expires_at, DirectoryEntry), oldest first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, username, now):
+        item = self._entries.get(username)
+        if item is None or item[0] <= now:
+            return None
+        self._entries.move_to_end(username)
+        return item[1]
+
+    def _store(self, username, entry, now):
+        self._entries[username] = (now + (self.ttl if entry.exists else self.negative_ttl), entry)
+        self._entries.move_to_end(username)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def lookup(self, username):
+        return self.lookup_many([username])[username]
+
+    def lookup_many(self, usernames):
+        """
+        Resolve usernames, querying only the ones not cached.
+
+        Returns:
+            dict: username -> DirectoryEntry (MISSING for unregistered names)
+        """
+        from ..models.models import User
+        now = time.monotonic()
+        found, misses = {}, []
+        with self._lock:
+            for username in set(usernames):
+                entry = self._cached(username, now)
+                if entry is None:
+                    misses.append(username)
+                else:
+                    found[username] = entry
+            self.hits += len(found)
+            self.misses += len(misses)
+        USER_DIRECTORY_LOOKUPS.labels(result='hit').inc(len(found))
+        USER_DIRECTORY_LOOKUPS.labels(result='miss').inc(len(misses))
+        if not misses:
+            return found
+
+        loaded = {}
+        for start in range(0, len(misses), LOOKUP_CHUNK_SIZE):
+            chunk = misses[start:start + LOOKUP_CHUNK_SIZE]
+            rows = db.session.query(User.username, User.id, User.banked_points).filter(User.username.in_(chunk)).all()
+            loaded.update({username: DirectoryEntry(uid, banked or 0, True) for username, uid, banked in rows})
+        with self._lock:
+            for username in misses:
+                entry = loaded.get(username, MISSING)
+                self._store(username, entry, now)
+                found[username] = entry
+        return found
+
+    def invalidate(self, *usernames):
+        with self._lock:
+            for username in usernames:
+                self._entries.pop(username, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0
+            }
+
+
+def init_user_directory(app):
+    directory = UserDirectory(
+        max_entries=app.config.get('USER_DIRECTORY_SIZE', 10000),
+        ttl=app.config.get('USER_DIRECTORY_TTL', 30.0),
+        negative_ttl=app.config.get('USER_DIRECTORY_NEGATIVE_TTL', 5.0)
+    )
+    app.extensions['user_directory'] = directory
+    return directory
+
+
+def user_directory():
+    return current_app.extensions['user_directory']
+
+
+def lookup_user(username):
+    """DirectoryEntry for `username` (MISSING if not registered)."""
+    return user_directory().lookup(username)
+
+
+def invalidate_users(*usernames):
+    """Drop cached entries after a commit that registered, banked or removed users."""
+    user_directory().invalidate(*usernames)
@@ -0,0 +1,193 @@
+"""
+Streaming bulk user import.
+
+Reads CSV (username,password[,banked_points] with a header row) or NDJSON
+({"username": ..., "password": ...} per line) from any line iterator and
+imports it chunk by chunk: dedupe within the chunk and against existing
+usernames with one IN query, hash passwords in parallel on the hashing pool,
+then bulk-insert (COPY through a staging table on Postgres, a multi-row
+insert elsewhere) skipping names registered meanwhile, and commit.
+Memory stays bounded by the chunk size regardless of file length.
+
+Used by the `flask import-users` command and POST /users/import.
+"""
+import csv
+import io
+import json
+import os
+import time
+from itertools import islice
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from .db import db, insert_ignore
+from .utils import L
+
+DEFAULT_CHUNK_SIZE = 1000
+USERNAME_MAX_LENGTH = 20  # user.username is String(20)
+
+
+def iter_records(lines, fmt):
+    """
+    Yield raw user dicts from an iterator of text lines.
+
+    Args:
+        lines: Iterable of str lines (file object, stream wrapper, ...)
+        fmt (str): "csv" or "ndjson"
+    """
+    if fmt == 'csv':
+        yield from csv.DictReader(lines)
+    elif fmt == 'ndjson':
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield {}
+    else:
+        raise ValueError(f"unsupported format: {fmt}")
+
+
+def detect_format(name_or_type, default='csv'):
+    value = (name_or_type or '').lower()
+    if 'ndjson' in value or 'jsonl' in value or value.endswith('.json'):
+        return 'ndjson'
+    if 'csv' in value:
+        return 'csv'
+    return default
+
+
+def _clean(record):
+    """(username, password, banked_points) or None when the record is unusable."""
+    if not isinstance(record, dict):
+        return None
+    username = str(record.get('username') or '').strip()
+    password = record.get('password')
+    if not username or len(username) > USERNAME_MAX_LENGTH or password in (None, ''):
+        return None
+    try:
+        banked = int(record.get('banked_points') or 0)
+    except (TypeError, ValueError):
+        return None
+    return username, str(password), banked
+
+
+def _copy_rows(rows):
+    """
+    COPY rows into a session-local staging table on the session's Postgres
+    connection, then move them into "user" skipping usernames registered
+    since the dedupe query. Returns the number of rows inserted.
+    """
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow((row['username'], row['password'], row['banked_points']))
+    buf.seek(0)
+    raw = db.session.connection().connection.dbapi_connection
+    with raw.cursor() as cur:
+        cur.execute(
+            'CREATE TEMP TABLE IF NOT EXISTS user_import_staging '
+            '(username text, password text, banked_points integer) ON COMMIT DELETE ROWS'
+        )
+        cur.copy_expert('COPY user_import_staging (username, password, banked_points) FROM STDIN WITH (FORMAT csv)', buf)
+        cur.execute(
+            'INSERT INTO "user" (username, password, banked_points) '
+            'SELECT username, password, banked_points FROM user_import_staging '
+            'ON CONFLICT (username) DO NOTHING'
+        )
+        inserted = cur.rowcount
+        cur.execute('TRUNCATE user_import_staging')
+    return inserted
+
+
+def _insert_rows(rows):
+    """Insert rows, skipping usernames taken meanwhile (e.g. by /register). Returns rows inserted."""
+    from ..models.models import User
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return _copy_rows(rows)
+    return insert_ignore(User, rows, ['username'])
+
+
+def import_users(records, hasher, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """
+    Import users from an iterable of dicts, one committed chunk at a time.
+
+    Args:
+        records: Iterable of dicts with username/password (banked_points optional)
+        hasher: PasswordHasher used to hash passwords in parallel
+        chunk_size (int): Rows per dedupe query, hash batch and insert
+        progress: Optional callable receiving the running report after each chunk
+
+    Returns:
+        dict: read/imported/existing/duplicates/invalid counts, seconds and rows_per_sec
+    """
+    from ..models.models import User
+    from .user_directory import invalidate_users
+    report = {'read': 0, 'imported': 0, 'existing': 0, 'duplicates': 0, 'invalid': 0}
+    started = time.perf_counter()
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            break
+        report['read'] += len(chunk)
+
+        batch = {}
+        for record in chunk:
+            cleaned = _clean(record)
+            if cleaned is None:
+                report['invalid'] += 1
+            elif cleaned[0] in batch:
+                report['duplicates'] += 1
+            else:
+                batch[cleaned[0]] = cleaned
+
+        existing = {u for (u,) in db.session.query(User.username).filter(User.username.in_(list(batch))).all()} if batch else set()
+        report['existing'] += len(existing)
+        fresh = [v for k, v in batch.items() if k not in existing]
+        if fresh:
+            hashes = hasher.hash_many([password for _, password, _ in fresh])
+            rows = [{'username': u, 'password': h, 'banked_points': b} for (u, _, b), h in zip(fresh, hashes)]
+            try:
+                inserted = _insert_rows(rows)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            report['imported'] += inserted
+            report['existing'] += len(rows) - inserted  # lost a race with /register
+            invalidate_users(*[r['username'] for r in rows])
+        if progress:
+            progress(_with_rate(report, started))
+    report = _with_rate(report, started)
+    L.log(f"Bulk user import: {report}")
+    return report
+
+
+def _with_rate(report, started):
+    seconds = time.perf_counter() - started
+    return dict(report, seconds=round(seconds, 3), rows_per_sec=round(report['read'] / seconds, 1) if seconds else 0.0)
+
+
+@click.command('import-users')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), help='Default: from the file extension, else csv')
+@click.option('--chunk-size', default=DEFAULT_CHUNK_SIZE, show_default=True)
+@click.option('--workers', default=os.cpu_count() or 1, show_default=True, help='Password hashing threads')
+@with_appcontext
+def import_users_command(path, fmt, chunk_size, workers):
+    """Bulk-import users from a CSV/NDJSON file (or - for stdin)."""
+    from .passwords import PasswordHasher
+    hasher = PasswordHasher(method=current_app.config.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1'), workers=workers)
+    fmt = fmt or detect_format(path)
+    try:
+        with click.open_file(path, 'r', encoding='utf-8') as lines:
+            report = import_users(
+                iter_records(lines, fmt), hasher, chunk_size,
+                progress=lambda r: click.echo(f"{r['read']} read, {r['imported']} imported, {r['rows_per_sec']} rows/s", err=True)
+            )
+    finally:
+        hasher.shutdown()
+    click.echo(json.dumps(report))
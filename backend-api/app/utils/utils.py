@@ -1,3 +1,6 @@
+import time
+from flask import current_app, has_app_context
+from .db import db
 from .logger import Logger
 movies = [{'id': 1, 'name': 'spiderman3', 'rate': 3.9},
           {'id': 2, 'name': 'taken 3', 'rate': 2.4}]
@@ -7,12 +10,38 @@ users = []
 
 L = Logger('logs.txt')
 
+# Defaults used to seed the rarity_points table and as a fallback before it is loaded
+RARITY_POINTS = {
+    'common': 10,
+    'rare': 20,
+    'epic': 40,
+    'legendary': 80
+}
+
+# Seconds a worker keeps its copy of rarity_points (local edits invalidate immediately)
+RARITY_POINTS_TTL = 60
+
+def rarity_points_map() -> dict:
+    """Cached rarity -> points mapping from the rarity_points table."""
+    if not has_app_context():
+        return RARITY_POINTS
+    cache = current_app.extensions.setdefault('rarity_points', {'loaded_at': None, 'points': RARITY_POINTS})
+    now = time.monotonic()
+    if cache['loaded_at'] is None or now - cache['loaded_at'] > RARITY_POINTS_TTL:
+        from ..models.models import RarityPoints
+        try:
+            rows = RarityPoints.query.all()
+            cache['points'] = {r.rarity: r.points for r in rows} or RARITY_POINTS
+        except Exception as e:
+            db.session.rollback()
+            L.error("Error loading rarity points, using defaults: %s", e)
+        cache['loaded_at'] = now
+    return cache['points']
+
+def invalidate_rarity_points():
+    current_app.extensions.pop('rarity_points', None)
+
 def get_achievement_points(rarity: str) -> int:
     """Get points for achievement based on rarity - shared utility function"""
-    rarity_points = {
-        'common': 10,
-        'rare': 20,
-        'epic': 40,
-        'legendary': 80
-    }
-    return rarity_points.get(rarity, 10)  # default to common if rarity not found
\ No newline at end of file
+    points = rarity_points_map()
+    return points.get(rarity, points.get('common', RARITY_POINTS['common']))  # default to common if rarity not found
\ No newline at end of file
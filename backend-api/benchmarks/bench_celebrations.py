@@ -0,0 +1,41 @@
+"""
+Latency of /social/celebrations vs /achievements/celebrations.
+
+/social/celebrations used to re-dispatch to /achievements/celebrations through
+an internal test client; both now read the shared feed, so their latencies
+should match. Run from backend-api/:
+
+    python -m benchmarks.bench_celebrations [requests]
+"""
+import statistics
+import sys
+import time
+from app import create_app, db
+
+
+def bench(client, path, n):
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        response = client.get(path)
+        samples.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200
+    samples.sort()
+    return statistics.mean(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def main(n=2000):
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"})
+    with app.app_context():
+        db.create_all()
+        client = app.test_client()
+        ach_id = client.post('/achievements/create-custom', json={"name": "Bench"}).json['id']
+        client.post('/achievements/grant', json={"achievement_id": ach_id, "users": [f"user{i}" for i in range(50)]})
+        for path in ('/achievements/celebrations', '/social/celebrations'):
+            bench(client, path, 50)  # warm-up
+            mean, p99 = bench(client, path, n)
+            print(f"{path:32s} mean {mean:.3f} ms  p99 {p99:.3f} ms  ({n} requests)")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,52 @@
+"""
+Login throughput with the configured password KDF.
+
+Runs concurrent /login requests against one app (one gunicorn worker's worth)
+and reports logins/sec overall and per hashing worker, so PASSWORD_HASH_METHOD
+can be sized against expected login storms. Run from backend-api/:
+
+    python -m benchmarks.bench_logins [logins] [client_threads]
+
+PASSWORD_HASH_METHOD / PASSWORD_HASH_WORKERS are read from the environment.
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app import create_app, db
+
+
+def main(n=200, threads=8):
+    method = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    workers = int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        "JWT_SECRET_KEY": "bench",
+        "PASSWORD_HASH_METHOD": method,
+        "PASSWORD_HASH_WORKERS": workers,
+        "PASSWORD_HASH_MAX_PENDING": threads,
+    })
+    with app.app_context():
+        db.create_all()
+        app.test_client().post('/register', json={"username": "bench", "password": "pw"})
+
+    def login(_):
+        with app.test_client() as client:
+            return client.post('/login', json={"username": "bench", "password": "pw"}).status_code
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(login, range(threads)))  # warm-up
+        start = time.perf_counter()
+        statuses = list(pool.map(login, range(n)))
+        elapsed = time.perf_counter() - start
+
+    ok = statuses.count(200)
+    rate = ok / elapsed
+    print(f"{method}: {ok}/{n} logins in {elapsed:.2f}s  {rate:.1f} logins/s  "
+          f"{rate / workers:.1f} logins/s per core ({workers} hash workers, {threads} clients)")
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*args)
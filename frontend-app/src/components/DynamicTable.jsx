@@ -114,6 +114,10 @@ export const DynamicTable = ({ data, onAction }) => {
                             <tr key={row.id || idx} className="hover:bg-bg-surface-2 transition-colors">
                                 {headers.map(h => {
                                     let val = row[h];
+                                    if (h === 'participants' && val === undefined) {
+                                        // Backend returns only a count unless ?participants=top:N|all is requested
+                                        val = row.participant_count;
+                                    }
                                     if (h === 'achievements' && Array.isArray(val)) {
                                         val = val.map(a => <div key={a.name} className="text-xs">{a.name}</div>);
                                     } else if (h === 'participants' && Array.isArray(val)) {